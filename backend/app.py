@@ -2,6 +2,13 @@ from flask import Flask, jsonify, request
 from flask_cors import CORS
 import sys
 import os
+import json
+import time
+import base64
+import binascii
+from collections import OrderedDict
+from datetime import date, datetime
+from threading import Lock
 
 # Add shared directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'shared'))
@@ -10,7 +17,18 @@ from config import SUPABASE_URL, SUPABASE_KEY, FLASK_ENV, FLASK_DEBUG
 from supabase import create_client, Client
 
 # Import existing modules
-from services.db_utils import execute_db_action
+from services.db_utils import execute_db_action, get_total_balance
+from services.account_cache import get_account_cache_stats
+from services.media_queue import get_media_queue_stats
+from services.rollups import get_rollup_totals
+from services.command_parser import get_command_parser_stats
+from services.llm_cache import get_llm_cache_stats
+from services.ocr_engine import get_ocr_engine_stats
+from services.media_cache import get_media_cache_stats
+from services.invoice_index import get_invoice_index_stats
+from services.cpu_pool import get_cpu_pool_stats
+from services.audio_prep import get_audio_prep_stats
+from services.transcribe import get_transcribe_stats
 
 # Create main Flask app
 app = Flask(__name__)
@@ -27,10 +45,35 @@ def webhook():
     from reply_whatsapp import reply_whatsapp
     return reply_whatsapp()
 
+def encode_cursor(row):
+    """Opaque cursor pointing after `row` in (created_at, id) descending order"""
+    payload = json.dumps({'c': row['created_at'], 'i': row['id']}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError unless the cursor holds an ISO timestamp and an integer id.
+
+    Both values are interpolated into a PostgREST `or` filter, so only the re-serialized
+    timestamp and the int are returned, never the strings sent by the client.
+    """
+    padded = cursor + '=' * (-len(cursor) % 4)
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        created_at = datetime.fromisoformat(payload['c']).isoformat()
+        row_id = int(str(payload['i']))
+    except (TypeError, KeyError, binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError(f'invalid cursor: {e}') from e
+    return created_at, row_id
+
 # API Routes for Frontend
 @app.route('/api/transactions', methods=['GET'])
 def get_transactions():
-    """Get all transactions with optional filters"""
+    """Get transactions with optional filters.
+
+    Pagination is keyset-based when a `cursor` parameter is present (use an empty
+    cursor for the first page, then pass back `next_cursor`); otherwise the old
+    `offset` mode is used. `count` can be `exact`, `estimated` or `none`.
+    """
     try:
         # Get query parameters
         limit = request.args.get('limit', 50, type=int)
@@ -38,9 +81,20 @@ def get_transactions():
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
         account = request.args.get('account')
+        cursor = request.args.get('cursor')
+        keyset = cursor is not None
+        count_mode = request.args.get('count', 'none' if keyset else 'exact')
+        if count_mode not in ('exact', 'estimated', 'none'):
+            return jsonify({
+                'success': False,
+                'error': 'count must be one of: exact, estimated, none'
+            }), 400
         
-        # Build query
-        query = supabase.table("Transactions").select("*")
+        # Build query (the count, if any, comes back with the same request)
+        if count_mode == 'none':
+            query = supabase.table("Transactions").select("*")
+        else:
+            query = supabase.table("Transactions").select("*", count=count_mode)
         
         if start_date:
             query = query.gte('created_at', start_date)
@@ -48,34 +102,47 @@ def get_transactions():
             query = query.lte('created_at', end_date)
         if account:
             query = query.eq('account', account)
+        if cursor:
+            try:
+                cursor_created_at, cursor_id = decode_cursor(cursor)
+            except ValueError:
+                return jsonify({
+                    'success': False,
+                    'error': 'Invalid cursor'
+                }), 400
+            query = query.or_(
+                f'created_at.lt."{cursor_created_at}",'
+                f'and(created_at.eq."{cursor_created_at}",id.lt.{cursor_id})'
+            )
             
-        query = query.order('created_at', desc=True).range(offset, offset + limit - 1)
+        query = query.order('created_at', desc=True).order('id', desc=True)
+        # One extra row tells us whether there is a next page
+        if keyset:
+            query = query.limit(limit + 1)
+        else:
+            query = query.range(offset, offset + limit)
         
         result = query.execute()
+        rows = result.data or []
+        has_next = len(rows) > limit
+        rows = rows[:limit]
+        total_count = result.count if count_mode != 'none' else None
         
-        # Get total count for pagination
-        count_query = supabase.table("Transactions").select("*", count="exact")
-        if start_date:
-            count_query = count_query.gte('created_at', start_date)
-        if end_date:
-            count_query = count_query.lte('created_at', end_date)
-        if account:
-            count_query = count_query.eq('account', account)
-        
-        count_result = count_query.execute()
-        total_count = count_result.count if hasattr(count_result, 'count') else len(result.data)
+        pagination = {
+            'limit': limit,
+            'total': total_count,
+            'pages': (total_count + limit - 1) // limit if total_count is not None else None,
+            'has_next': has_next,
+            'has_prev': bool(cursor) if keyset else offset > 0,
+            'next_cursor': encode_cursor(rows[-1]) if has_next and rows else None
+        }
+        if not keyset:
+            pagination['page'] = (offset // limit) + 1
         
         return jsonify({
             'success': True,
-            'data': result.data,
-            'pagination': {
-                'page': (offset // limit) + 1,
-                'limit': limit,
-                'total': total_count,
-                'pages': (total_count + limit - 1) // limit,
-                'has_next': offset + limit < total_count,
-                'has_prev': offset > 0
-            }
+            'data': rows,
+            'pagination': pagination
         })
     except Exception as e:
         return jsonify({
@@ -116,28 +183,89 @@ def get_accounts():
             'error': str(e)
         }), 500
 
+# Dashboard stats are cached per worker for a short time; add_transaction drops the cache.
+# Keys are normalized filters, and at most STATS_CACHE_MAX_ENTRIES of them are kept.
+STATS_CACHE_TTL = float(os.getenv('STATS_CACHE_TTL', '30'))
+STATS_CACHE_MAX_ENTRIES = int(os.getenv('STATS_CACHE_MAX_ENTRIES', '64'))
+_stats_cache = OrderedDict()
+_stats_cache_lock = Lock()
+
+def invalidate_stats_cache():
+    with _stats_cache_lock:
+        _stats_cache.clear()
+
+def stats_cache_key(start_date=None, end_date=None, account=None):
+    """Normalized (start_day, end_day, account) filter; raises ValueError for invalid dates.
+
+    The period (and so the account filter) only applies when both dates are given,
+    so every other combination shares the unfiltered key.
+    """
+    if not start_date or not end_date:
+        return (None, None, None)
+    start_day = date.fromisoformat(start_date[:10]).isoformat()
+    end_day = date.fromisoformat(end_date[:10]).isoformat()
+    return (start_day, end_day, (account or '').strip() or None)
+
+def _cached_stats(key):
+    """(computed_at, data) for `key`, recomputed when older than STATS_CACHE_TTL"""
+    now = time.monotonic()
+    with _stats_cache_lock:
+        cached = _stats_cache.get(key)
+        if cached is not None and now - cached[0] < STATS_CACHE_TTL:
+            _stats_cache.move_to_end(key)
+            return cached
+
+    cached = (time.monotonic(), compute_stats(*key))
+    with _stats_cache_lock:
+        _stats_cache[key] = cached
+        _stats_cache.move_to_end(key)
+        # drop expired entries first, then the least recently used ones
+        for stale in [k for k, (at, _) in _stats_cache.items() if now - at >= STATS_CACHE_TTL]:
+            del _stats_cache[stale]
+        while len(_stats_cache) > STATS_CACHE_MAX_ENTRIES:
+            _stats_cache.popitem(last=False)
+    return cached
+
+def compute_stats(start_day=None, end_day=None, account=None):
+    """Compute dashboard statistics without downloading whole tables"""
+    # Total balance summed in the database (accounts_total_balance RPC)
+    total_balance = get_total_balance(supabase)
+
+    # Transaction count from a count query (only one row comes over the wire)
+    count_result = supabase.table("Transactions").select("id", count="exact").limit(1).execute()
+    transaction_count = count_result.count or 0
+
+    # Get recent transactions
+    recent_result = supabase.table("Transactions").select("*").order('created_at', desc=True).limit(5).execute()
+
+    data = {
+        'total_balance': total_balance,
+        'transaction_count': transaction_count,
+        'recent_transactions': recent_result.data if recent_result.data else []
+    }
+
+    # Optional period totals, answered from the daily rollups
+    if start_day and end_day:
+        data['period'] = get_rollup_totals(supabase, start_day, end_day, account)
+
+    return data
+
 @app.route('/api/stats', methods=['GET'])
 def get_stats():
     """Get statistics for dashboard"""
     try:
-        # Get total balance
-        accounts_result = supabase.table("Accounts").select("sum").execute()
-        total_balance = sum(account['sum'] for account in accounts_result.data) if accounts_result.data else 0
-        
-        # Get transaction count
-        transactions_result = supabase.table("Transactions").select("id").execute()
-        transaction_count = len(transactions_result.data) if transactions_result.data else 0
-        
-        # Get recent transactions
-        recent_result = supabase.table("Transactions").select("*").order('created_at', desc=True).limit(5).execute()
-        
+        try:
+            key = stats_cache_key(request.args.get('start_date'), request.args.get('end_date'), request.args.get('account'))
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'start_date and end_date must be ISO dates (YYYY-MM-DD)'
+            }), 400
+
+        computed_at, data = _cached_stats(key)
         return jsonify({
             'success': True,
-            'data': {
-                'total_balance': total_balance,
-                'transaction_count': transaction_count,
-                'recent_transactions': recent_result.data if recent_result.data else []
-            }
+            'data': {**data, 'cache_age_seconds': round(time.monotonic() - computed_at, 1)}
         })
     except Exception as e:
         return jsonify({
@@ -162,6 +290,7 @@ def add_transaction():
         
         # Insert transaction
         result = supabase.table("Transactions").insert(data).execute()
+        invalidate_stats_cache()
         
         if result.data:
             return jsonify({
@@ -180,5 +309,24 @@ def add_transaction():
             'error': str(e)
         }), 500
 
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Get in-process cache metrics for this worker"""
+    return jsonify({
+        'success': True,
+        'data': {
+            'account_cache': get_account_cache_stats(),
+            'media_queue': get_media_queue_stats(),
+            'command_parser': get_command_parser_stats(),
+            'llm_cache': get_llm_cache_stats(),
+            'ocr_engine': get_ocr_engine_stats(),
+            'media_cache': get_media_cache_stats(),
+            'invoice_index': get_invoice_index_stats(),
+            'cpu_pool': get_cpu_pool_stats(),
+            'audio_prep': get_audio_prep_stats(),
+            'transcribe': get_transcribe_stats()
+        }
+    })
+
 if __name__ == '__main__':
     app.run(debug=FLASK_DEBUG, host='0.0.0.0', port=3000)
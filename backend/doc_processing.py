@@ -1,42 +1,26 @@
 from flask import Flask, request, Response
 from twilio.twiml.messaging_response import MessagingResponse
-import os
 from dotenv import load_dotenv
-from io import BytesIO
-from PIL import Image
-import base64
-import pytesseract
 import json
-from PyPDF2 import PdfReader
+import time
 import re
 from prompts import get_receipt_analysis_prompt, get_pdf_analysis_prompt, get_financial_command_prompt, get_period_parse_prompt
 from datetime import datetime, timedelta, timezone
-
-pytesseract.pytesseract.tesseract_cmd = "/usr/bin/tesseract"
-# pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
-
-
-def get_normalized_mapping(supabase_client):
-    """Obține dicționare cu forma corectă a numelor de companii și bănci (pt. normalizare)."""
-    result = supabase_client.table("Accounts").select("compania,banca").execute()
-    company_mapping = {}
-    bank_mapping = {}
-    
-    for row in result.data or []:
-        # Normalizare companii
-        if row.get("compania"):
-            original = row["compania"]
-            normalized = original.lower().replace(" ", "", "_")
-            company_mapping[normalized] = original
-        
-        # Normalizare bănci
-        if row.get("banca"):
-            original = row["banca"]
-            normalized = original.lower().replace(" ", "", "_")
-            bank_mapping[normalized] = original
-    
-    return company_mapping, bank_mapping
-
+from services.account_cache import get_normalized_mapping, find_accounts, invalidate_accounts, get_accounts_with_balances, DIRECTORY_COLUMNS
+from services.db_utils import compute_spent_sum, insert_transaction, increment_value
+from services.command_parser import parse_financial_command, record_llm_latency, split_commands
+from services.period_parser import resolve_period
+from services.llm_cache import cached_llm_call, normalize_prompt_input, today_utc
+from services.ocr_engine import ocr_image_bytes, record_ocr
+from services.cpu_pool import run_cpu, CpuTaskError
+from services.media_cache import get_media_extraction, store_media_extraction, context_digest
+from services.invoice_index import find_duplicate, DuplicateInvoice
+from services.pdf_extract import extract_pdf_bytes
+from services.pdf_ocr import fill_scanned_pages
+from services.doc_snippets import shrink_document_text
+from services.invoice_extractor import extract_invoice_fields, LOCAL_EXTRACT_MIN_CONFIDENCE
+from services.audio_prep import prepare_audio, split_audio
+from services.transcribe import transcribe
 
 
 def mask_iban(iban: str) -> str:
@@ -133,68 +117,81 @@ def present_candidates_message_with_all(alias, candidates):
     return "\n".join(lines)
 
 
-def compute_spent_sum(supabase_client, start_iso: str, end_iso: str, iban: str | None = None):
-    """Calculează totalul cheltuit (sumă pozitivă) în intervalul dat. Folosește valorile negative din `amount`."""
-    q = supabase_client.table("Transactions").select("amount,account,created_at").gte("created_at", start_iso).lte("created_at", end_iso)
-    if iban:
-        q = q.eq("account", iban)
-    resp = q.execute()
-    total_neg = 0.0
-    for row in resp.data or []:
-        try:
-            amt = float(row.get("amount") or 0)
-            if amt < 0:
-                total_neg += amt
-        except Exception:
-            continue
-    return round(-total_neg, 2)
-
-
 # functie care extrage textul din audio
-def extract_audio_text(r, client):
+def extract_audio_text(media, client):
     """
-    Descarcă un fișier audio de la Twilio și returnează textul transcris cu OpenAI.
+    Transcrie cu OpenAI un fișier audio descărcat de la Twilio (services.media_download.MediaBuffer).
     """
     try:
-        if r.status_code != 200:
-            return f"❌ Eroare descărcare audio: {r.status_code}"
+        # Același mesaj vocal retrimis: transcrierea e deja salvată
+        cached = get_media_extraction(media.digest)
+        if cached:
+            return cached["text"]
+
+        # mono 16 kHz, fără liniște la capete, ogg/opus: fișier mai mic și mai scurt de transcris;
+        # mesajele lungi sunt tăiate în pauze și transcrise pe bucăți, în paralel
+        prepared = prepare_audio(media.read())
+        if prepared:
+            text = transcribe(client, split_audio(prepared), "ogg")
+        else:
+            # fără ffmpeg: trimitem originalul, dacă formatul (detectat la descărcare) e acceptat de OpenAI
+            ext = media.format if media.format in ("ogg", "wav", "mp3", "mp4") else None
+            if not ext:
+                return f"❌ Format audio nesuportat: {media.content_type or media.format}"
+            text = transcribe(client, [media.read()], ext)
 
-        # Detectăm tipul fișierului
-        content_type = r.headers.get("Content-Type", "").lower()
-        ext = "ogg" if "ogg" in content_type else (
-              "wav" if "wav" in content_type else (
-              "mp3" if "mpeg" in content_type else None))
+        store_media_extraction(media.digest, "audio", text)
+        return text
 
-        if not ext:
-            return f"❌ Format audio nesuportat: {content_type}"
+    except Exception as e:
+        return f"❌ Eroare la procesarea audio: {str(e)}"
 
-        # Punem în BytesIO pentru a nu salva pe disk
-        audio_bytes = BytesIO(r.content)
 
-        # Trimitem la OpenAI pentru transcriere
-        transcript = client.audio.transcriptions.create(
-            model="gpt-4o-mini-transcribe",
-            file=(f"voice.{ext}", audio_bytes)
-        )
+def local_extraction_json(text, sender):
+    """JSON-ul tranzacției extras local, dacă e suficient de sigur; altfel None (se apelează gpt-5)."""
+    data, confidence = extract_invoice_fields(text, sender)
+    if confidence < LOCAL_EXTRACT_MIN_CONFIDENCE:
+        return None
+    print(f"🧮 Extragere locală (încredere {confidence:.2f}), fără gpt-5:", data)
+    return json.dumps(data, ensure_ascii=False)
 
-        return transcript.text.strip()
 
-    except Exception as e:
-        return f"❌ Eroare la procesarea audio: {str(e)}"
+def duplicate_invoice_reply(data, match):
+    """Răspunsul pentru o factură deja înregistrată (fără inserare)."""
+    when = f" pe {str(match['created_at'])[:10]}" if match.get("created_at") else ""
+    return (f"♻️ Factura {data.get('invoice_number')} de {data.get('amount')} {data.get('currency') or 'RON'} "
+            f"e deja înregistrată{when}. Nu am salvat-o din nou.")
 
 
-def encode_image(image_path):
-    """Codifică imaginea în base64 pentru OpenAI."""
-    with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode('utf-8')
+def balance_suffix(balance):
+    """„ Sold curent: X RON” pentru soldul întors de insert_transaction (gol dacă tranzacția nu are cont)."""
+    return f" Sold curent: {balance} RON" if balance is not None else ""
 
 
-def process_pdf(ext, sender, message, r, client, supabase_client):
-    pdf_reader = PdfReader(BytesIO(r.content))
-    text_from_pdf = ""
-    
-    for page in pdf_reader.pages:
-        text_from_pdf += page.extract_text() + "\n"
+def process_pdf(ext, sender, message, media, client, supabase_client):
+    # PDF retrimis: textul e deja în cache, sărim peste extragere
+    cached = get_media_extraction(media.digest)
+    if cached:
+        print("♻️ PDF deja procesat (cache), sar peste extragere")
+        text_from_pdf = cached["text"]
+    else:
+        # primele PDF_MAX_PAGES pagini, cu oprire după ce apar totalul, IBAN-ul și numărul facturii
+        # parsarea PDF-ului și OCR-ul paginilor scanate rulează în pool-ul de procese, nu în worker
+        try:
+            pdf_pages = run_cpu(extract_pdf_bytes, media.read())["page_texts"]
+            text_from_pdf = "\n".join(fill_scanned_pages(media.open(), pdf_pages))
+        except CpuTaskError as e:
+            return f"❌ Nu am putut citi PDF-ul: {e}"
+        store_media_extraction(media.digest, "pdf", text_from_pdf)
+
+    # JSON-ul tranzacției depinde și de expeditor și de mesaj: cache separat, pe cheia (fișier, expeditor, mesaj)
+    json_key = context_digest(media.digest, sender, message)
+    cached_json = get_media_extraction(json_key)
+    if cached_json:
+        print("♻️ Tranzacție deja extrasă pentru acest expeditor (cache), sar peste GPT")
+        json_text = cached_json["data"]
+    else:
+        json_text = local_extraction_json(text_from_pdf, sender)
 
     result = {
         "success": False,
@@ -207,32 +204,38 @@ def process_pdf(ext, sender, message, r, client, supabase_client):
     # Obține conținutul imaginii
     username = sender.split(":")[1] if ":" in sender else "unknown"
 
-    # Obține promptul pentru analiza PDF
-    prompt = get_pdf_analysis_prompt(text_from_pdf, sender, message)
-
     # Codifică și trimite la OpenAI
     try:
-        gpt_response = client.responses.create(
-            model="gpt-5",
-            input=prompt,
-        )
+        if json_text is None:
+            # Obține promptul pentru analiza PDF
+            prompt = get_pdf_analysis_prompt(shrink_document_text(text_from_pdf, "pdf"), sender, message)
+            gpt_response = client.responses.create(
+                model="gpt-5",
+                input=prompt,
+            )
 
-        json_text = gpt_response.output_text
+            json_text = gpt_response.output_text
 
         try:
             # incarca datele in format json
             data = json.loads(json_text)
             print(data)
-            # insereaza datele in tabela de tranzactii
-            response = supabase_client.table("Transactions").insert(data).execute()
-
-            # selecteaza toate sumele din tabela accounts si opreste doar pe ultima
-            account_sum_response = supabase_client.table("Accounts").select("sum").execute()
-            account_sum = account_sum_response.data[-1]["sum"]
+            if not cached_json:
+                store_media_extraction(json_key, "pdf", "", json_text)
+            # factura a mai fost trimisă: nu o mai inserăm
+            duplicate = find_duplicate(supabase_client, data)
+            if duplicate:
+                return duplicate_invoice_reply(data, duplicate)
+            # insereaza tranzactia si primeste soldul nou al contului ei, intr-un singur apel
+            # (indexul unic din DB refuză factura dacă a înregistrat-o între timp alt worker)
+            try:
+                saved = insert_transaction(supabase_client, data)
+            except DuplicateInvoice as e:
+                return duplicate_invoice_reply(data, e.match)
 
             # construire raspuns twilio
-            twilio_response = f"✅ Tranzacție salvată: {data.get('amount')} RON. Sold curent: {account_sum} RON"
-            print(response)
+            twilio_response = f"✅ Tranzacție salvată: {data.get('amount')} RON.{balance_suffix(saved['balance'])}"
+            print(saved["transaction"])
             print(twilio_response)
         except Exception as e:
             print("eroare")
@@ -246,53 +249,8 @@ def process_pdf(ext, sender, message, r, client, supabase_client):
     return twilio_response
 
 
-# import cv2
-# import numpy as np
-from PIL import Image
-
-# def preprocess_for_ocr(filename):
-#     """
-#     Îmbunătățește imaginea înainte de OCR:
-#     - convertește la grayscale
-#     - crește contrastul
-#     - aplică binarizare adaptivă
-#     - face un mic blur pentru a reduce zgomotul
-#     """
-#     img = cv2.imread(filename, cv2.IMREAD_COLOR)
-#     gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-
-#     # eliminare zgomot ușor
-#     gray = cv2.medianBlur(gray, 3)
-
-#     # creștere contrast
-#     gray = cv2.convertScaleAbs(gray, alpha=1.5, beta=0)
-
-#     # binarizare adaptivă (separa textul de fundal)
-#     thresh = cv2.adaptiveThreshold(
-#         gray, 255,
-#         cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-#         cv2.THRESH_BINARY,
-#         31, 5
-#     )
-
-#     # eventual deskew (dacă textul e înclinat)
-#     coords = np.column_stack(np.where(thresh > 0))
-#     angle = cv2.minAreaRect(coords)[-1]
-#     if angle < -45:
-#         angle = -(90 + angle)
-#     else:
-#         angle = -angle
-
-#     (h, w) = thresh.shape[:2]
-#     M = cv2.getRotationMatrix2D((w // 2, h // 2), angle, 1.0)
-#     deskewed = cv2.warpAffine(thresh, M, (w, h),
-#                               flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
-#     cv2.imwrite(filename.replace(".jpg", "_proc.jpg"), deskewed)
-#     return deskewed
-
-
 # functie de procesare a imaginii, extragerea textului cu tesseract OCR
-def process_image(ext, sender, message, r, client, supabase_client):
+def process_image(ext, sender, message, media, client, supabase_client):
     """
     Procesează imaginea unei facturi, extrage date, generează SQL și inserează în Supabase.
     Returnează un dicționar cu rezultatele.
@@ -308,22 +266,28 @@ def process_image(ext, sender, message, r, client, supabase_client):
         "error": None
     }
 
-    # Obține conținutul imaginii
-    # content_type = r.headers.get("Content-Type", "").lower()
-    username = sender.split(":")[1] if ":" in sender else "unknown"
-
-    # Creează director și salvează imaginea
-    user_dir = f"uploads/{username}"
-    os.makedirs(user_dir, exist_ok=True)
-    filename = f"{user_dir}/{message or 'image'}.{ext}"
-    with open(filename, "wb") as f:
-        f.write(r.content)
-
-    # Extrage textul din imagine (opțional, pentru verificare)
-    img = Image.open(filename)
-    text_from_img = pytesseract.image_to_string(img, lang="ron+eng")
-    # processed = preprocess_for_ocr(filename)
-    # text_from_img = pytesseract.image_to_string(processed, lang="ron+eng")
+    # Poză retrimisă: textul e deja în cache, sărim peste OCR
+    cached = get_media_extraction(media.digest)
+    if cached:
+        print("♻️ Imagine deja procesată (cache), sar peste OCR")
+        text_from_img = cached["text"]
+    else:
+        # Decodarea și OCR-ul rulează în pool-ul de procese, nu în worker
+        try:
+            ocr = run_cpu(ocr_image_bytes, media.read(), "ron+eng")
+            text_from_img = record_ocr(ocr)  # statisticile OCR din procesul copil ajung în /api/metrics
+        except CpuTaskError as e:
+            return f"❌ Nu am putut procesa imaginea: {e}"
+        store_media_extraction(media.digest, "image", text_from_img)
+
+    # JSON-ul tranzacției depinde și de expeditor și de mesaj (profile_name, indiciul de cont)
+    json_key = context_digest(media.digest, sender, message)
+    cached_json = get_media_extraction(json_key)
+    if cached_json:
+        print("♻️ Tranzacție deja extrasă pentru acest expeditor (cache), sar peste GPT")
+        json_text = cached_json["data"]
+    else:
+        json_text = local_extraction_json(text_from_img, sender)
 
     print("Extracted text from img:", text_from_img)
     result["text_from_img"] = text_from_img
@@ -342,43 +306,51 @@ def process_image(ext, sender, message, r, client, supabase_client):
                     account_hint = original_bank
                     break
 
-    # Obține promptul pentru analiza bonului fiscal
-    prompt = get_receipt_analysis_prompt(text_from_img, sender, account_hint, message)
-
     # Codifică și trimite la OpenAI
     try:
-        base64_image = encode_image(filename)
-        # client = OpenAI(api_key=openai_key)
-        gpt_response = client.responses.create(
-            model="gpt-5",
-            input=prompt,
-        )
-
-        json_text = gpt_response.output_text
-        print("GPT response:", json_text)
+        if json_text is None:
+            # Obține promptul pentru analiza bonului fiscal
+            prompt = get_receipt_analysis_prompt(shrink_document_text(text_from_img, "bon"), sender, account_hint, message)
+            # client = OpenAI(api_key=openai_key)
+            gpt_response = client.responses.create(
+                model="gpt-5",
+                input=prompt,
+            )
+
+            json_text = gpt_response.output_text
+            print("GPT response:", json_text)
 
         try:
             data = json.loads(json_text)
+            if not cached_json:
+                store_media_extraction(json_key, "image", "", json_text)
             
             # Aplică sugestia de cont din mesajul text dacă există și dacă contul nu e detectat în imagine
             if account_hint and (not data.get('account') or data['account'] == 'null'):
                 # Caută IBAN-ul pentru banca sugerată
-                resp = supabase_client.table("Accounts").select("iban").eq("banca", account_hint).execute()
-                if resp.data:
-                    data['account'] = resp.data[0]['iban']
+                hinted_accounts = find_accounts(supabase_client, banca=account_hint)
+                if hinted_accounts:
+                    data['account'] = hinted_accounts[0]['iban']
                     print(f"💡 Using suggested bank account: {data['account']} ({account_hint})")
             
-            # Inserează tranzacția în baza de date
-            response = supabase_client.table("Transactions").insert(data).execute()
-            account_sum_response = supabase_client.table("Accounts").select("sum").execute()
-            account_sum = account_sum_response.data[-1]["sum"]
+            # Factura a mai fost trimisă: nu o mai inserăm
+            duplicate = find_duplicate(supabase_client, data)
+            if duplicate:
+                return duplicate_invoice_reply(data, duplicate)
+
+            # Inserează tranzacția și primește soldul nou al contului ei
+            # (indexul unic din DB refuză factura dacă a înregistrat-o între timp alt worker)
+            try:
+                saved = insert_transaction(supabase_client, data)
+            except DuplicateInvoice as e:
+                return duplicate_invoice_reply(data, e.match)
             
             # Construiește mesajul de răspuns
             bank_info = ""
             if account_hint:
                 bank_info = f" în contul {account_hint}"
-            twilio_response = f"✅ Tranzacție salvată{bank_info}: {data.get('amount')} RON. Sold curent: {account_sum} RON"
-            print(response)
+            twilio_response = f"✅ Tranzacție salvată{bank_info}: {data.get('amount')} RON.{balance_suffix(saved['balance'])}"
+            print(saved["transaction"])
             print(twilio_response)
             
         except Exception as e:
@@ -412,7 +384,8 @@ def execute_db_action(supabase_client, json_text):
             }
 
     Returnează:
-        dict cu cheia "status" sau "error" și, dacă e succes, și cheia "response".
+        dict cu cheia "status" sau "error"; la succes, "response" (select sau update cu valori
+        suprascrise) și, pentru update, "values" cu valorile noi ale câmpurilor incrementate.
     """
 
     # Parsăm textul JSON într-un obiect Python (dict)
@@ -434,28 +407,27 @@ def execute_db_action(supabase_client, json_text):
                 return {"error": "Missing data or conditions for update."}
 
             updates = {}
+            result = {"status": "success", "values": {}}
             for k, v in data.items():
                 # Verificăm dacă valoarea este un increment (ex: {"sum": {"increment": 100}})
                 if isinstance(v, dict) and "increment" in v:
-                    account = conditions.get("iban")
-
-                    # Citim valoarea curentă din DB pentru câmpul respectiv
-                    current_resp = supabase_client.table(table).select(k).eq("iban", account).execute()
-                    current_val = current_resp.data[0][k] if current_resp.data else 0
-
-                    # Aplicăm incrementul
-                    updates[k] = current_val + v["increment"]
+                    # Incrementul se face atomic în DB (un singur UPDATE), nu citire + scriere
+                    result["values"][k] = increment_value(supabase_client, table, k, conditions.get("iban"), v["increment"])
                 else:
                     # Altfel, doar suprascriem câmpul cu valoarea dată
                     updates[k] = v
 
-            # Facem UPDATE în Supabase cu noile valori
-            response = supabase_client.table(table).update(updates).eq(
-                list(conditions.keys())[0],   # coloana de filtrare (ex: "iban")
-                list(conditions.values())[0]  # valoarea de filtrare (ex: "RO...")
-            ).execute()
+            # Facem UPDATE în Supabase cu valorile suprascrise
+            if updates:
+                result["response"] = supabase_client.table(table).update(updates).eq(
+                    list(conditions.keys())[0],   # coloana de filtrare (ex: "iban")
+                    list(conditions.values())[0]  # valoarea de filtrare (ex: "RO...")
+                ).execute()
+            # directorul de conturi (fără solduri) se reîncarcă doar dacă s-a schimbat IBAN/bancă/companie
+            if table == "Accounts" and any(col in updates for col in DIRECTORY_COLUMNS):
+                invalidate_accounts()
 
-            return {"status": "success", "response": response}
+            return result
 
         # -----------------------------------------
         # OPERAȚIA DE SELECT
@@ -484,21 +456,21 @@ def execute_db_action(supabase_client, json_text):
 def get_all_account_balances(supabase_client):
     """Obține soldurile pentru toate conturile din baza de date."""
     try:
-        # Obține toate conturile din baza de date
-        result = supabase_client.table("Accounts").select("*").execute()
+        # Toate conturile cu soldul curent, într-o singură citire a tabelei
+        accounts = get_accounts_with_balances(supabase_client)
         
-        if not result.data:
+        if not accounts:
             return "❌ Nu există conturi în baza de date."
         
         # Construiește mesajul cu soldurile
         lines = ["📊 Soldurile pentru toate conturile:"]
         total_balance = 0.0
         
-        for i, account in enumerate(result.data, 1):
-            iban = account.get("iban", "")
-            banca = account.get("banca", "")
-            compania = account.get("compania", "")
-            sum_value = account.get("sum", 0.0)
+        for i, account in enumerate(accounts, 1):
+            iban = account.get("iban") or ""
+            banca = account.get("banca") or ""
+            compania = account.get("compania") or ""
+            sum_value = account.get("sum") or 0.0
             
             # Formatează numele contului
             if banca and compania:
@@ -533,81 +505,94 @@ def get_all_account_balances(supabase_client):
         print(f"Error getting all balances: {e}")
         return "❌ Eroare la obținerea soldurilor pentru toate conturile."
 
-def answer_request(message, profile_name, client, supabase_client):
+def answer_requests(message, profile_name, client, supabase_client):
+    """
+    Ca answer_request, dar pentru un text cu mai multe comenzi (ex. un mesaj vocal lung):
+    le execută pe rând, în ordinea dictată, și întoarce răspunsurile numerotate.
+    """
+    commands = split_commands(message)
+    if len(commands) == 1:
+        return answer_request(commands[0], profile_name, client, supabase_client)
+    return answer_commands(commands, profile_name, client, supabase_client)
+
+
+def answer_commands(commands, profile_name, client, supabase_client, first_number=1):
+    """
+    Execută comenzile pe rând și întoarce răspunsurile numerotate (de la `first_number`).
+    Dacă o comandă are nevoie de alegerea contului (pending action), ne oprim acolo: comenzile
+    rămase intră în payload-ul pending și sunt executate de try_resolve_pending după alegere,
+    altfel un al doilea pending l-ar șterge pe primul.
+    """
+    replies = []
+    for i, command in enumerate(commands):
+        number = first_number + i
+        batch = {"remaining_commands": commands[i + 1:], "next_number": number + 1, "pending": False}
+        reply = answer_request(command, profile_name, client, supabase_client, batch=batch)
+        replies.append(f"{number}) {command}\n{reply if isinstance(reply, str) else str(reply)}")
+        if batch["pending"] and batch["remaining_commands"]:
+            replies.append(f"⏸️ Încă {len(batch['remaining_commands'])} comenzi așteaptă; le execut după ce alegi contul.")
+            break
+    return "\n\n".join(replies)
+
+
+def answer_request(message, profile_name, client, supabase_client, batch=None):
+    """
+    `batch` (de la answer_commands): comenzile rămase din același mesaj; dacă salvăm un pending
+    action, le punem în payload și marcăm batch["pending"].
+    """
     import json, re
 
-    def get_normalized_mapping(supabase_client):
-        """Obține dicționare cu forma corectă a numelor de companii și bănci (pt. normalizare)."""
-        result = supabase_client.table("Accounts").select("compania,banca").execute()
-        company_mapping = {}
-        bank_mapping = {}
-        
-        for row in result.data or []:
-            # Normalizare companii
-            if row.get("compania"):
-                original = row["compania"]
-                normalized = original.lower().replace(" ", "")
-                company_mapping[normalized] = original
-            
-            # Normalizare bănci
-            if row.get("banca"):
-                original = row["banca"]
-                normalized = original.lower().replace(" ", "")
-                bank_mapping[normalized] = original
-        
-        return company_mapping, bank_mapping
+    def _save_pending(action_type, payload: dict):
+        if batch is not None:
+            payload["remaining_commands"] = batch["remaining_commands"]
+            payload["next_number"] = batch["next_number"]
+            batch["pending"] = True
+        save_pending_action(supabase_client, profile_name, action_type, payload)
 
     def _find_account_candidates(conditions: dict):
         """
         Returnează liste de candidați în formatul așteptat de try_resolve_pending:
         [{"iban","banca","compania"}]
+        Citește din directorul de conturi din memorie (services.account_cache).
         """
         conditions = conditions or {}
-        candidates = []
-
-        # 1) IBAN direct (cel mai sigur)
-        iban = (conditions.get("iban") or "").replace(" ", "").upper()
-        if iban:
-            res = supabase_client.table("Accounts").select("iban, banca, compania").eq("iban", iban).execute()
-            for r in res.data or []:
-                candidates.append({
-                    "iban": r["iban"],
-                    "banca": r.get("banca"),
-                    "compania": r.get("compania")
-                })
-            return candidates
-
-        # 2) Filtrare după banca/compania (dacă le avem)
-        q = supabase_client.table("Accounts").select("iban,banca,compania")
-        if conditions.get("banca"):
-            q = q.eq("banca", conditions["banca"])
-        if conditions.get("compania"):
-            q = q.eq("compania", conditions["compania"])
-        res = q.execute()
-        for r in res.data or []:
-            candidates.append({
-                "iban": r["iban"],
-                "banca": r.get("banca"),
-                "compania": r.get("compania")
-            })
-        return candidates
+
+        # 1) IBAN direct (cel mai sigur); altfel 2) filtrare după banca/compania (dacă le avem)
+        accounts = find_accounts(
+            supabase_client,
+            iban=conditions.get("iban"),
+            banca=conditions.get("banca"),
+            compania=conditions.get("compania"),
+        )
+        return [
+            {"iban": a["iban"], "banca": a.get("banca"), "compania": a.get("compania")}
+            for a in accounts
+        ]
 
     # === Ramură generică: "cât am cheltuit [perioadă?]" ===
     normalized_msg = (message or "").lower()
     if re.search(r"c(â|a)t\s+am\s+cheltuit", normalized_msg):
-        # 1) Parsează perioada cu LLM
-        now_iso = datetime.now(timezone.utc).replace(microsecond=0).isoformat()
-        period_prompt = get_period_parse_prompt(message, now_iso)
+        # 1) Parsează perioada local; LLM doar pentru expresiile nerecunoscute
+        period_obj = resolve_period(message)
+        if period_obj is not None:
+            print("⚡ Perioadă interpretată local:", period_obj)
+        else:
+            now_iso = datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+            period_prompt = get_period_parse_prompt(message, now_iso)
+            try:
+                period_json_text, _ = cached_llm_call(
+                    client, "gpt-5-mini", period_prompt, "period",
+                    [normalize_prompt_input(message), today_utc()]
+                )
+                period_obj = json.loads(period_json_text)
+            except Exception as e:
+                print("⚠️ Eroare la parsarea perioadei:", str(e))
+                period_obj = {}
+        start_iso = period_obj.get("start_iso")
+        end_iso = period_obj.get("end_iso")
         try:
-            period_resp = client.responses.create(model="gpt-5-mini", input=period_prompt)
-            period_json_text = period_resp.output_text.strip()
-            period_obj = json.loads(period_json_text)
-            start_iso = period_obj.get("start_iso")
-            end_iso = period_obj.get("end_iso")
             confidence = float(period_obj.get("confidence") or 0)
-        except Exception as e:
-            print("⚠️ Eroare la parsarea perioadei:", str(e))
-            start_iso = end_iso = None
+        except (TypeError, ValueError):
             confidence = 0
 
         if not start_iso or not end_iso or confidence < 0.5:
@@ -635,7 +620,7 @@ def answer_request(message, profile_name, client, supabase_client):
             total = compute_spent_sum(supabase_client, start_iso, end_iso, candidates[0]["iban"])
             return f"💸 Ai cheltuit {total:.2f} RON în perioada selectată ({mask_iban(candidates[0]['iban'])})."
 
-        save_pending_action(supabase_client, profile_name, "sum_spent", {
+        _save_pending("sum_spent", {
             "period": "custom",
             "start_iso": start_iso,
             "end_iso": end_iso,
@@ -643,11 +628,18 @@ def answer_request(message, profile_name, client, supabase_client):
         })
         return present_candidates_message_with_all("cont", candidates)
 
-    # === PROMPT GPT (rămâne al tău) ===
-    prompt = get_financial_command_prompt(message)
-    gpt_response = client.responses.create(model="gpt-5-mini", input=prompt)
-    json_text = gpt_response.output_text.strip()
-    print("🤖 Răspuns GPT:", json_text)
+    # === Comenzi simple interpretate local; PROMPT GPT doar dacă parserul nu e sigur ===
+    fast_action = parse_financial_command(message)
+    if fast_action is not None:
+        json_text = json.dumps(fast_action)
+        print("⚡ Comandă interpretată local:", json_text)
+    else:
+        prompt = get_financial_command_prompt(message)
+        started = time.monotonic()
+        json_text, from_cache = cached_llm_call(client, "gpt-5-mini", prompt, "command", normalize_prompt_input(message))
+        if not from_cache:
+            record_llm_latency(time.monotonic() - started)
+        print("🤖 Răspuns GPT:" if not from_cache else "🤖 Răspuns GPT (cache):", json_text)
 
     # === Post-procesare + normalizare companie și bancă ===
     try:
@@ -714,7 +706,7 @@ def answer_request(message, profile_name, client, supabase_client):
 
         if len(candidates) > 1:
             search_term = conditions.get("iban") or (f"{conditions.get('banca','')} {conditions.get('compania','')}".strip()) or "cont"
-            save_pending_action(supabase_client, profile_name, "add_trx", {
+            _save_pending("add_trx", {
                 "search_term": search_term,
                 "amount": amount_val,
                 "currency": currency,
@@ -735,19 +727,11 @@ def answer_request(message, profile_name, client, supabase_client):
             "description": data.get("description")  # Include description from GPT
         }
         try:
-            supabase_client.table("Transactions").insert(trx).execute()
-            
-            # Obținem soldul contului pentru a-l afișa în confirmare
-            try:
-                balance_result = supabase_client.table("Accounts").select("sum").eq("iban", target_iban).single().execute()
-                if balance_result.data:
-                    current_balance = balance_result.data["sum"]
-                    return f"✅ Tranzacție salvată: {trx['amount']:.2f} {trx['currency']} ({mask_iban(target_iban)}). Sold curent: {current_balance:.2f} RON."
-                else:
-                    return f"✅ Tranzacție salvată: {trx['amount']:.2f} {trx['currency']} ({mask_iban(target_iban)})."
-            except Exception as balance_error:
-                print(f"Error getting balance: {balance_error}")
-                return f"✅ Tranzacție salvată: {trx['amount']:.2f} {trx['currency']} ({mask_iban(target_iban)})."
+            # Soldul nou vine din același apel, pentru confirmare
+            current_balance = insert_transaction(supabase_client, trx)["balance"]
+            if current_balance is not None:
+                return f"✅ Tranzacție salvată: {trx['amount']:.2f} {trx['currency']} ({mask_iban(target_iban)}). Sold curent: {current_balance:.2f} RON."
+            return f"✅ Tranzacție salvată: {trx['amount']:.2f} {trx['currency']} ({mask_iban(target_iban)})."
         except Exception as e:
             print("⚠️ Eroare la insert Transactions (update-flow):", str(e))
             return f"❌ Eroare la salvarea tranzacției: {str(e)}"
@@ -768,7 +752,7 @@ def answer_request(message, profile_name, client, supabase_client):
             return f"❌ Nu găsesc niciun cont pentru «{search_term}». Trimite IBAN-ul sau un indiciu mai clar (bancă + companie)."
         if len(candidates) > 1:
             search_term = conditions.get("iban") or (f"{conditions.get('banca','')} {conditions.get('compania','')}".strip()) or "cont"
-            save_pending_action(supabase_client, profile_name, op, {
+            _save_pending(op, {
                 "search_term": search_term,
                 "amount": None,
                 "currency": "RON",
@@ -805,18 +789,11 @@ def answer_request(message, profile_name, client, supabase_client):
                     "account": conditions.get("iban"),
                     "description": data.get("data", {}).get("description")  # Include description from GPT
                 }
-                supabase_client.table("Transactions").insert(trx).execute()
-                # Obținem soldul contului pentru a-l afișa în confirmare
-                try:
-                    balance_result = supabase_client.table("Accounts").select("sum").eq("iban", trx['account']).single().execute()
-                    if balance_result.data:
-                        current_balance = balance_result.data["sum"]
-                        return f"✅ Tranzacție salvată: {trx['amount']:.2f} {trx['currency']} ({trx['account']}). Sold curent: {current_balance:.2f} RON."
-                    else:
-                        return f"✅ Tranzacție salvată: {trx['amount']:.2f} {trx['currency']} ({trx['account']})."
-                except Exception as balance_error:
-                    print(f"Error getting balance: {balance_error}")
-                    return f"✅ Tranzacție salvată: {trx['amount']:.2f} {trx['currency']} ({trx['account']})."
+                # Soldul nou vine din același apel, pentru confirmare
+                current_balance = insert_transaction(supabase_client, trx)["balance"]
+                if current_balance is not None:
+                    return f"✅ Tranzacție salvată: {trx['amount']:.2f} {trx['currency']} ({trx['account']}). Sold curent: {current_balance:.2f} RON."
+                return f"✅ Tranzacție salvată: {trx['amount']:.2f} {trx['currency']} ({trx['account']})."
             except Exception as e:
                 print("⚠️ Eroare la inserarea tranzacției text-only:", str(e))
                 return "⚠️ Sold actualizat, dar nu am reușit să salvez tranzacția."
@@ -0,0 +1,12 @@
+import os
+
+# Cât așteptăm la oprire ca fișierele aflate deja în coadă să fie procesate
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "60"))
+
+
+def worker_exit(server, worker):
+    """Golește coada de media înainte ca worker-ul să se oprească, apoi oprește pool-ul de procese."""
+    from services.media_queue import drain_media_queue
+    from services.cpu_pool import shutdown_cpu_pool
+    drain_media_queue(timeout=max(graceful_timeout - 5, 1))
+    shutdown_cpu_pool()
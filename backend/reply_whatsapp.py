@@ -5,12 +5,9 @@ import os
 from supabase import create_client, Client
 from dotenv import load_dotenv
 import os
-import requests
 from io import BytesIO
 from PIL import Image
-import requests
 import re
-from threading import Thread
 from twilio.rest import Client as TwilioRestClient
 from twilio.base.exceptions import TwilioRestException
 from flask import Response
@@ -20,9 +17,13 @@ import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'shared'))
 
-from doc_processing import extract_audio_text, process_image, answer_request, process_pdf
+from doc_processing import extract_audio_text, process_image, answer_request, answer_requests, answer_commands, process_pdf
 from services.pending import get_pending_action, clear_pending_action, present_candidates_message, present_candidates_message_with_all
-from services.db_utils import compute_spent_sum
+from services.db_utils import compute_spent_sum, compute_spent_summary, mask_iban, insert_transaction
+from services.account_cache import get_balances, normalize_iban
+from services.invoice_index import forget_transaction
+from services.media_queue import media_kind, submit_media_job
+from services.media_download import download_media, MediaError, IMAGE_EXTS
 
 load_dotenv(".env")
 
@@ -51,16 +52,17 @@ def respond_xml(message):
     print("=======================")
     return Response(twiml_str, status=200, mimetype="application/xml")
 
-def background_process_and_send(ext, sender, message, r, client, supabase_client):
+def background_process_and_send(ext, sender, message, media, client, supabase_client):
     """
     Procesează fișierul (poza/pdf/audio) și trimite rezultatul folosind Twilio REST API.
-    Rulare în background thread (nu blochează webhook-ul).
+    Rulare în background thread (nu blochează webhook-ul). `media` e bufferul descărcat
+    (services.media_download.MediaBuffer) și se închide la final.
     """
     try:
         # Apelează funcțiile tale existente pentru procesare
         if ext == "pdf":
             # Procesează PDF-ul pentru a extrage informațiile din bon
-            extracted_data = process_pdf(ext, sender, message, r, client, supabase_client)
+            extracted_data = process_pdf(ext, sender, message, media, client, supabase_client)
             
             # Dacă avem și mesaj text (ex: "contul bcr"), îl folosim pentru a determina contul
             if message.strip():
@@ -70,9 +72,9 @@ def background_process_and_send(ext, sender, message, r, client, supabase_client
             else:
                 result = extracted_data
                 
-        elif ext in ("jpg", "png", "gif"):
+        elif ext in IMAGE_EXTS:
             # Procesează imaginea pentru a extrage informațiile din bon
-            extracted_data = process_image(ext, sender, message, r, client, supabase_client)
+            extracted_data = process_image(ext, sender, message, media, client, supabase_client)
             
             # Dacă avem și mesaj text (ex: "contul bcr"), îl folosim pentru a determina contul
             if message.strip():
@@ -83,8 +85,9 @@ def background_process_and_send(ext, sender, message, r, client, supabase_client
                 result = extracted_data
                 
         elif ext == "audio":
-            audio_text = extract_audio_text(r, client)
-            result = answer_request(audio_text, extract_profile_from_whatsapp(sender), client, supabase_client)
+            audio_text = extract_audio_text(media, client)
+            # un mesaj vocal poate conține mai multe comenzi dictate una după alta
+            result = answer_requests(audio_text, extract_profile_from_whatsapp(sender), client, supabase_client)
         else:
             result = "❌ Tip media necunoscut."
 
@@ -92,6 +95,8 @@ def background_process_and_send(ext, sender, message, r, client, supabase_client
         import traceback
         traceback.print_exc()
         result = f"❌ Eroare la procesare: {e}"
+    finally:
+        media.close()
 
     # asigură-te că e string
     if not isinstance(result, str):
@@ -100,14 +105,32 @@ def background_process_and_send(ext, sender, message, r, client, supabase_client
         except:
             result = "❌ Eroare la pregătirea rezultatului."
 
-    # trimite mesajul outbound via Twilio REST (dacă nu depășim limita zilnică)
+    send_whatsapp(sender, result)
+
+
+def background_answer_commands(sender, commands, first_number, client, supabase_client):
+    """
+    Execută comenzile dictate rămase (după alegerea contului) și trimite răspunsul prin Twilio REST.
+    Rulează în coada "commands": pot fi mai multe apeluri LLM, prea lente pentru răspunsul webhook-ului.
+    """
+    try:
+        result = answer_commands(commands, extract_profile_from_whatsapp(sender), client, supabase_client, first_number)
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        result = f"❌ Eroare la procesare: {e}"
+    send_whatsapp(sender, result)
+
+
+def send_whatsapp(to, body):
+    """Trimite un mesaj outbound via Twilio REST (dacă nu depășim limita zilnică)."""
     try:
         twilio_rest.messages.create(
-            body=result,
+            body=body,
             from_=TWILIO_WHATSAPP_FROM,
-            to=sender
+            to=to
         )
-        print("Outbound message sent to", sender)
+        print("Outbound message sent to", to)
     except TwilioRestException as e:
         # 63038: sandbox daily messages limit
         if getattr(e, "code", None) == 63038 or "63038" in str(e):
@@ -121,6 +144,33 @@ def extract_profile_from_whatsapp(from_value: str) -> str:
     # Twilio trimite 'whatsapp:+40...'
     return from_value
 
+def format_balance(account, iban: str, banca: str = "", compania: str = "") -> str:
+    """Mesajul cu soldul unui cont (sau eroarea, dacă nu l-am găsit)."""
+    if not account:
+        return "❌ Eroare la obținerea soldului."
+    account_name = f"{banca} - {compania}".strip(" -")
+    if not account_name:
+        account_name = iban
+    balance = float(account.get('sum') or 0.0)  # sum poate fi NULL pentru un cont nou
+    return f"📊 Sold cont {account_name}: {balance:.2f} RON."
+
+
+def get_account_balances(supabase: Client, candidates) -> list:
+    """
+    Soldurile pentru mai multe conturi ([{"iban","banca","compania"}]) cu o singură citire
+    (un query `in_` în baza de date), în ordinea primită.
+    """
+    try:
+        balances = get_balances(supabase, [c["iban"] for c in candidates])
+    except Exception as e:
+        print(f"Error getting account balances: {e}")
+        return ["❌ Eroare la obținerea soldului." for _ in candidates]
+    return [
+        format_balance(balances.get(normalize_iban(c["iban"])), c["iban"], c.get("banca", ""), c.get("compania", ""))
+        for c in candidates
+    ]
+
+
 def get_account_balance(supabase: Client, iban: str, banca: str = "", compania: str = "") -> str:
     """
     Get account balance for a specific IBAN.
@@ -134,26 +184,31 @@ def get_account_balance(supabase: Client, iban: str, banca: str = "", compania:
     Returns:
         Formatted balance string or error message
     """
-    try:
-        result = supabase.table("Accounts").select("sum").eq("iban", iban).single().execute()
-        if result.data:
-            bal = result.data["sum"]
-            account_name = f"{banca} - {compania}".strip(" -")
-            if not account_name:
-                account_name = iban
-            return f"📊 Sold cont {account_name}: {bal:.2f} RON."
-        else:
-            return "❌ Eroare la obținerea soldului."
-    except Exception as e:
-        print(f"Error getting account balance: {e}")
-        return "❌ Eroare la obținerea soldului."
+    return get_account_balances(supabase, [{"iban": iban, "banca": banca, "compania": compania}])[0]
 
 def try_resolve_pending(supabase, profile_name, message_text):
     pending = get_pending_action(supabase, profile_name)
-    # print("Pending action for", profile_name, ":", pending)
     if not pending:
         return None  # nimic de rezolvat
 
+    reply = resolve_pending(supabase, profile_name, message_text, pending)
+
+    # comenzile dictate după cea care a cerut alegerea contului (answer_commands) continuă acum,
+    # dar doar dacă alegerea a fost făcută (pending-ul a fost șters), nu la re-afișarea opțiunilor.
+    # Rulează în fundal (pot fi mai multe apeluri LLM): webhook-ul trebuie să răspundă în 15s,
+    # altfel Twilio retrimite mesajul și comenzile ar fi executate de două ori.
+    remaining = pending["payload"].get("remaining_commands") or []
+    if remaining and get_pending_action(supabase, profile_name) is None:
+        next_number = pending["payload"].get("next_number", 1)
+        if submit_media_job("commands", background_answer_commands, profile_name, remaining, next_number, client, supabase):
+            reply = f"{reply}\n\n⏳ Execut acum celelalte {len(remaining)} comenzi; îți trimit rezultatul în curând."
+        else:
+            listed = "\n".join(f"{next_number + i}) {command}" for i, command in enumerate(remaining))
+            reply = f"{reply}\n\n⏳ Sunt ocupat acum; retrimite comenzile rămase în câteva minute:\n{listed}"
+    return reply
+
+
+def resolve_pending(supabase, profile_name, message_text, pending):
     payload = pending["payload"]
     candidates = payload["candidates"]
     op = pending["action_type"]
@@ -177,9 +232,7 @@ def try_resolve_pending(supabase, profile_name, message_text):
                 if 0 <= zero_based < len(candidates):
                     multi_selected.append(candidates[zero_based])
             if multi_selected:
-                responses = []
-                for candidate in multi_selected:
-                    responses.append(get_account_balance(supabase, candidate["iban"], candidate.get("banca", ""), candidate.get("compania", "")))
+                responses = get_account_balances(supabase, multi_selected)
                 clear_pending_action(supabase, profile_name)
                 return "\n".join(responses)
         elif len(idxs) == 1:
@@ -244,18 +297,17 @@ def try_resolve_pending(supabase, profile_name, message_text):
         
         print("Inserting transaction:", trx)
         try:
-            result = supabase.table("Transactions").insert(trx).execute()
-            if not result.data:
+            saved = insert_transaction(supabase, trx)
+            if not saved["transaction"]:
                 raise Exception("No data returned from insert")
         except Exception as e:
             print("Error inserting transaction:", str(e))
             clear_pending_action(supabase, profile_name)
             return f"❌ Eroare la salvarea tranzacției: {str(e)}"
         
-        # Actualizăm soldul contului
-        result = supabase.table("Accounts").select("sum").eq("iban", selected["iban"]).single().execute()
-        if result.data:
-            bal = result.data["sum"]
+        # Soldul nou al contului vine din același apel
+        bal = saved["balance"]
+        if bal is not None:
             clear_pending_action(supabase, profile_name)
             return f"✅ Am adăugat {float(amount):.2f} {currency} în contul {selected['banca']} - {selected['compania']}. Sold curent: {bal:.2f}."
         else:
@@ -278,9 +330,12 @@ def try_resolve_pending(supabase, profile_name, message_text):
         start_iso = payload.get("start_iso")
         end_iso = payload.get("end_iso")
         if selected == "ALL":
-            total = compute_spent_sum(supabase, start_iso, end_iso, None)
+            summary = compute_spent_summary(supabase, start_iso, end_iso, None)
             clear_pending_action(supabase, profile_name)
-            return f"💸 Ai cheltuit {total:.2f} RON în total în perioada selectată (toate conturile)."
+            lines = [f"💸 Ai cheltuit {summary['total']:.2f} RON în total în perioada selectată (toate conturile, {summary['count']} plăți)."]
+            for iban, spent in sorted(summary["by_account"].items(), key=lambda item: -item[1]):
+                lines.append(f"  • {mask_iban(iban)}: {spent:.2f} RON")
+            return "\n".join(lines)
         else:
             total = compute_spent_sum(supabase, start_iso, end_iso, selected["iban"])
             clear_pending_action(supabase, profile_name)
@@ -301,22 +356,12 @@ def try_resolve_pending(supabase, profile_name, message_text):
                 "account": target_iban,
                 "description": payload.get("description")  # Include description from pending action
             }
-            supabase.table("Transactions").insert(trx).execute()
-            
-            # Obținem soldul contului pentru a-l afișa în confirmare
-            try:
-                balance_result = supabase.table("Accounts").select("sum").eq("iban", target_iban).single().execute()
-                if balance_result.data:
-                    current_balance = balance_result.data["sum"]
-                    clear_pending_action(supabase, profile_name)
-                    return f"✅ Tranzacție salvată: {trx['amount']:.2f} {trx['currency']} ({target_iban}). Sold curent: {current_balance:.2f} RON."
-                else:
-                    clear_pending_action(supabase, profile_name)
-                    return f"✅ Tranzacție salvată: {trx['amount']:.2f} {trx['currency']} ({target_iban})."
-            except Exception as balance_error:
-                print(f"Error getting balance: {balance_error}")
-                clear_pending_action(supabase, profile_name)
-                return f"✅ Tranzacție salvată: {trx['amount']:.2f} {trx['currency']} ({target_iban})."
+            # Soldul nou vine din același apel, pentru confirmare
+            current_balance = insert_transaction(supabase, trx)["balance"]
+            clear_pending_action(supabase, profile_name)
+            if current_balance is not None:
+                return f"✅ Tranzacție salvată: {trx['amount']:.2f} {trx['currency']} ({target_iban}). Sold curent: {current_balance:.2f} RON."
+            return f"✅ Tranzacție salvată: {trx['amount']:.2f} {trx['currency']} ({target_iban})."
         except Exception as e:
             clear_pending_action(supabase, profile_name)
             return f"❌ Eroare la salvarea tranzacției: {str(e)}"
@@ -339,6 +384,7 @@ def undo_last_transaction(supabase, profile_name):
     amount = float(last["amount"])
     # 2. Șterge tranzacția
     supabase.table("Transactions").delete().eq("id", last["id"]).execute()
+    forget_transaction(last)
     # 3. Aplică operația inversă în Accounts
     account = supabase.table("Accounts").select("sum").eq("iban", iban).single().execute()
     if not account.data:
@@ -346,6 +392,11 @@ def undo_last_transaction(supabase, profile_name):
 
     return f"✅ Tranzacția de {amount:.2f} RON a fost anulată, soldul contului a fost actualizat."
 
+UNDO_KEYWORDS = ["undo", "anuleaza", "anulează", "sterge ultima", "șterge ultima", "retrag ultima tranzactie", "retrag ultima tranzacție"]
+
+def is_undo_request(msg):
+    return bool(msg.strip()) and any(kw in msg.lower() for kw in UNDO_KEYWORDS)
+
 def is_new_intent(msg):
     keywords = [
         "plătesc", "am plătit", "plata", "sold", "cât am", "extras", "raport", "transfer", "cheltuit", "vreau să transfer", "am primit"
@@ -363,7 +414,7 @@ def reply_whatsapp():
         num_media = int(request.values.get('NumMedia', 0))
         profile_name = extract_profile_from_whatsapp(sender)
         # Detectează undo
-        if message.strip() and any(kw in message.lower() for kw in ["undo", "anuleaza", "anulează", "sterge ultima", "șterge ultima", "retrag ultima tranzactie", "retrag ultima tranzacție"]):
+        if is_undo_request(message):
             resp = undo_last_transaction(supabase, profile_name)
             return respond_xml(resp)
         if message:
@@ -380,26 +431,22 @@ def reply_whatsapp():
         media_type = request.values.get('MediaContentType0', '') or ''
 
         if media_url:
-            r = requests.get(media_url, auth=(TWILIO_SID, TWILIO_AUTH), timeout=20)
-            if r.status_code != 200:
-                return respond_xml(f"❌ Eroare la descărcare media: {r.status_code}")
-
-            # detectare ext
-            content_type = (media_type or r.headers.get("Content-Type", "")).lower()
-            ext = None
-            if "pdf" in content_type: ext = "pdf"
-            elif "jpeg" in content_type or "jpg" in content_type: ext = "jpg"
-            elif "png" in content_type: ext = "png"
-            elif "gif" in content_type: ext = "gif"
-            elif "ogg" in content_type or "wav" in content_type or "mpeg" in content_type or "mp3" in content_type:
-                ext = "audio"
-
-            # pornește background thread și ACK imediat
-            Thread(
-                target=background_process_and_send,
-                args=(ext, sender, message, r, client, supabase),
-                daemon=True
-            ).start()
+            # descărcare în flux într-un singur buffer, cu limită de mărime și detectarea tipului din primii octeți
+            try:
+                media = download_media(media_url, auth=(TWILIO_SID, TWILIO_AUTH), declared_type=media_type)
+            except MediaError as e:
+                return respond_xml(f"❌ {e}")
+
+            ext = media.ext
+            kind = media_kind(ext)
+            if kind is None:
+                media.close()
+                return respond_xml("❌ Tip media necunoscut.")
+
+            # pune procesarea în coada tipului de media și ACK imediat
+            if not submit_media_job(kind, background_process_and_send, ext, sender, message, media, client, supabase):
+                media.close()
+                return respond_xml("⏳ Procesez deja multe fișiere. Te rog retrimite-l în câteva minute.")
 
             return respond_xml("✅ Am primit fișierul și îl procesez. Vei primi rezultatul în curând.")
         
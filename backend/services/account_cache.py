@@ -0,0 +1,157 @@
+import os
+import time
+from threading import Lock
+
+
+# Cât timp (secunde) considerăm valid directorul de conturi încărcat în memorie.
+# Directorul ține doar iban/bancă/companie; soldurile (sum) se citesc mereu din DB, pentru că
+# invalidate_accounts() golește doar workerul curent, iar ceilalți workeri gunicorn ar arăta un sold vechi.
+ACCOUNT_CACHE_TTL = float(os.getenv("ACCOUNT_CACHE_TTL", "60"))
+
+_lock = Lock()
+_directory = {
+    "loaded_at": None,
+    "accounts": [],
+    "by_iban": {},
+    "company_mapping": {},
+    "bank_mapping": {},
+}
+# Coloanele din director: doar modificarea lor (nu a soldului) cere reîncărcarea directorului
+DIRECTORY_COLUMNS = ("iban", "banca", "compania")
+
+_stats = {"hits": 0, "misses": 0, "invalidations": 0, "loads": 0, "batch_queries": 0}
+
+
+def normalize_name(name: str) -> str:
+    """Forma normalizată a unui nume de bancă/companie (lowercase, fără spații)."""
+    return (name or "").lower().replace(" ", "")
+
+
+def normalize_iban(iban: str) -> str:
+    return (iban or "").replace(" ", "").upper()
+
+
+def _build_directory(rows):
+    """Construiește indexurile directorului din rândurile tabelei Accounts (fără sold)."""
+    accounts = []
+    by_iban = {}
+    company_mapping = {}
+    bank_mapping = {}
+
+    for row in rows:
+        account = {
+            "iban": row.get("iban"),
+            "banca": row.get("banca"),
+            "compania": row.get("compania"),
+        }
+        accounts.append(account)
+        if account["iban"]:
+            by_iban[normalize_iban(account["iban"])] = account
+        if account["compania"]:
+            company_mapping[normalize_name(account["compania"])] = account["compania"]
+        if account["banca"]:
+            bank_mapping[normalize_name(account["banca"])] = account["banca"]
+
+    return {
+        "loaded_at": time.monotonic(),
+        "accounts": accounts,
+        "by_iban": by_iban,
+        "company_mapping": company_mapping,
+        "bank_mapping": bank_mapping,
+    }
+
+
+def _load_directory(supabase_client):
+    """Citește o singură dată tabela Accounts și construiește indexurile."""
+    result = supabase_client.table("Accounts").select("iban,banca,compania").execute()
+    return _build_directory(result.data or [])
+
+
+def _account_with_balance(row):
+    return {
+        "iban": row.get("iban"),
+        "banca": row.get("banca"),
+        "compania": row.get("compania"),
+        "sum": row.get("sum"),
+    }
+
+
+def _get_directory(supabase_client):
+    global _directory
+    with _lock:
+        loaded_at = _directory["loaded_at"]
+        if loaded_at is not None and time.monotonic() - loaded_at < ACCOUNT_CACHE_TTL:
+            _stats["hits"] += 1
+            return _directory
+        _stats["misses"] += 1
+        # reîncărcăm sub lock ca să nu pornim mai multe citiri simultane ale tabelei
+        _directory = _load_directory(supabase_client)
+        _stats["loads"] += 1
+        return _directory
+
+
+def invalidate_accounts():
+    """Marchează directorul ca expirat (după ce se schimbă IBAN-ul, banca sau compania unui cont)."""
+    with _lock:
+        _directory["loaded_at"] = None
+        _stats["invalidations"] += 1
+
+
+def get_accounts_with_balances(supabase_client):
+    """
+    Toate conturile cu soldul curent din DB: [{"iban","banca","compania","sum"}], într-o singură citire.
+    Tot din ea reîmprospătăm și directorul din memorie.
+    """
+    global _directory
+    result = supabase_client.table("Accounts").select("iban,banca,compania,sum").execute()
+    rows = result.data or []
+    with _lock:
+        _directory = _build_directory(rows)
+        _stats["loads"] += 1
+    return [_account_with_balance(row) for row in rows]
+
+
+def get_balances(supabase_client, ibans):
+    """
+    Conturile (cu soldul curent din DB) pentru mai multe IBAN-uri, cu un singur query `in_("iban", ...)`.
+    Returnează {iban normalizat: {"iban","banca","compania","sum"}}; IBAN-urile inexistente lipsesc.
+    """
+    originals = {normalize_iban(iban): iban for iban in ibans if iban}
+    if not originals:
+        return {}
+    # IBAN-ul exact din tabelă (cu spațiile lui) vine din director, ca `in_` să-l găsească oricum a fost tastat
+    by_iban = _get_directory(supabase_client)["by_iban"]
+    stored = [by_iban[iban]["iban"] if iban in by_iban else raw for iban, raw in originals.items()]
+    with _lock:
+        _stats["batch_queries"] += 1
+    result = supabase_client.table("Accounts").select("iban,banca,compania,sum").in_("iban", stored).execute()
+    return {normalize_iban(row.get("iban")): _account_with_balance(row) for row in result.data or []}
+
+
+def find_accounts(supabase_client, iban: str = None, banca: str = None, compania: str = None):
+    """Filtrează conturile după IBAN sau după bancă/companie (potrivire exactă, ca în query-urile Supabase)."""
+    directory = _get_directory(supabase_client)
+    if iban:
+        account = directory["by_iban"].get(normalize_iban(iban))
+        return [account] if account else []
+    return [
+        a for a in directory["accounts"]
+        if (not banca or a["banca"] == banca) and (not compania or a["compania"] == compania)
+    ]
+
+
+def get_normalized_mapping(supabase_client):
+    """Obține dicționare cu forma corectă a numelor de companii și bănci (pt. normalizare)."""
+    directory = _get_directory(supabase_client)
+    return dict(directory["company_mapping"]), dict(directory["bank_mapping"])
+
+
+def get_account_cache_stats():
+    with _lock:
+        loaded_at = _directory["loaded_at"]
+        return {
+            **_stats,
+            "accounts": len(_directory["accounts"]),
+            "age_seconds": round(time.monotonic() - loaded_at, 1) if loaded_at is not None else None,
+            "ttl_seconds": ACCOUNT_CACHE_TTL,
+        }
@@ -0,0 +1,181 @@
+"""
+Pregătirea mesajelor vocale înainte de transcriere (ffmpeg):
+decodare din orice format (ogg/opus, amr, m4a, mp3, wav), mono, 16 kHz, fără liniștea
+de la început și de la sfârșit, tăiat la AUDIO_MAX_SECONDS, recodat ca ogg/opus la bitrate mic.
+Fișierul urcat la OpenAI e mai mic și mai scurt; câștigul (octeți, secunde) e logat per mesaj.
+Mesajele lungi se împart în bucăți de cel mult AUDIO_CHUNK_SECONDS, tăiate în pauzele de vorbire.
+"""
+
+import io
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from threading import Lock
+
+
+AUDIO_PREP = os.getenv("AUDIO_PREP", "1") == "1"
+FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
+AUDIO_MAX_SECONDS = float(os.getenv("AUDIO_MAX_SECONDS", "180"))
+AUDIO_SAMPLE_RATE = 16000
+AUDIO_BITRATE = os.getenv("AUDIO_BITRATE", "24k")
+SILENCE_THRESHOLD = os.getenv("AUDIO_SILENCE_THRESHOLD", "-45dB")
+FFMPEG_TIMEOUT = float(os.getenv("FFMPEG_TIMEOUT", "30"))
+AUDIO_CHUNK_SECONDS = float(os.getenv("AUDIO_CHUNK_SECONDS", "30"))
+AUDIO_CHUNK_MIN_SECONDS = 5.0       # nu tăiem bucăți mai scurte de atât
+PAUSE_THRESHOLD = "-35dB"
+PAUSE_MIN_SECONDS = 0.4
+
+# liniștea de la început se taie direct; pentru sfârșit inversăm semnalul, tăiem și îl inversăm la loc
+TRIM_FILTER = (
+    f"silenceremove=start_periods=1:start_threshold={SILENCE_THRESHOLD}:start_silence=0.2,"
+    "areverse,"
+    f"silenceremove=start_periods=1:start_threshold={SILENCE_THRESHOLD}:start_silence=0.2,"
+    "areverse"
+)
+
+_lock = Lock()
+_stats = {"notes": 0, "failures": 0, "truncated": 0, "chunks": 0, "bytes_in": 0, "bytes_out": 0, "seconds_in": 0.0, "seconds_out": 0.0}
+
+
+class PreparedAudio:
+    """Audio gata de urcat: fișier ogg/opus în memorie plus duratele înainte/după."""
+
+    def __init__(self, data: bytes, seconds_in: float, seconds_out: float, bytes_in: int):
+        self.file = io.BytesIO(data)
+        self.format = "ogg"
+        self.size = len(data)
+        self.seconds_in = seconds_in
+        self.seconds_out = seconds_out
+        self.bytes_in = bytes_in
+        self.truncated = seconds_in - seconds_out > 0.5 and seconds_out >= AUDIO_MAX_SECONDS - 0.5
+
+
+def ffmpeg_available() -> bool:
+    return shutil.which(FFMPEG_BIN) is not None
+
+
+def _parse_seconds(value: str) -> float:
+    hours, minutes, seconds = value.split(":")
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def _ffmpeg_cmd(path: str):
+    return [
+        FFMPEG_BIN, "-hide_banner", "-nostdin", "-i", path,
+        "-vn", "-ac", "1", "-ar", str(AUDIO_SAMPLE_RATE),
+        "-af", TRIM_FILTER, "-t", str(AUDIO_MAX_SECONDS),
+        "-c:a", "libopus", "-b:a", AUDIO_BITRATE, "-application", "voip",
+        "-f", "ogg", "pipe:1",
+    ]
+
+
+def prepare_audio(data: bytes):
+    """PreparedAudio pentru conținutul unui mesaj vocal sau None dacă ffmpeg lipsește/eșuează."""
+    if not AUDIO_PREP or not ffmpeg_available():
+        return None
+    try:
+        # din fișier (nu din pipe), ca ffmpeg să poată citi durata originală din container
+        with tempfile.NamedTemporaryFile(suffix=".audio") as tmp:
+            tmp.write(data)
+            tmp.flush()
+            proc = subprocess.run(_ffmpeg_cmd(tmp.name), capture_output=True, timeout=FFMPEG_TIMEOUT)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        print("⚠️ ffmpeg a eșuat, trimit audio original:", str(e))
+        with _lock:
+            _stats["failures"] += 1
+        return None
+    stderr = proc.stderr.decode("utf-8", "replace")
+    if proc.returncode != 0 or not proc.stdout:
+        print("⚠️ ffmpeg a eșuat, trimit audio original:", stderr.strip().splitlines()[-1:] or proc.returncode)
+        with _lock:
+            _stats["failures"] += 1
+        return None
+
+    # durata intrării din antetul afișat de ffmpeg, durata ieșirii din ultima linie de progres
+    duration = re.search(r"Duration: (\d+:\d+:[\d.]+)", stderr)
+    progress = re.findall(r"time=(\d+:\d+:[\d.]+)", stderr)
+    seconds_in = _parse_seconds(duration.group(1)) if duration else 0.0
+    seconds_out = _parse_seconds(progress[-1]) if progress else seconds_in
+    prepared = PreparedAudio(proc.stdout, seconds_in, seconds_out, len(data))
+
+    with _lock:
+        _stats["notes"] += 1
+        _stats["truncated"] += int(prepared.truncated)
+        _stats["bytes_in"] += len(data)
+        _stats["bytes_out"] += prepared.size
+        _stats["seconds_in"] += seconds_in
+        _stats["seconds_out"] += seconds_out
+    print(
+        f"🎙️ Audio pregătit: {len(data)} → {prepared.size} octeți, {seconds_in:.1f}s → {seconds_out:.1f}s"
+        + (f" (tăiat la {AUDIO_MAX_SECONDS:.0f}s)" if prepared.truncated else "")
+    )
+    return prepared
+
+
+def _pauses(path: str):
+    """Mijlocul fiecărei pauze (secunde) găsite de filtrul silencedetect."""
+    proc = subprocess.run(
+        [FFMPEG_BIN, "-hide_banner", "-nostdin", "-i", path,
+         "-af", f"silencedetect=noise={PAUSE_THRESHOLD}:d={PAUSE_MIN_SECONDS}", "-f", "null", "-"],
+        capture_output=True, timeout=FFMPEG_TIMEOUT,
+    )
+    stderr = proc.stderr.decode("utf-8", "replace")
+    starts = [float(x) for x in re.findall(r"silence_start: ([\d.]+)", stderr)]
+    ends = [float(x) for x in re.findall(r"silence_end: ([\d.]+)", stderr)]
+    return [(a + b) / 2 for a, b in zip(starts, ends)]
+
+
+def _cut_points(pauses, total: float, max_len: float = AUDIO_CHUNK_SECONDS):
+    """Alege pauzele la care tăiem, astfel încât nicio bucată să nu depășească `max_len`."""
+    cuts = []
+    start = 0.0
+    while total - start > max_len:
+        window = [p for p in pauses if start < p <= start + max_len]
+        preferred = [p for p in window if p >= start + AUDIO_CHUNK_MIN_SECONDS]
+        # cea mai târzie pauză din fereastră; dacă vorbitorul nu face nicio pauză, tăiem fix la max_len
+        cut = (preferred or window or [start + max_len])[-1]
+        cuts.append(round(cut, 3))
+        start = cut
+    return cuts
+
+
+def split_audio(prepared: PreparedAudio) -> list:
+    """Bucățile (ogg/opus, în ordine) ale unui mesaj pregătit; un singur element dacă e scurt."""
+    data = prepared.file.getvalue()
+    if prepared.seconds_out <= AUDIO_CHUNK_SECONDS:
+        return [data]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "voice.ogg")
+        with open(path, "wb") as f:
+            f.write(data)
+        try:
+            cuts = _cut_points(_pauses(path), prepared.seconds_out)
+            subprocess.run(
+                [FFMPEG_BIN, "-hide_banner", "-nostdin", "-loglevel", "error", "-i", path, "-c", "copy",
+                 "-f", "segment", "-segment_times", ",".join(map(str, cuts)), os.path.join(tmpdir, "chunk%03d.ogg")],
+                capture_output=True, timeout=FFMPEG_TIMEOUT, check=True,
+            )
+        except (OSError, subprocess.SubprocessError) as e:
+            print("⚠️ Nu am putut împărți audio, îl trimit întreg:", str(e))
+            return [data]
+        chunks = []
+        for name in sorted(n for n in os.listdir(tmpdir) if n.startswith("chunk")):
+            with open(os.path.join(tmpdir, name), "rb") as f:
+                chunks.append(f.read())
+    with _lock:
+        _stats["chunks"] += len(chunks)
+    print(f"🎙️ Audio de {prepared.seconds_out:.0f}s împărțit în {len(chunks)} bucăți (tăieturi la {cuts})")
+    return chunks or [data]
+
+
+def get_audio_prep_stats():
+    with _lock:
+        stats = dict(_stats)
+    stats["bytes_saved"] = stats["bytes_in"] - stats["bytes_out"]
+    stats["seconds_saved"] = round(stats["seconds_in"] - stats["seconds_out"], 1)
+    stats["seconds_in"] = round(stats["seconds_in"], 1)
+    stats["seconds_out"] = round(stats["seconds_out"], 1)
+    stats["ffmpeg"] = ffmpeg_available()
+    return stats
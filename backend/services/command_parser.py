@@ -0,0 +1,245 @@
+"""
+Interpretare locală (fără LLM) a comenzilor financiare simple, ex.:
+  "am plătit 100 lei din BCR", "am primit 300 RON în BT Dinergy AI", "sold BT Dinergy AI".
+
+Produce același JSON ca `get_financial_command_prompt`. Dacă mesajul nu e clar
+(mai multe sume, direcție ambiguă, negație, altă monedă decât lei/RON etc.) returnează None
+și se apelează LLM-ul.
+"""
+
+import re
+import unicodedata
+from threading import Lock
+
+from reference_data import COMPANIES_CANONICAL, BANKS_CANONICAL
+
+
+def strip_diacritics(text: str) -> str:
+    text = (text or "").replace("ş", "ș").replace("ţ", "ț").replace("Ş", "Ș").replace("Ţ", "Ț")
+    return "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+
+
+def _norm(text: str) -> str:
+    return re.sub(r"\s+", " ", strip_diacritics(text).lower()).strip()
+
+
+# Prescurtări uzuale → numele canonic din reference_data
+BANK_ALIASES = {
+    "bt": "Banca Transilvania",
+    "transilvania": "Banca Transilvania",
+    "ing": "ING Bank",
+    "raiffeisen": "Raiffeisen Bank",
+    "unicredit": "UniCredit Bank",
+    "cec": "CEC Bank",
+    "alpha": "Alpha Bank",
+    "otp": "OTP Bank",
+    "libra": "Libra Internet Bank",
+    "vista": "Vista Bank",
+    "patria": "Patria Bank",
+    "garanti": "Garanti BBVA",
+    "intesa": "Intesa Sanpaolo Bank",
+    "tbi": "TBI Bank",
+    "exim": "Exim Banca Românească",
+    "first bank": "First Bank",
+}
+
+OUT_PATTERNS = [
+    r"\bam platit\b", r"\bplatesc\b", r"\bam facut o plata\b", r"\bam achitat\b", r"\bam retras\b",
+    r"\bam transferat\b", r"\bam cheltuit\b", r"\bam scos\b", r"\bam trimis\b",
+    r"\bi paid\b", r"\bpaid\b", r"\bspent\b", r"\bwithdrew\b", r"\btransferred\b", r"\bsent\b",
+]
+IN_PATTERNS = [
+    r"\bam primit\b", r"\bam incasat\b", r"\bam depus\b", r"\bmi-?au intrat\b", r"\bau intrat\b",
+    r"\bam adaugat\b", r"\badauga\b", r"\bam alimentat\b",
+    r"\breceived\b", r"\bdeposited\b", r"\bgot paid\b", r"\badd\b",
+]
+BALANCE_PATTERNS = [
+    r"\bsold\w*\b", r"\bcati bani\b", r"\bcat am in\b", r"\bbalanta\b", r"\bdisponibil\b",
+    r"\bbalance\b", r"\bhow much money\b",
+]
+# Cuvinte care fac mesajul ambiguu pentru parserul local (negații, condiționale, intenții viitoare)
+UNSAFE_PATTERNS = [
+    r"\bnu\b", r"\bnot\b", r"\bdaca\b", r"\bif\b", r"\bvreau sa\b", r"\bo sa\b", r"\bvoi\b", r"\bwill\b",
+]
+
+IBAN_RE = re.compile(r"\b[A-Z]{2}\d{2}(?:\s?[A-Z0-9]{4}){3,7}(?:\s?[A-Z0-9]{1,4})?\b", re.IGNORECASE)
+AMOUNT_RE = re.compile(
+    r"(?<![\w.,])(\d{1,3}(?:[.\s]\d{3})+(?:,\d{1,2})?|\d{1,3}(?:,\d{3})+(?:\.\d{1,2})?|\d+(?:[.,]\d{1,2})?)(?![\w.,]*\d)"
+    r"\s*(lei|ron|eur|euro|usd|dolari|€|\$)?",
+    re.IGNORECASE,
+)
+# Conturile sunt în lei: o sumă în altă monedă nu poate fi adunată direct la sold
+LOCAL_CURRENCIES = ("lei", "ron")
+FOREIGN_CURRENCY_RE = re.compile(r"\b(?:eur|euro|usd|dolari|dollars?|gbp|lire)\b|€|\$")
+
+_lock = Lock()
+_stats = {"fast_path_hits": 0, "llm_fallbacks": 0, "llm_seconds_total": 0.0}
+
+
+def parse_amount(raw: str) -> float:
+    """Convertește "1.234,56" / "1,234.56" / "1 234" / "100,5" într-un float."""
+    raw = raw.replace(" ", "")
+    if "," in raw and "." in raw:
+        # separatorul zecimal e ultimul apărut
+        if raw.rfind(",") > raw.rfind("."):
+            raw = raw.replace(".", "").replace(",", ".")
+        else:
+            raw = raw.replace(",", "")
+    elif "," in raw:
+        head, _, tail = raw.rpartition(",")
+        raw = raw.replace(",", "") if len(tail) == 3 else f"{head.replace(',', '')}.{tail}"
+    elif raw.count(".") == 1 and len(raw.rpartition(".")[2]) == 3:
+        raw = raw.replace(".", "")
+    elif raw.count(".") > 1:
+        raw = raw.replace(".", "")
+    return float(raw)
+
+
+def _match_bank(text: str):
+    names = {_norm(b): b for b in BANKS_CANONICAL}
+    names.update({alias: canonical for alias, canonical in BANK_ALIASES.items()})
+    found = {canonical for alias, canonical in names.items() if re.search(rf"\b{re.escape(alias)}\b", text)}
+    return found
+
+
+def _match_company(text: str):
+    found = set()
+    for company in sorted(COMPANIES_CANONICAL, key=len, reverse=True):
+        if re.search(rf"\b{re.escape(_norm(company))}\b", text):
+            # "dinergy digital assets" nu trebuie să se potrivească și ca "dinergy digital"
+            if not any(_norm(company) in _norm(other) for other in found):
+                found.add(company)
+    return found
+
+
+def _description(text: str, direction: int):
+    purpose = re.search(r"\b(?:pentru|for)\s+(.+)$", text)
+    if purpose:
+        words = re.split(r"\s+(?:din|in|from|into|la)\s+", purpose.group(1))[0].strip(" .!")
+        if words:
+            return ("Plată " if direction < 0 else "Încasare ") + words
+    return "Plată comercială" if direction < 0 else "Încasare"
+
+
+def parse_financial_command(message: str):
+    """
+    Încearcă să interpreteze local comanda. Returnează dict-ul de acțiune
+    (același format ca LLM-ul) sau None dacă nu e suficient de sigur.
+    """
+    action = _parse(message)
+    with _lock:
+        if action is None:
+            _stats["llm_fallbacks"] += 1
+        else:
+            _stats["fast_path_hits"] += 1
+    return action
+
+
+def _parse(message: str):
+    if not message or len(message) > 200:
+        return None
+    text = _norm(message)
+    if any(re.search(p, text) for p in UNSAFE_PATTERNS):
+        return None
+
+    conditions = {}
+    ibans = [m.group(0) for m in IBAN_RE.finditer(message)]
+    if len(ibans) > 1:
+        return None
+    if ibans:
+        conditions["iban"] = re.sub(r"\s+", "", ibans[0]).upper()
+        text = _norm(IBAN_RE.sub(" ", message))
+
+    banks = _match_bank(text)
+    companies = _match_company(text)
+    if len(banks) > 1 or len(companies) > 1:
+        return None
+    if banks:
+        conditions["banca"] = banks.pop()
+    if companies:
+        conditions["compania"] = companies.pop()
+
+    amounts = [m for m in AMOUNT_RE.finditer(text)]
+    out = any(re.search(p, text) for p in OUT_PATTERNS)
+    inc = any(re.search(p, text) for p in IN_PATTERNS)
+    balance = any(re.search(p, text) for p in BALANCE_PATTERNS)
+
+    if not amounts:
+        if balance and not out and not inc:
+            return {"operation": "select", "table": "Accounts", "data": {}, "conditions": conditions}
+        return None
+
+    if len(amounts) != 1 or out == inc or balance:
+        return None
+    currency = (amounts[0].group(2) or "lei").lower()
+    if currency not in LOCAL_CURRENCIES or FOREIGN_CURRENCY_RE.search(text):
+        return None
+
+    try:
+        value = parse_amount(amounts[0].group(1))
+    except ValueError:
+        return None
+    if value <= 0:
+        return None
+    direction = -1 if out else 1
+
+    return {
+        "operation": "update",
+        "table": "Accounts",
+        "data": {
+            "sum": {"increment": direction * value},
+            "description": _description(text[:amounts[0].start()] + text[amounts[0].end():], direction),
+        },
+        "conditions": conditions,
+    }
+
+
+# Separatori între comenzi dictate una după alta: final de propoziție, „apoi”, „și am ...”
+COMMAND_SPLIT_RE = re.compile(
+    r"(?<=[.!?;])\s+|\n+|\s*,?\s*\b(?:[șs]i apoi|apoi|dup[ăa] aceea|de asemenea|and then|then|also)\b[,:]?\s*"
+    r"|\s*,?\s+(?:[șs]i|and)\s+(?=(?:am|mi-au|au|i)\b)",
+    re.IGNORECASE,
+)
+
+
+def _is_command(text: str) -> bool:
+    text = _norm(text)
+    return any(re.search(p, text) for p in OUT_PATTERNS + IN_PATTERNS + BALANCE_PATTERNS)
+
+
+def split_commands(text: str) -> list:
+    """
+    Împarte un text cu mai multe comenzi (ex. transcrierea unui mesaj vocal lung) în comenzi separate.
+    Bucățile fără verb de plată/încasare/sold („din contul BCR.”) rămân lipite de comanda vecină.
+    """
+    pieces = [p.strip(" ,") for p in COMMAND_SPLIT_RE.split(text or "") if p and p.strip(" ,.")]
+    commands = []
+    for piece in pieces:
+        if commands and not _is_command(piece):
+            commands[-1] = f"{commands[-1]} {piece}"
+        elif commands and not _is_command(commands[-1]):
+            commands[-1] = f"{commands[-1]} {piece}"
+        else:
+            commands.append(piece)
+    return commands if len(commands) > 1 else [(text or "").strip()]
+
+
+def record_llm_latency(seconds: float):
+    """Latența unui apel LLM pentru comenzi (folosită la estimarea timpului economisit de fast-path)."""
+    with _lock:
+        _stats["llm_seconds_total"] += seconds
+
+
+def get_command_parser_stats():
+    with _lock:
+        hits = _stats["fast_path_hits"]
+        fallbacks = _stats["llm_fallbacks"]
+        avg_llm = _stats["llm_seconds_total"] / fallbacks if fallbacks else 0.0
+        total = hits + fallbacks
+        return {
+            "fast_path_hits": hits,
+            "llm_fallbacks": fallbacks,
+            "hit_rate": round(hits / total, 3) if total else 0.0,
+            "avg_llm_seconds": round(avg_llm, 3),
+            "estimated_seconds_saved": round(hits * avg_llm, 1),
+        }
@@ -0,0 +1,230 @@
+"""
+Pool de procese pentru munca de CPU (OCR, decodare imagini, parsare/randare PDF),
+separat de thread-urile workerului gunicorn, ca să nu concureze pentru GIL cu webhook-ul.
+
+Un singur pool per worker, cu CPU_POOL_WORKERS procese: acesta e bugetul de CPU comun
+tuturor fișierelor procesate în paralel. Procesele sunt pornite cu "spawn" (nu fork),
+ca să nu moștenească lock-uri ținute de thread-urile workerului, și sunt reciclate după
+CPU_POOL_MAX_TASKS_PER_CHILD taskuri. Fiecare copil are limită de memorie (CPU_CHILD_MEMORY_MB).
+
+Un task care depășește CPU_TASK_TIMEOUT secunde e abandonat și e oprit doar procesul care îl rulează
+(fiecare copil anunță pe o coadă PID-ul la pornirea unui task). ProcessPoolExecutor nu supraviețuiește
+morții unui proces, așa că oprește și ceilalți copii și pool-ul e înlocuit (o singură dată); taskurile
+celorlalte mesaje prinse în pool-ul stricat sunt reluate o dată în pool-ul nou.
+CPU_POOL_WORKERS=0 rulează totul direct în thread-ul apelant (dezvoltare locală).
+"""
+
+import os
+import time
+import signal
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from threading import Lock
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+
+CPU_POOL_WORKERS = int(os.getenv("CPU_POOL_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+CPU_TASK_TIMEOUT = float(os.getenv("CPU_TASK_TIMEOUT", "60"))
+CPU_CHILD_MEMORY_MB = int(os.getenv("CPU_CHILD_MEMORY_MB", "2048"))  # 0 = fără limită
+CPU_POOL_MAX_TASKS_PER_CHILD = int(os.getenv("CPU_POOL_MAX_TASKS_PER_CHILD", "200"))
+
+
+class CpuTaskError(Exception):
+    """Un task din pool a depășit timpul/memoria sau procesul copil a murit."""
+
+
+_lock = Lock()
+_pool = None
+_started_at = time.monotonic()
+_stats = {"submitted": 0, "completed": 0, "failed": 0, "timeouts": 0, "memory_errors": 0,
+          "pool_restarts": 0, "retried": 0, "in_flight": 0, "busy_seconds": 0.0, "wait_seconds": 0.0}
+
+_mp = multiprocessing.get_context("spawn")
+_task_ids = itertools.count()
+_started_queue = None   # copiii scriu (task_id, pid) la pornirea fiecărui task
+_task_pids = {}         # task_id -> pid, doar pentru taskurile în curs
+_child_queue = None     # în procesul copil: coada primită la inițializare
+
+
+class _Task:
+    def __init__(self, fn, args):
+        self.id = next(_task_ids)
+        self.fn = fn
+        self.args = args
+        self.pool = None
+        self.future = None
+        self.submitted_at = None
+        self.retried = False
+
+
+def _init_child(memory_mb: int, started_queue):
+    """Rulează o dată în fiecare proces copil: limita de memorie (address space) și coada de PID-uri."""
+    global _child_queue
+    _child_queue = started_queue
+    if resource is not None and memory_mb > 0:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _timed_call(task_id, fn, args):
+    """Rulează în copil; anunță PID-ul și întoarce și cât a lucrat efectiv (fără așteptarea la coadă)."""
+    _child_queue.put((task_id, os.getpid()))
+    started = time.monotonic()
+    result = fn(*args)
+    return result, time.monotonic() - started
+
+
+def get_cpu_pool() -> ProcessPoolExecutor:
+    global _pool, _started_queue
+    with _lock:
+        if _pool is None:
+            if _started_queue is None:
+                _started_queue = _mp.SimpleQueue()
+            _pool = ProcessPoolExecutor(
+                max_workers=CPU_POOL_WORKERS,
+                mp_context=_mp,
+                initializer=_init_child,
+                initargs=(CPU_CHILD_MEMORY_MB, _started_queue),
+                max_tasks_per_child=CPU_POOL_MAX_TASKS_PER_CHILD or None,
+            )
+        return _pool
+
+
+def _drain_started():
+    """Mută în _task_pids anunțurile copiilor (apelat sub _lock; doar părintele citește coada)."""
+    while _started_queue is not None and not _started_queue.empty():
+        task_id, pid = _started_queue.get()
+        if task_id in _task_pids:
+            _task_pids[task_id] = pid
+
+
+def _replace_pool(pool):
+    """Pool-ul e stricat: taskurile noi merg într-un pool nou. Numărat o singură dată per pool."""
+    global _pool
+    with _lock:
+        if _pool is not pool:
+            return  # deja înlocuit de alt thread
+        _pool = None
+        _stats["pool_restarts"] += 1
+    pool.shutdown(wait=False)
+
+
+def _kill_task(task):
+    """Oprește procesul care rulează taskul blocat; dacă taskul nu a pornit încă, nu oprim nimic."""
+    with _lock:
+        _drain_started()
+        pid = _task_pids.get(task.id)
+    if not task.future.cancel() and pid is not None and not task.future.done():
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+        _replace_pool(task.pool)
+
+
+def run_cpu(fn, *args, timeout: float = CPU_TASK_TIMEOUT):
+    """Rulează `fn(*args)` într-un proces copil și așteaptă rezultatul (cel mult `timeout` secunde)."""
+    if CPU_POOL_WORKERS <= 0:
+        return fn(*args)
+    return _wait(_submit(_Task(fn, args)), timeout)
+
+
+def cpu_map(fn, *iterables, timeout: float = CPU_TASK_TIMEOUT) -> list:
+    """Rulează `fn` în pool pentru fiecare element; rezultatele vin în ordinea intrărilor."""
+    if CPU_POOL_WORKERS <= 0:
+        return list(map(fn, *iterables))
+    tasks = [_submit(_Task(fn, args)) for args in zip(*iterables)]
+    results = []
+    try:
+        for task in tasks:
+            results.append(_wait(task, timeout))
+    except Exception:
+        # restul taskurilor nu mai contează: le anulăm pe cele nepornite și le scoatem din evidență
+        for task in tasks[len(results) + 1:]:
+            task.future.cancel()
+            _finish(task, "failed")
+        raise
+    return results
+
+
+def _submit(task):
+    pool = get_cpu_pool()
+    with _lock:
+        _drain_started()
+        if task.future is None:
+            _stats["submitted"] += 1
+            _stats["in_flight"] += 1
+        _task_pids[task.id] = None
+    task.pool = pool
+    task.future = pool.submit(_timed_call, task.id, task.fn, task.args)
+    task.submitted_at = task.submitted_at or time.monotonic()
+    return task
+
+
+def _wait(task, timeout):
+    while True:
+        try:
+            result, worked = task.future.result(timeout=timeout)
+        except FutureTimeout:
+            _kill_task(task)
+            _finish(task, "timeouts")
+            raise CpuTaskError(f"Procesarea a depășit {timeout:.0f}s")
+        except MemoryError:
+            _finish(task, "memory_errors")
+            raise CpuTaskError(f"Procesarea a depășit limita de memorie ({CPU_CHILD_MEMORY_MB} MB)")
+        except BrokenProcessPool:
+            # un copil a murit (taskul blocat al altui mesaj, OOM killer) și pool-ul a oprit tot;
+            # taskul e reluat o dată în pool-ul nou
+            _replace_pool(task.pool)
+            if task.retried:
+                _finish(task, "failed")
+                raise CpuTaskError("Procesul de lucru s-a oprit neașteptat")
+            task.retried = True
+            with _lock:
+                _stats["retried"] += 1
+            _submit(task)
+            continue
+        except Exception:
+            _finish(task, "failed")
+            raise
+        _finish(task, "completed", worked, time.monotonic() - task.submitted_at - worked)
+        return result
+
+
+def _finish(task, outcome: str, worked: float = 0.0, waited: float = 0.0):
+    with _lock:
+        _task_pids.pop(task.id, None)
+        _stats[outcome] += 1
+        _stats["in_flight"] -= 1
+        _stats["busy_seconds"] += worked
+        _stats["wait_seconds"] += max(waited, 0.0)
+
+
+def get_cpu_pool_stats():
+    with _lock:
+        uptime = time.monotonic() - _started_at
+        completed = _stats["completed"]
+        return {
+            **{k: v for k, v in _stats.items() if k not in ("busy_seconds", "wait_seconds")},
+            "workers": CPU_POOL_WORKERS,
+            # fracțiunea din capacitatea pool-ului (procese × timp) folosită efectiv de taskuri
+            "utilization": round(_stats["busy_seconds"] / (CPU_POOL_WORKERS * uptime), 3) if CPU_POOL_WORKERS and uptime else 0.0,
+            "avg_task_seconds": round(_stats["busy_seconds"] / completed, 3) if completed else 0.0,
+            "avg_wait_seconds": round(_stats["wait_seconds"] / completed, 3) if completed else 0.0,
+            "timeout_seconds": CPU_TASK_TIMEOUT,
+            "child_memory_mb": CPU_CHILD_MEMORY_MB,
+        }
+
+
+def shutdown_cpu_pool(wait: bool = True):
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=wait, cancel_futures=True)
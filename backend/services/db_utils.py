@@ -2,26 +2,8 @@ import re
 import json
 from datetime import datetime, timedelta, timezone
 
-
-def get_normalized_mapping(supabase_client):
-    """Return dicts mapping normalized keys to original names for companies and banks."""
-    result = supabase_client.table("Accounts").select("compania,banca").execute()
-    company_mapping = {}
-    bank_mapping = {}
-
-    for row in result.data or []:
-        if row.get("compania"):
-            original = row["compania"]
-            normalized = original.lower().replace(" ", "", 1).replace(" ", "") if "  " in original else original.lower().replace(" ", "")
-            normalized = original.lower().replace(" ", "")
-            company_mapping[normalized] = original
-
-        if row.get("banca"):
-            original = row["banca"]
-            normalized = original.lower().replace(" ", "")
-            bank_mapping[normalized] = original
-
-    return company_mapping, bank_mapping
+from .account_cache import invalidate_accounts, get_accounts_with_balances, DIRECTORY_COLUMNS
+from .invoice_index import record_invoice, duplicate_from_conflict, DuplicateInvoice
 
 
 def mask_iban(iban: str) -> str:
@@ -31,6 +13,13 @@ def mask_iban(iban: str) -> str:
     return f"{s[:6]}…{s[-4:]}"
 
 
+PAGE_SIZE = 1000
+# Codurile PostgREST/Postgres pentru „funcția nu există” (migrarea nu a fost aplicată încă)
+MISSING_RPC_CODES = ("PGRST202", "42883")
+# unique_violation: ex. o factură deja înregistrată (indexul transactions_invoice_key_uidx)
+UNIQUE_VIOLATION = "23505"
+
+
 def get_last_week_range():
     today = datetime.now(timezone.utc).date()
     weekday = today.weekday()  # Monday=0
@@ -40,20 +29,151 @@ def get_last_week_range():
     return start_last_week.isoformat(), end_last_week.isoformat()
 
 
-def compute_spent_sum(supabase_client, start_iso: str, end_iso: str, iban: str | None = None):
-    q = supabase_client.table("Transactions").select("amount,account,created_at").gte("created_at", start_iso).lte("created_at", end_iso)
-    if iban:
-        q = q.eq("account", iban)
-    resp = q.execute()
+def _compute_spent_summary_local(supabase_client, start_iso: str, end_iso: str, iban: str | None = None):
+    """
+    Varianta de rezervă: aduce tranzacțiile din interval în pagini (PostgREST taie un răspuns
+    la 1000 de rânduri) și adună sumele negative în Python.
+    """
     total_neg = 0.0
-    for row in resp.data or []:
+    count = 0
+    by_account = {}
+    offset = 0
+    while True:
+        q = supabase_client.table("Transactions").select("id,amount,account").gte("created_at", start_iso).lte("created_at", end_iso)
+        if iban:
+            q = q.eq("account", iban)
+        rows = q.order("id").range(offset, offset + PAGE_SIZE - 1).execute().data or []
+        for row in rows:
+            try:
+                amt = float(row.get("amount") or 0)
+                if amt < 0:
+                    total_neg += amt
+                    count += 1
+                    by_account[row.get("account")] = by_account.get(row.get("account"), 0.0) - amt
+            except Exception:
+                continue
+        if len(rows) < PAGE_SIZE:
+            break
+        offset += PAGE_SIZE
+    return {
+        "total": round(-total_neg, 2),
+        "count": count,
+        "by_account": {k: round(v, 2) for k, v in by_account.items()},
+    }
+
+
+def compute_spent_summary(supabase_client, start_iso: str, end_iso: str, iban: str | None = None):
+    """
+    Totalul cheltuit în interval, numărul de plăți și defalcarea pe conturi:
+    {"total": float, "count": int, "by_account": {iban: float}}.
+    Calculul se face în Postgres (funcția `spent_summary`); bucla locală rămâne doar ca rezervă.
+    """
+    try:
+        resp = supabase_client.rpc("spent_summary", {
+            "start_ts": start_iso,
+            "end_ts": end_iso,
+            "p_iban": iban,
+        }).execute()
+        if isinstance(resp.data, dict):
+            return {
+                "total": round(float(resp.data.get("total") or 0), 2),
+                "count": int(resp.data.get("count") or 0),
+                "by_account": {k: round(float(v), 2) for k, v in (resp.data.get("by_account") or {}).items()},
+            }
+    except Exception as e:
+        if getattr(e, "code", None) not in MISSING_RPC_CODES:
+            raise
+        print("⚠️ RPC spent_summary indisponibil, calculez local:", str(e))
+    return _compute_spent_summary_local(supabase_client, start_iso, end_iso, iban)
+
+
+def compute_spent_sum(supabase_client, start_iso: str, end_iso: str, iban: str | None = None):
+    return compute_spent_summary(supabase_client, start_iso, end_iso, iban)["total"]
+
+
+def get_total_balance(supabase_client) -> float:
+    """Suma soldurilor tuturor conturilor, calculată în Postgres (funcția `accounts_total_balance`)."""
+    try:
+        resp = supabase_client.rpc("accounts_total_balance", {}).execute()
+        return round(float((resp.data or {}).get("total") or 0), 2)
+    except Exception as e:
+        if getattr(e, "code", None) not in MISSING_RPC_CODES:
+            raise
+        print("⚠️ RPC accounts_total_balance indisponibil, adun local:", str(e))
+    return round(sum(float(a["sum"] or 0) for a in get_accounts_with_balances(supabase_client)), 2)
+
+
+def _insert_transaction_local(supabase_client, trx: dict):
+    response = supabase_client.table("Transactions").insert(trx).execute()
+    row = response.data[0] if response.data else {}
+    balance = None
+    if trx.get("account"):
+        result = supabase_client.table("Accounts").select("sum").eq("iban", trx["account"]).execute()
+        balance = result.data[0]["sum"] if result.data else None
+    return row, balance
+
+
+def _raise_if_duplicate(supabase_client, trx: dict, error: Exception):
+    """Un conflict pe indexul unic al facturilor devine DuplicateInvoice (cu tranzacția existentă)."""
+    if getattr(error, "code", None) == UNIQUE_VIOLATION:
+        match = duplicate_from_conflict(supabase_client, trx)
+        if match is not None:
+            raise DuplicateInvoice(match) from error
+
+
+def insert_transaction(supabase_client, trx: dict):
+    """
+    Inserează o tranzacție și întoarce {"transaction": rând inserat, "balance": soldul nou al contului sau None}.
+    Insertul și citirea soldului se fac într-un singur apel (funcția `insert_transaction_with_balance`);
+    indexul de facturi e actualizat aici, pentru toate căile de scriere (directorul de conturi nu ține
+    solduri, deci o tranzacție nu îl invalidează).
+    Ridică DuplicateInvoice dacă factura e deja înregistrată (indexul unic din DB).
+    """
+    try:
+        resp = supabase_client.rpc("insert_transaction_with_balance", {"p_trx": trx}).execute()
+        row = (resp.data or {}).get("transaction") or {}
+        balance = (resp.data or {}).get("balance")
+    except Exception as e:
+        _raise_if_duplicate(supabase_client, trx, e)
+        # doar dacă funcția lipsește; altfel insertul poate să fi avut loc și nu îl repetăm
+        if getattr(e, "code", None) not in MISSING_RPC_CODES:
+            raise
+        print("⚠️ RPC insert_transaction_with_balance indisponibil, inserez local:", str(e))
+        try:
+            row, balance = _insert_transaction_local(supabase_client, trx)
+        except Exception as local_error:
+            _raise_if_duplicate(supabase_client, trx, local_error)
+            raise
+
+    record_invoice(trx, [row])
+    return {"transaction": row, "balance": float(balance) if balance is not None else None}
+
+
+def _increment_local(supabase_client, table: str, column: str, iban: str, delta):
+    """Citire + scriere: două apeluri și nu e atomic; doar dacă nu există funcția din DB."""
+    current_resp = supabase_client.table(table).select(column).eq("iban", iban).execute()
+    current_val = current_resp.data[0][column] if current_resp.data else 0
+    new_val = (current_val or 0) + delta
+    supabase_client.table(table).update({column: new_val}).eq("iban", iban).execute()
+    return new_val
+
+
+def increment_value(supabase_client, table: str, column: str, iban: str, delta):
+    """
+    Adună `delta` la `table.column` pentru contul `iban` și întoarce valoarea nouă.
+    Pentru "Accounts".sum incrementul e un singur UPDATE atomic în Postgres (funcția
+    `increment_account_sum`), ca incrementele simultane din workeri diferiți să nu se piardă.
+    """
+    if table == "Accounts" and column == "sum":
         try:
-            amt = float(row.get("amount") or 0)
-            if amt < 0:
-                total_neg += amt
-        except Exception:
-            continue
-    return round(-total_neg, 2)
+            resp = supabase_client.rpc("increment_account_sum", {"p_iban": iban, "p_delta": delta}).execute()
+            return resp.data
+        except Exception as e:
+            # doar dacă funcția lipsește; altfel UPDATE-ul poate să fi avut loc și nu îl repetăm
+            if getattr(e, "code", None) not in MISSING_RPC_CODES:
+                raise
+            print("⚠️ RPC increment_account_sum indisponibil, incrementez local:", str(e))
+    return _increment_local(supabase_client, table, column, iban, delta)
 
 
 def execute_db_action(supabase_client, json_text):
@@ -68,20 +188,21 @@ def execute_db_action(supabase_client, json_text):
             if not data or not conditions:
                 return {"error": "Missing data or conditions for update."}
             updates = {}
+            result = {"status": "success", "values": {}}
             for k, v in data.items():
                 if isinstance(v, dict) and "increment" in v:
-                    account = conditions.get("iban")
-                    current_resp = supabase_client.table(table).select(k).eq("iban", account).execute()
-                    current_val = current_resp.data[0][k] if current_resp.data else 0
-                    updates[k] = current_val + v["increment"]
+                    result["values"][k] = increment_value(supabase_client, table, k, conditions.get("iban"), v["increment"])
                 else:
                     updates[k] = v
 
-            response = supabase_client.table(table).update(updates).eq(
-                list(conditions.keys())[0],
-                list(conditions.values())[0]
-            ).execute()
-            return {"status": "success", "response": response}
+            if updates:
+                result["response"] = supabase_client.table(table).update(updates).eq(
+                    list(conditions.keys())[0],
+                    list(conditions.values())[0]
+                ).execute()
+            if table == "Accounts" and any(col in updates for col in DIRECTORY_COLUMNS):
+                invalidate_accounts()
+            return result
 
         elif operation == "select":
             account = conditions.get("iban") if conditions else None
@@ -0,0 +1,41 @@
+"""
+Expresii regulate comune pentru textul facturilor/bonurilor (OCR sau PDF):
+IBAN, linia de total, numărul facturii, moneda.
+"""
+
+import re
+
+
+IBAN_RE = re.compile(r"\b[A-Z]{2}\d{2}(?: ?[A-Z0-9]{4}){3,7}(?: ?[A-Z0-9]{1,4})?\b", re.IGNORECASE)
+
+TOTAL_RE = re.compile(
+    r"^.*\b(?:total(?:\s+de\s+plat[aă]|\s+general|\s+factur[aă])?|de\s+plat[aă]|suma\s+de\s+plat[aă]|"
+    r"rest\s+de\s+plat[aă]|amount\s+due|grand\s+total|total\s+due|balance\s+due)\b.*\d",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+INVOICE_RE = re.compile(
+    r"\b(?:factur[aăi](?:\s+fiscal[aă])?(?:\s+seria\s+[A-Z]{1,6})?\s*(?:nr\.?|num[aă]r(?:ul)?|no\.?)|"
+    r"nr\.?\s*factur[aăi]|invoice\s*(?:no\.?|number|nr\.?|#)|bon\s+fiscal\s*(?:nr\.?)?|"
+    r"seria\s+[A-Z]{1,6}\s*nr\.?)\s*[:#]?\s*([A-Z0-9][A-Z0-9\-/]{1,24})",
+    re.IGNORECASE,
+)
+
+CURRENCY_RE = re.compile(r"\b(RON|LEI|EUR|EURO|USD)\b|[€$]", re.IGNORECASE)
+
+# Sume de bani: cu zecimale ("1.234,56", "1,234.56", "12.50") sau întregi urmați de monedă
+# ("100 lei", "1 234 lei", "1.234 lei" - grupele de mii trebuie luate întregi, nu doar ultima)
+MONEY_RE = re.compile(
+    r"(?<![\w.,])(\d{1,3}(?:[.\s]\d{3})+[.,]\d{2}|\d{1,3}(?:,\d{3})+\.\d{2}|\d+[.,]\d{2}|"
+    r"(?:\d{1,3}(?:[ .]\d{3})+|\d+)(?=\s*(?:lei|ron|eur|€)))(?![\d]|[.,]\d)",
+    re.IGNORECASE,
+)
+
+
+def key_fields_found(text: str) -> dict:
+    """Ce câmpuri esențiale apar deja în text (total, IBAN, număr factură)."""
+    return {
+        "total": TOTAL_RE.search(text or "") is not None,
+        "iban": IBAN_RE.search(text or "") is not None,
+        "invoice_number": INVOICE_RE.search(text or "") is not None,
+    }
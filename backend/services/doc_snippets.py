@@ -0,0 +1,100 @@
+"""
+Micșorarea textului OCR/PDF trimis în prompturile de analiză (bon, factură).
+
+Fiecare linie primește un scor după ce conține (total, IBAN, număr factură, monedă, sume);
+în prompt ajung doar primele rânduri ale documentului (numele comerciantului), liniile relevante
+și câte PROMPT_SNIPPET_WINDOW rânduri în jurul lor, în limita a PROMPT_SNIPPET_MAX_CHARS caractere.
+Dacă nu recunoaștem nimic, trimitem textul întreg (trunchiat), ca să nu pierdem informație.
+"""
+
+import os
+import re
+
+from services.doc_patterns import TOTAL_RE, IBAN_RE, INVOICE_RE, CURRENCY_RE
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - dependență opțională
+    tiktoken = None
+
+
+PROMPT_SNIPPETS = os.getenv("PROMPT_SNIPPETS", "1") == "1"
+PROMPT_SNIPPET_WINDOW = int(os.getenv("PROMPT_SNIPPET_WINDOW", "2"))
+PROMPT_SNIPPET_MAX_CHARS = int(os.getenv("PROMPT_SNIPPET_MAX_CHARS", "2500"))
+HEADER_LINES = 4
+GAP_MARKER = "[...]"
+
+AMOUNT_RE = re.compile(r"\d[\d.,\s]*[.,]\d{2}\b")
+EXTRA_KEYWORDS_RE = re.compile(r"\b(?:suma|sum[aă]|chitan[tț][aă]|bon\s+fiscal|data|date|scaden[tț][aă]|furnizor|cif|cui)\b", re.IGNORECASE)
+
+_encoding = None
+
+
+def estimate_tokens(text: str) -> int:
+    """Numărul de tokeni (tiktoken dacă e instalat, altfel aproximarea ~4 caractere/token)."""
+    global _encoding
+    if tiktoken is not None:
+        if _encoding is None:
+            _encoding = tiktoken.get_encoding("o200k_base")
+        return len(_encoding.encode(text or ""))
+    return (len(text or "") + 3) // 4
+
+
+def score_line(line: str) -> int:
+    score = 0
+    if TOTAL_RE.search(line):
+        score += 5
+    if IBAN_RE.search(line):
+        score += 5
+    if INVOICE_RE.search(line):
+        score += 4
+    if EXTRA_KEYWORDS_RE.search(line):
+        score += 2
+    if CURRENCY_RE.search(line):
+        score += 1
+    if AMOUNT_RE.search(line):
+        score += 1
+    return score
+
+
+def select_snippets(text: str, window: int = PROMPT_SNIPPET_WINDOW, max_chars: int = PROMPT_SNIPPET_MAX_CHARS) -> str:
+    """Liniile relevante (în ordinea din document), cu `window` rânduri de context în jur."""
+    lines = [line.strip() for line in (text or "").splitlines()]
+    lines = [line for line in lines if line]
+    if sum(len(line) + 1 for line in lines) <= max_chars:
+        return "\n".join(lines)
+
+    scores = [score_line(line) for line in lines]
+    # liniile cu cuvinte cheie; o simplă sumă (scor 1-2) contează doar ca și context
+    anchors = sorted((i for i, s in enumerate(scores) if s >= 3), key=lambda i: -scores[i])
+    if not anchors:
+        return "\n".join(lines)[:max_chars]
+
+    keep = set(range(min(HEADER_LINES, len(lines))))
+    used = sum(len(lines[i]) + 1 for i in keep)
+    for anchor in anchors:
+        block = [i for i in range(max(0, anchor - window), min(len(lines), anchor + window + 1)) if i not in keep]
+        cost = sum(len(lines[i]) + 1 for i in block)
+        if used + cost > max_chars:
+            continue
+        keep.update(block)
+        used += cost
+
+    out = []
+    previous = -1
+    for i in sorted(keep):
+        if i != previous + 1:
+            out.append(GAP_MARKER)
+        out.append(lines[i])
+        previous = i
+    return "\n".join(out)
+
+
+def shrink_document_text(text: str, label: str = "document") -> str:
+    """Textul care intră în prompt; loghează tokenii înainte/după."""
+    if not PROMPT_SNIPPETS:
+        return text
+    snippet = select_snippets(text)
+    before, after = estimate_tokens(text), estimate_tokens(snippet)
+    print(f"Prompt {label}: {before} → {after} tokeni text ({len(text or '')} → {len(snippet)} caractere)")
+    return snippet
@@ -0,0 +1,137 @@
+"""
+Extragere locală (fără LLM) a câmpurilor unei facturi/bon din textul OCR sau PDF.
+
+Produce același JSON ca get_receipt_analysis_prompt / get_pdf_analysis_prompt, plus un scor de încredere.
+Dacă lipsește totalul, numărul facturii sau IBAN-ul contului ori dacă textul e contradictoriu (mai multe
+totaluri, mai multe IBAN-uri, IBAN cu checksum greșit), încrederea e 0 și process_image/process_pdf apelează gpt-5.
+"""
+
+import os
+import re
+
+from services.account_cache import normalize_iban
+from services.command_parser import parse_amount
+from services.doc_patterns import IBAN_RE, TOTAL_RE, INVOICE_RE, CURRENCY_RE, MONEY_RE
+
+
+LOCAL_EXTRACT_MIN_CONFIDENCE = float(os.getenv("LOCAL_EXTRACT_MIN_CONFIDENCE", "0.8"))
+
+IBAN_LENGTHS = {"RO": 24, "DE": 22, "AT": 20, "BG": 22, "HU": 28, "IT": 27, "FR": 27, "ES": 24, "NL": 18, "GB": 22}
+NOT_TOTAL_RE = re.compile(r"\b(?:subtotal|sub-total|tva|vat|discount|reducere|card|numerar|cash|achitat)\b", re.IGNORECASE)
+CURRENCY_CODES = {"ron": "RON", "lei": "RON", "eur": "EUR", "euro": "EUR", "€": "EUR", "usd": "USD", "$": "USD"}
+
+
+def is_valid_iban(iban: str) -> bool:
+    """Verificare ISO 13616: lungimea pe țară și checksum mod-97."""
+    iban = normalize_iban(iban)
+    if not re.fullmatch(r"[A-Z]{2}\d{2}[A-Z0-9]{11,30}", iban):
+        return False
+    expected = IBAN_LENGTHS.get(iban[:2])
+    if expected and len(iban) != expected:
+        return False
+    rearranged = iban[4:] + iban[:4]
+    digits = "".join(str(int(c, 36)) for c in rearranged)
+    return int(digits) % 97 == 1
+
+
+def _find_ibans(text: str):
+    valid, invalid = [], []
+    for m in IBAN_RE.finditer(text):
+        iban = normalize_iban(m.group(0))
+        if is_valid_iban(iban):
+            if iban not in valid:
+                valid.append(iban)
+        elif iban.startswith("RO") and len(iban) == IBAN_LENGTHS["RO"]:
+            # arată ca un IBAN românesc dar checksum-ul nu se potrivește: probabil citit greșit de OCR
+            invalid.append(iban)
+    return valid, invalid
+
+
+def _find_totals(lines):
+    """Sumele de pe liniile de total (fără subtotal, TVA, discount, plată card/numerar), plus moneda de pe acele linii."""
+    amounts, currencies = [], []
+    for line in lines:
+        if not TOTAL_RE.search(line) or NOT_TOTAL_RE.search(line):
+            continue
+        for m in MONEY_RE.finditer(line):
+            try:
+                amounts.append(round(parse_amount(m.group(1)), 2))
+            except ValueError:
+                continue
+        currencies += _currencies(line)
+    return amounts, currencies
+
+
+def _currencies(text: str):
+    return [CURRENCY_CODES[m.group(0).lower()] for m in CURRENCY_RE.finditer(text)]
+
+
+def _find_invoice_numbers(text: str):
+    """Numerele de factură; numărul bonului fiscal contează doar dacă nu există factură."""
+    invoices, receipts = [], []
+    for m in INVOICE_RE.finditer(text):
+        number = m.group(1).strip("-/").upper()
+        if not re.search(r"\d", number):
+            continue
+        target = receipts if "bon" in m.group(0).lower() else invoices
+        if number not in target:
+            target.append(number)
+    return invoices or receipts
+
+
+def _merchant(lines):
+    for line in lines[:5]:
+        if len(re.findall(r"[A-Za-zĂÂÎȘȚăâîșț]", line)) >= 3 and not IBAN_RE.search(line) and not INVOICE_RE.search(line):
+            return line.strip()[:60]
+    return None
+
+
+def extract_invoice_fields(text: str, sender: str):
+    """
+    Returnează (data, confidence). `data` are cheile din prompturile de analiză
+    (invoice_number, account, amount, currency, profile_name, description).
+    """
+    lines = [line.strip() for line in (text or "").splitlines() if line.strip()]
+    problems = []
+
+    ibans, bad_ibans = _find_ibans(text or "")
+    amounts, currencies = _find_totals(lines)
+    invoices = _find_invoice_numbers(text or "")
+    all_currencies = set(_currencies(text or ""))
+
+    if not amounts:
+        problems.append("fără total")
+    elif len(set(amounts)) > 1:
+        problems.append(f"totaluri diferite {sorted(set(amounts))}")
+    if not invoices:
+        problems.append("fără număr factură")
+    elif len(invoices) > 1:
+        problems.append(f"mai multe numere de factură {invoices}")
+    if len(ibans) > 1:
+        problems.append("mai multe IBAN-uri")
+    elif bad_ibans and not ibans:
+        problems.append("IBAN cu checksum invalid")
+    elif not ibans:
+        problems.append("fără IBAN")
+
+    currency = currencies[0] if currencies else (next(iter(all_currencies)) if len(all_currencies) == 1 else "RON")
+    merchant = _merchant(lines)
+    data = {
+        "invoice_number": invoices[0] if invoices else None,
+        "account": ibans[0] if len(ibans) == 1 else None,
+        "amount": -abs(amounts[0]) if amounts else None,
+        "currency": currency,
+        "profile_name": sender,
+        "description": f"Plată {merchant}" if merchant else "Plată factură",
+    }
+
+    if problems:
+        print("Extragere locală incompletă:", "; ".join(problems))
+        return data, 0.0
+
+    confidence = 1.0
+    if not currencies:
+        confidence -= 0.05
+    if not merchant:
+        confidence -= 0.05
+    return data, round(confidence, 2)
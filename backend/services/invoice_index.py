@@ -0,0 +1,207 @@
+"""
+Index în memorie al facturilor deja înregistrate, ca să nu dublăm o tranzacție
+când aceeași factură/bon e trimisă din nou.
+
+Cheia: (cont, număr factură, sumă, monedă). Regula e impusă în baza de date de indexul unic
+`transactions_invoice_key_uidx` (aceeași cheie, normalizată la fel): insertul unei facturi deja
+înregistrate eșuează, iar insert_transaction ridică DuplicateInvoice cu tranzacția existentă.
+Indexul din memorie doar scutește insertul pentru facturile pe care workerul curent le știe deja;
+o lipsă din el nu înseamnă că factura e nouă (poate fi fost înregistrată de alt worker).
+
+Indexul se încarcă din tranzacțiile din ultimele INVOICE_INDEX_DAYS zile și se reîncarcă după
+INVOICE_INDEX_TTL secunde. Inserările și ștergerile (undo_last_transaction) din workerul curent
+îl actualizează imediat. Un undo făcut de alt worker nu ajunge aici, deci o potrivire din index
+e confirmată în DB înainte de a refuza factura.
+"""
+
+import os
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+
+from services.account_cache import normalize_iban
+
+
+INVOICE_INDEX_DAYS = int(os.getenv("INVOICE_INDEX_DAYS", "180"))
+INVOICE_INDEX_TTL = float(os.getenv("INVOICE_INDEX_TTL", "300"))
+PAGE_SIZE = 1000
+
+_lock = Lock()
+_load_lock = Lock()   # o singură citire a tabelei odată; _lock nu e ținut cât durează citirea
+_index = {
+    "loaded_at": None,
+    "by_key": {},   # cheie -> {"id", "created_at"}
+    "by_id": {},    # id tranzacție -> cheie (pentru ștergeri)
+}
+_stats = {"checks": 0, "duplicates": 0, "stale_hits": 0, "db_conflicts": 0, "loads": 0, "rows_loaded": 0}
+
+
+class DuplicateInvoice(Exception):
+    """Factura e deja înregistrată (conflict pe indexul unic din DB); `match` = {"id", "created_at"}."""
+
+    def __init__(self, match: dict):
+        super().__init__(f"Factura e deja înregistrată (tranzacția {match.get('id')})")
+        self.match = match
+
+
+def invoice_key(trx: dict):
+    """Cheia de deduplicare a unei tranzacții sau None dacă lipsește contul ori numărul facturii."""
+    account = normalize_iban(trx.get("account") or "")
+    invoice = re.sub(r"[\s\-/.]", "", str(trx.get("invoice_number") or "")).upper()
+    if not account or not invoice or invoice in ("NULL", "NONE"):
+        return None
+    try:
+        amount = round(float(trx.get("amount")), 2)
+    except (TypeError, ValueError):
+        return None
+    currency = (trx.get("currency") or "RON").strip().upper()
+    return (account, invoice, amount, currency)
+
+
+def _load_index(supabase_client):
+    """Citește în pagini tranzacțiile recente care au număr de factură."""
+    since = (datetime.now(timezone.utc) - timedelta(days=INVOICE_INDEX_DAYS)).isoformat()
+    by_key = {}
+    by_id = {}
+    offset = 0
+    while True:
+        rows = supabase_client.table("Transactions")\
+            .select("id,account,invoice_number,amount,currency,created_at")\
+            .gte("created_at", since)\
+            .not_.is_("invoice_number", "null")\
+            .order("id")\
+            .range(offset, offset + PAGE_SIZE - 1)\
+            .execute().data or []
+        for row in rows:
+            key = invoice_key(row)
+            if key is not None:
+                by_key[key] = {"id": row.get("id"), "created_at": row.get("created_at")}
+                by_id[row.get("id")] = key
+        if len(rows) < PAGE_SIZE:
+            break
+        offset += PAGE_SIZE
+
+    return {"loaded_at": time.monotonic(), "by_key": by_key, "by_id": by_id}
+
+
+def _is_fresh():
+    loaded_at = _index["loaded_at"]
+    return loaded_at is not None and time.monotonic() - loaded_at < INVOICE_INDEX_TTL
+
+
+def _get_index(supabase_client):
+    global _index
+    with _lock:
+        if _is_fresh():
+            return _index
+    # citirea tabelei se face fără _lock (record_invoice/forget_transaction/statisticile nu așteaptă după ea)
+    with _load_lock:
+        with _lock:
+            if _is_fresh():
+                return _index  # încărcat între timp de alt thread
+        loaded = _load_index(supabase_client)
+        with _lock:
+            _index = loaded
+            _stats["loads"] += 1
+            _stats["rows_loaded"] += len(loaded["by_key"])
+            return _index
+
+
+def find_duplicate(supabase_client, trx: dict):
+    """Tranzacția deja înregistrată pentru aceeași factură ({"id", "created_at"}) sau None."""
+    key = invoice_key(trx)
+    if key is None:
+        return None
+    index = _get_index(supabase_client)
+    with _lock:
+        _stats["checks"] += 1
+        match = index["by_key"].get(key)
+    if not match:
+        return None
+
+    # tranzacția poate fi fost ștearsă între timp (undo în alt worker): verificăm că mai există
+    current = _still_recorded(supabase_client, trx, match)
+    with _lock:
+        if current:
+            _stats["duplicates"] += 1
+        else:
+            _stats["stale_hits"] += 1
+            if _index["by_key"].get(key) is match:
+                _index["by_key"].pop(key, None)
+                _index["by_id"].pop(match.get("id"), None)
+    return current
+
+
+def _still_recorded(supabase_client, trx: dict, match: dict):
+    """Rândul din Transactions pentru potrivirea din index ({"id", "created_at"}) sau None dacă a fost șters."""
+    if match.get("id") is None:
+        return find_recorded(supabase_client, trx)
+    rows = supabase_client.table("Transactions").select("id,created_at").eq("id", match["id"]).limit(1).execute().data or []
+    return {"id": rows[0].get("id"), "created_at": rows[0].get("created_at")} if rows else None
+
+
+def find_recorded(supabase_client, trx: dict):
+    """
+    Tranzacția din DB cu aceeași cheie de factură ({"id", "created_at"}) sau None.
+    Filtrăm în DB după cont și sumă, iar numărul facturii îl comparăm normalizat, ca indexul unic.
+    """
+    key = invoice_key(trx)
+    if key is None:
+        return None
+    rows = supabase_client.table("Transactions")\
+        .select("id,account,invoice_number,amount,currency,created_at")\
+        .eq("account", trx.get("account"))\
+        .eq("amount", trx.get("amount"))\
+        .not_.is_("invoice_number", "null")\
+        .execute().data or []
+    for row in rows:
+        if invoice_key(row) == key:
+            return {"id": row.get("id"), "created_at": row.get("created_at")}
+    return None
+
+
+def duplicate_from_conflict(supabase_client, trx: dict):
+    """
+    După un conflict pe indexul unic la insert: tranzacția existentă (și o trecem în index),
+    sau None dacă nu o găsim (conflictul nu era pe cheia facturii).
+    """
+    match = find_recorded(supabase_client, trx)
+    if match is None:
+        return None
+    record_invoice(trx, [match])
+    with _lock:
+        _stats["db_conflicts"] += 1
+    return match
+
+
+def record_invoice(trx: dict, inserted_rows=None):
+    """Adaugă în index o tranzacție tocmai inserată (`inserted_rows` = response.data de la insert)."""
+    key = invoice_key(trx)
+    if key is None:
+        return
+    row = (inserted_rows or [{}])[0]
+    with _lock:
+        if _index["loaded_at"] is None:
+            return  # se va încărca oricum din DB la următoarea verificare
+        _index["by_key"][key] = {"id": row.get("id"), "created_at": row.get("created_at")}
+        if row.get("id") is not None:
+            _index["by_id"][row["id"]] = key
+
+
+def forget_transaction(trx: dict):
+    """Scoate din index o tranzacție ștearsă (ex. undo), ca factura să poată fi trimisă din nou."""
+    with _lock:
+        key = _index["by_id"].pop(trx.get("id"), None) or invoice_key(trx)
+        if key is not None:
+            _index["by_key"].pop(key, None)
+
+
+def get_invoice_index_stats():
+    with _lock:
+        return {
+            **_stats,
+            "entries": len(_index["by_key"]),
+            "age_seconds": round(time.monotonic() - _index["loaded_at"], 1) if _index["loaded_at"] is not None else None,
+            "ttl_seconds": INVOICE_INDEX_TTL,
+        }
@@ -0,0 +1,162 @@
+"""
+Cache pentru răspunsurile LLM (client.responses.create) din doc_processing.
+
+Cheia = model + tipul promptului + intrările normalizate ale promptului (nu textul
+complet al promptului). Memorie LRU limitată, TTL per tip de prompt și, opțional,
+un fișier SQLite (LLM_CACHE_PATH) care supraviețuiește restartului și e comun workerilor.
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+from collections import OrderedDict
+from datetime import datetime, timezone
+from threading import Lock
+
+from services.command_parser import strip_diacritics
+
+
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "512"))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH")  # ex. "/tmp/llm_cache.sqlite"; gol = doar memorie
+# TTL (secunde) per tip de prompt. Perioadele relative („ultimele 7 zile”) depind de ora curentă,
+# de aceea cheia lor include data zilei și TTL-ul e scurt.
+LLM_CACHE_TTL = {
+    "command": float(os.getenv("LLM_CACHE_TTL_COMMAND", "86400")),
+    "period": float(os.getenv("LLM_CACHE_TTL_PERIOD", "300")),
+}
+DEFAULT_TTL = 3600.0
+
+_lock = Lock()
+_memory = OrderedDict()
+_stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "seconds_saved": 0.0}
+
+
+def normalize_prompt_input(text: str) -> str:
+    """Forma canonică a mesajului utilizatorului folosită în cheie."""
+    text = strip_diacritics(text or "").lower()
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.rstrip(" .!?")
+
+
+def _cache_key(model: str, kind: str, key_inputs) -> str:
+    payload = json.dumps([model, kind, key_inputs], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _disk():
+    conn = sqlite3.connect(LLM_CACHE_PATH, timeout=5)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS llm_cache ("
+        " key TEXT PRIMARY KEY, value TEXT NOT NULL, latency REAL NOT NULL, expires_at REAL NOT NULL)"
+    )
+    return conn
+
+
+def _disk_get(key: str):
+    try:
+        with _disk() as conn:
+            row = conn.execute(
+                "SELECT value, latency, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row and row[2] > time.time():
+            return row[0], row[1], row[2]
+    except sqlite3.Error as e:
+        print("⚠️ LLM cache (disk) indisponibil:", str(e))
+    return None
+
+
+def _disk_put(key: str, value: str, latency: float, expires_at: float):
+    try:
+        with _disk() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, latency, expires_at) VALUES (?, ?, ?, ?)",
+                (key, value, latency, expires_at),
+            )
+            conn.execute("DELETE FROM llm_cache WHERE expires_at < ?", (time.time(),))
+    except sqlite3.Error as e:
+        print("⚠️ LLM cache (disk) indisponibil:", str(e))
+
+
+def _remember(key: str, value: str, latency: float, expires_at: float):
+    with _lock:
+        _memory[key] = (value, latency, expires_at)
+        _memory.move_to_end(key)
+        while len(_memory) > LLM_CACHE_SIZE:
+            _memory.popitem(last=False)
+
+
+def _is_valid_json(text: str) -> bool:
+    try:
+        json.loads(text)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def cached_llm_call(client, model: str, prompt: str, kind: str, key_inputs, validate=_is_valid_json):
+    """
+    Apelează `client.responses.create(model, input=prompt)` prin cache.
+
+    `key_inputs` sunt intrările care determină răspunsul (ex. mesajul normalizat, data zilei).
+    Răspunsurile care nu trec de `validate` (implicit: JSON valid) nu se salvează.
+    Returnează (output_text, din_cache).
+    """
+    key = _cache_key(model, kind, key_inputs)
+    now = time.time()
+
+    with _lock:
+        entry = _memory.get(key)
+        if entry and entry[2] > now:
+            _memory.move_to_end(key)
+            _stats["memory_hits"] += 1
+            _stats["seconds_saved"] += entry[1]
+            return entry[0], True
+        if entry:
+            del _memory[key]
+
+    if LLM_CACHE_PATH:
+        entry = _disk_get(key)
+        if entry:
+            _remember(key, *entry)
+            with _lock:
+                _stats["disk_hits"] += 1
+                _stats["seconds_saved"] += entry[1]
+            return entry[0], True
+
+    started = time.monotonic()
+    response = client.responses.create(model=model, input=prompt)
+    latency = time.monotonic() - started
+    output_text = response.output_text.strip()
+
+    with _lock:
+        _stats["misses"] += 1
+    if validate is None or validate(output_text):
+        expires_at = time.time() + LLM_CACHE_TTL.get(kind, DEFAULT_TTL)
+        _remember(key, output_text, latency, expires_at)
+        if LLM_CACHE_PATH:
+            _disk_put(key, output_text, latency, expires_at)
+        with _lock:
+            _stats["stores"] += 1
+    return output_text, False
+
+
+def today_utc() -> str:
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+def get_llm_cache_stats():
+    with _lock:
+        hits = _stats["memory_hits"] + _stats["disk_hits"]
+        total = hits + _stats["misses"]
+        return {
+            **{k: v for k, v in _stats.items() if k != "seconds_saved"},
+            "hit_rate": round(hits / total, 3) if total else 0.0,
+            "seconds_saved": round(_stats["seconds_saved"], 1),
+            "entries": len(_memory),
+            "max_entries": LLM_CACHE_SIZE,
+            "disk_path": LLM_CACHE_PATH,
+        }
@@ -0,0 +1,110 @@
+"""
+Cache pentru rezultatele extragerii din media (OCR, text PDF, transcriere audio, JSON-ul de la GPT),
+indexat după SHA-256 al conținutului fișierului (MediaBuffer.digest, calculat la descărcare).
+
+Aceeași poză/PDF retrimisă sare peste OCR și apelul gpt-5 și ajunge direct la inserare.
+Textul extras depinde doar de fișier și e indexat după digest; JSON-ul tranzacției conține și
+expeditorul (profile_name) și câmpuri deduse din mesaj, deci e indexat după context_digest(digest, expeditor, mesaj).
+Stocare în SQLite (MEDIA_CACHE_PATH), comună workerilor gunicorn; cel mult
+MEDIA_CACHE_MAX_ENTRIES intrări, cele folosite cel mai demult sunt șterse primele (LRU).
+"""
+
+import os
+import time
+import hashlib
+import sqlite3
+import tempfile
+from threading import Lock
+
+
+MEDIA_CACHE_PATH = os.getenv("MEDIA_CACHE_PATH", os.path.join(tempfile.gettempdir(), "media_cache.sqlite"))  # gol = dezactivat
+MEDIA_CACHE_MAX_ENTRIES = int(os.getenv("MEDIA_CACHE_MAX_ENTRIES", "2000"))
+
+_lock = Lock()
+_stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "errors": 0}
+_schema_ready = False
+
+
+def _connect():
+    global _schema_ready
+    conn = sqlite3.connect(MEDIA_CACHE_PATH, timeout=5)
+    if not _schema_ready:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS media_cache ("
+            " digest TEXT PRIMARY KEY, kind TEXT NOT NULL, text TEXT NOT NULL, data TEXT,"
+            " created_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS media_cache_last_used ON media_cache (last_used)")
+        _schema_ready = True
+    return conn
+
+
+def _count(key: str, n: int = 1):
+    with _lock:
+        _stats[key] += n
+
+
+def context_digest(digest: str, *context) -> str:
+    """Cheia pentru rezultate care depind și de alte date decât fișierul (ex. expeditor, mesaj)."""
+    if not digest:
+        return digest
+    h = hashlib.sha256(digest.encode())
+    for part in context:
+        h.update(b"\0" + str(part or "").encode("utf-8"))
+    return h.hexdigest()
+
+
+def get_media_extraction(digest: str):
+    """{"kind", "text", "data"} pentru un fișier deja procesat sau None. `data` e JSON-ul (text) de la GPT, dacă există."""
+    if not MEDIA_CACHE_PATH or not digest:
+        return None
+    try:
+        with _connect() as conn:
+            row = conn.execute("SELECT kind, text, data FROM media_cache WHERE digest = ?", (digest,)).fetchone()
+            if row:
+                conn.execute("UPDATE media_cache SET last_used = ? WHERE digest = ?", (time.time(), digest))
+    except sqlite3.Error as e:
+        print("⚠️ Media cache indisponibil:", str(e))
+        _count("errors")
+        return None
+    _count("hits" if row else "misses")
+    if not row:
+        return None
+    return {"kind": row[0], "text": row[1], "data": row[2]}
+
+
+def store_media_extraction(digest: str, kind: str, text: str, data: str | None = None):
+    """Salvează textul extras și (opțional) JSON-ul tranzacției pentru fișierul cu acest digest."""
+    if not MEDIA_CACHE_PATH or not digest:
+        return
+    now = time.time()
+    try:
+        with _connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO media_cache (digest, kind, text, data, created_at, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (digest, kind, text or "", data, now, now),
+            )
+            evicted = conn.execute(
+                "DELETE FROM media_cache WHERE digest IN ("
+                " SELECT digest FROM media_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (MEDIA_CACHE_MAX_ENTRIES,),
+            ).rowcount
+    except sqlite3.Error as e:
+        print("⚠️ Media cache indisponibil:", str(e))
+        _count("errors")
+        return
+    _count("stores")
+    if evicted > 0:
+        _count("evictions", evicted)
+
+
+def get_media_cache_stats():
+    with _lock:
+        stats = dict(_stats)
+    total = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / total, 3) if total else 0.0
+    stats["max_entries"] = MEDIA_CACHE_MAX_ENTRIES
+    stats["path"] = MEDIA_CACHE_PATH or None
+    return stats
@@ -0,0 +1,156 @@
+"""
+Descărcare media de la Twilio în flux, într-un singur buffer (SpooledTemporaryFile):
+în memorie până la MEDIA_SPOOL_MEMORY octeți, apoi pe disc. Descărcarea se oprește
+dacă fișierul depășește MEDIA_MAX_BYTES sau dacă primii octeți nu sunt un tip suportat.
+Extractorii (process_pdf, process_image, extract_audio_text) citesc direct din acest buffer.
+SHA-256 al conținutului se calculează tot în timpul descărcării (cheia din services.media_cache).
+"""
+
+import os
+import hashlib
+import tempfile
+
+import requests
+
+
+MEDIA_MAX_BYTES = int(os.getenv("MEDIA_MAX_BYTES", str(20 * 1024 * 1024)))
+MEDIA_SPOOL_MEMORY = int(os.getenv("MEDIA_SPOOL_MEMORY", str(1024 * 1024)))
+MEDIA_DOWNLOAD_TIMEOUT = float(os.getenv("MEDIA_DOWNLOAD_TIMEOUT", "20"))
+CHUNK_SIZE = 64 * 1024
+
+# (semnătură, offset, ext internă, format)
+MAGIC_NUMBERS = [
+    (b"%PDF", 0, "pdf", "pdf"),
+    (b"\xff\xd8\xff", 0, "jpg", "jpeg"),
+    (b"\x89PNG\r\n\x1a\n", 0, "png", "png"),
+    (b"GIF8", 0, "gif", "gif"),
+    (b"OggS", 0, "audio", "ogg"),
+    (b"WAVE", 8, "audio", "wav"),
+    (b"ID3", 0, "audio", "mp3"),
+    (b"\xff\xfb", 0, "audio", "mp3"),
+    (b"\xff\xf3", 0, "audio", "mp3"),
+    (b"#!AMR", 0, "audio", "amr"),
+]
+
+# Containere ISO-BMFF ("ftyp" la offset 4): tipul real e dat de brandul principal (octeții 8-12)
+HEIF_BRANDS = {b"heic", b"heix", b"hevc", b"hevx", b"heim", b"heis", b"mif1", b"msf1"}
+AUDIO_MP4_BRANDS = {b"M4A ", b"M4B ", b"M4P ", b"F4A "}
+
+# Extensiile interne tratate ca poze (OCR)
+IMAGE_EXTS = ("jpg", "png", "gif", "heic")
+
+
+class MediaError(Exception):
+    """Fișier refuzat la descărcare (prea mare, tip nesuportat, eroare HTTP)."""
+
+
+class MediaBuffer:
+    """Conținutul unui fișier media descărcat o singură dată, plus tipul detectat."""
+
+    def __init__(self, file, size, content_type, ext, fmt, digest=None):
+        self.file = file
+        self.size = size
+        self.digest = digest    # SHA-256 (hex) al conținutului
+        self.content_type = content_type
+        self.ext = ext          # pdf / jpg / png / gif / heic / audio
+        self.format = fmt       # ex. ogg, wav, mp3, jpeg
+
+    def open(self):
+        """Fișierul, derulat la început (fără copii suplimentare)."""
+        self.file.seek(0)
+        return self.file
+
+    def read(self) -> bytes:
+        return self.open().read()
+
+    def close(self):
+        self.file.close()
+
+
+def sniff_media(head: bytes, content_type: str = ""):
+    """(ext, format) după primii octeți; dacă nu recunoaștem semnătura, ne bazăm pe Content-Type."""
+    content_type = (content_type or "").lower()
+    for magic, offset, ext, fmt in MAGIC_NUMBERS:
+        if head[offset:offset + len(magic)] == magic:
+            return ext, fmt
+    if head[4:8] == b"ftyp":
+        brand = head[8:12]
+        if brand in HEIF_BRANDS:
+            return "heic", "heic"
+        # isom/mp42/3gp... pot fi și video: audio doar cu brand audio sau dacă Twilio zice audio/*
+        if brand in AUDIO_MP4_BRANDS or content_type.startswith("audio/"):
+            return "audio", "mp4"
+        return None, None
+    if "pdf" in content_type:
+        return "pdf", "pdf"
+    if "ogg" in content_type or "opus" in content_type:
+        return "audio", "ogg"
+    if "wav" in content_type:
+        return "audio", "wav"
+    if "mpeg" in content_type or "mp3" in content_type:
+        return "audio", "mp3"
+    if content_type.startswith("audio/"):
+        # alte formate (aac, amr, 3gpp...) trec prin ffmpeg în services.audio_prep
+        return "audio", content_type.split("/", 1)[1].split(";")[0].strip()
+    return None, None
+
+
+def _check_length(headers):
+    declared = headers.get("Content-Length")
+    if declared and declared.isdigit() and int(declared) > MEDIA_MAX_BYTES:
+        raise MediaError(f"Fișierul e prea mare ({int(declared) // (1024 * 1024)} MB, maxim {MEDIA_MAX_BYTES // (1024 * 1024)} MB).")
+
+
+class _Spool:
+    """Acumulează bucățile descărcate și face sniffing pe primele."""
+
+    def __init__(self, content_type):
+        self.content_type = content_type
+        self.file = tempfile.SpooledTemporaryFile(max_size=MEDIA_SPOOL_MEMORY)
+        self.size = 0
+        self.sha256 = hashlib.sha256()
+        self.head = b""
+        self.ext = self.format = None
+
+    def feed(self, chunk: bytes):
+        if not chunk:
+            return
+        if self.ext is None and len(self.head) < 16:
+            self.head += chunk[:16]
+            if len(self.head) >= 12:
+                self.ext, self.format = sniff_media(self.head, self.content_type)
+                if self.ext is None:
+                    raise MediaError(f"Tip media nesuportat: {self.content_type or 'necunoscut'}.")
+        self.size += len(chunk)
+        if self.size > MEDIA_MAX_BYTES:
+            raise MediaError(f"Fișierul e prea mare (maxim {MEDIA_MAX_BYTES // (1024 * 1024)} MB).")
+        self.sha256.update(chunk)
+        self.file.write(chunk)
+
+    def finish(self) -> MediaBuffer:
+        if self.ext is None:
+            self.ext, self.format = sniff_media(self.head, self.content_type)
+            if self.ext is None:
+                raise MediaError(f"Tip media nesuportat: {self.content_type or 'necunoscut'}.")
+        self.file.seek(0)
+        return MediaBuffer(self.file, self.size, self.content_type, self.ext, self.format, self.sha256.hexdigest())
+
+    def discard(self):
+        self.file.close()
+
+
+def download_media(url: str, auth=None, declared_type: str = "") -> MediaBuffer:
+    """Descarcă media în flux (requests). Aruncă MediaError dacă fișierul e refuzat."""
+    with requests.get(url, auth=auth, timeout=MEDIA_DOWNLOAD_TIMEOUT, stream=True) as r:
+        if r.status_code != 200:
+            raise MediaError(f"Eroare la descărcare media: {r.status_code}")
+        _check_length(r.headers)
+        spool = _Spool(declared_type or r.headers.get("Content-Type", ""))
+        try:
+            for chunk in r.iter_content(CHUNK_SIZE):
+                spool.feed(chunk)
+            return spool.finish()
+        except Exception:
+            spool.discard()
+            raise
+
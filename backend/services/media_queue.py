@@ -0,0 +1,141 @@
+import os
+import time
+import queue
+import traceback
+from threading import Thread, Lock
+
+from services.media_download import IMAGE_EXTS
+
+
+# Câte fișiere procesăm simultan pe fiecare tip de media (per worker gunicorn);
+# "commands" = comenzile dictate rămase după alegerea contului (răspunse tot prin Twilio REST)
+MEDIA_CONCURRENCY = {
+    "ocr": int(os.getenv("MEDIA_CONCURRENCY_OCR", "2")),
+    "pdf": int(os.getenv("MEDIA_CONCURRENCY_PDF", "2")),
+    "audio": int(os.getenv("MEDIA_CONCURRENCY_AUDIO", "2")),
+    "commands": int(os.getenv("MEDIA_CONCURRENCY_COMMANDS", "2")),
+}
+# Câte fișiere pot aștepta la coadă pe fiecare tip înainte să refuzăm cu "revino mai târziu"
+MEDIA_QUEUE_SIZE = int(os.getenv("MEDIA_QUEUE_SIZE", "10"))
+
+_lock = Lock()
+_queues = {}
+_workers = []
+_accepting = True
+_stats = {
+    kind: {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0,
+           "running": 0, "wait_total": 0.0, "wait_max": 0.0}
+    for kind in MEDIA_CONCURRENCY
+}
+
+
+def media_kind(ext: str):
+    """Tipul de coadă pentru extensia detectată în webhook."""
+    if ext == "pdf":
+        return "pdf"
+    if ext in IMAGE_EXTS:
+        return "ocr"
+    if ext == "audio":
+        return "audio"
+    return None
+
+
+def _worker_loop(kind):
+    q = _queues[kind]
+    while True:
+        job = q.get()
+        if job is None:
+            q.task_done()
+            return
+        enqueued_at, fn, args = job
+        waited = time.monotonic() - enqueued_at
+        with _lock:
+            stats = _stats[kind]
+            stats["running"] += 1
+            stats["wait_total"] += waited
+            stats["wait_max"] = max(stats["wait_max"], waited)
+        ok = True
+        try:
+            fn(*args)
+        except Exception:
+            ok = False
+            traceback.print_exc()
+        finally:
+            with _lock:
+                stats["running"] -= 1
+                stats["completed" if ok else "failed"] += 1
+            q.task_done()
+
+
+def _ensure_started():
+    # pornim thread-urile leneș, după fork-ul gunicorn (thread-urile nu supraviețuiesc fork-ului)
+    if _queues:
+        return
+    for kind, concurrency in MEDIA_CONCURRENCY.items():
+        _queues[kind] = queue.Queue(maxsize=MEDIA_QUEUE_SIZE)
+        for i in range(max(1, concurrency)):
+            t = Thread(target=_worker_loop, args=(kind,), name=f"media-{kind}-{i}", daemon=True)
+            t.start()
+            _workers.append(t)
+
+
+def submit_media_job(kind: str, fn, *args) -> bool:
+    """
+    Pune o procesare de media în coada tipului respectiv.
+    Returnează False dacă coada e plină sau dacă worker-ul se oprește (apelantul răspunde "revino mai târziu").
+    """
+    with _lock:
+        if not _accepting:
+            _stats[kind]["rejected"] += 1
+            return False
+        _ensure_started()
+    try:
+        _queues[kind].put_nowait((time.monotonic(), fn, args))
+    except queue.Full:
+        with _lock:
+            _stats[kind]["rejected"] += 1
+        return False
+    with _lock:
+        _stats[kind]["submitted"] += 1
+    return True
+
+
+def drain_media_queue(timeout: float = 30.0):
+    """Oprește acceptarea de joburi noi și așteaptă (cel mult `timeout` secunde) să se termine cele din coadă."""
+    global _accepting
+    with _lock:
+        _accepting = False
+    deadline = time.monotonic() + timeout
+    for kind, q in _queues.items():
+        # Queue.join nu are timeout, așa că urmărim numărul de task-uri neterminate
+        while q.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.1)
+        if q.unfinished_tasks:
+            print(f"⚠️ Coada media '{kind}' nu s-a golit la oprire ({q.unfinished_tasks} joburi rămase).")
+    for kind, q in _queues.items():
+        for _ in range(max(1, MEDIA_CONCURRENCY[kind])):
+            try:
+                q.put_nowait(None)
+            except queue.Full:
+                break
+
+
+def get_media_queue_stats():
+    with _lock:
+        result = {}
+        for kind, stats in _stats.items():
+            started = stats["completed"] + stats["failed"] + stats["running"]
+            result[kind] = {
+                "concurrency": MEDIA_CONCURRENCY[kind],
+                "queue_size": MEDIA_QUEUE_SIZE,
+                "queue_depth": _queues[kind].qsize() if kind in _queues else 0,
+                "submitted": stats["submitted"],
+                "rejected": stats["rejected"],
+                "running": stats["running"],
+                "completed": stats["completed"],
+                "failed": stats["failed"],
+                "wait_avg_seconds": round(stats["wait_total"] / started, 3) if started else 0.0,
+                "wait_max_seconds": round(stats["wait_max"], 3),
+            }
+        result["accepting"] = _accepting
+        return result
@@ -0,0 +1,166 @@
+"""
+Motorul OCR folosit de process_image.
+
+Implicit (OCR_ENGINE=auto) folosim tesserocr: fiecare thread care face OCR își păstrează
+un handle Tesseract inițializat o singură dată (traineddata ron+eng rămâne încărcat),
+deci nu mai pornim câte un proces /usr/bin/tesseract pentru fiecare bon.
+Dacă tesserocr nu e instalat sau nu se poate inițializa, revenim la pytesseract (subprocess).
+
+OCR-ul rulează în procesele copil din services.cpu_pool, unde statisticile modulului nu sunt
+văzute de /api/metrics. De aceea ocr_image_bytes întoarce și motorul folosit și durata, iar
+părintele le adună cu record_ocr.
+"""
+
+import io
+import os
+import time
+import atexit
+import threading
+
+import pytesseract
+
+try:
+    import tesserocr
+except ImportError:  # pragma: no cover - dependență opțională
+    tesserocr = None
+
+try:
+    from pillow_heif import register_heif_opener
+except ImportError:  # pragma: no cover - dependență opțională
+    register_heif_opener = None
+
+
+pytesseract.pytesseract.tesseract_cmd = os.getenv("TESSERACT_CMD", "/usr/bin/tesseract")
+# pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+
+OCR_ENGINE = os.getenv("OCR_ENGINE", "auto")   # auto / tesserocr / subprocess
+OCR_LANG = os.getenv("OCR_LANG", "ron+eng")
+TESSDATA_PATH = os.getenv("TESSDATA_PREFIX")   # gol = calea implicită a libtesseract
+
+_local = threading.local()
+_handles_lock = threading.Lock()
+_handles = []
+_stats = {"tesserocr": 0, "subprocess": 0, "init_errors": 0, "seconds": 0.0}
+_tesserocr_failed = False
+
+
+def _get_handle(lang: str):
+    """Handle-ul Tesseract al thread-ului curent (câte unul per limbă)."""
+    handles = getattr(_local, "handles", None)
+    if handles is None:
+        handles = _local.handles = {}
+    api = handles.get(lang)
+    if api is None:
+        kwargs = {"lang": lang}
+        if TESSDATA_PATH:
+            kwargs["path"] = TESSDATA_PATH
+        api = tesserocr.PyTessBaseAPI(**kwargs)
+        handles[lang] = api
+        with _handles_lock:
+            _handles.append(api)
+    return api
+
+
+def _use_tesserocr() -> bool:
+    if OCR_ENGINE == "subprocess" or tesserocr is None or _tesserocr_failed:
+        return False
+    return True
+
+
+def ocr_image(img, lang: str = OCR_LANG) -> dict:
+    """
+    OCR pe o imagine PIL, cu motorul configurat: {"text", "engine", "seconds", "fallback"}.
+    Nu atinge statisticile (poate rula într-un proces copil); le adună record_ocr.
+    """
+    global _tesserocr_failed
+    started = time.monotonic()
+    text = None
+    fallback = False
+    if _use_tesserocr():
+        try:
+            api = _get_handle(lang)
+            api.SetImage(img)
+            text = api.GetUTF8Text()
+            engine = "tesserocr"
+        except RuntimeError as e:
+            # traineddata lipsă / libtesseract incompatibil: rămânem pe subprocess până la restart
+            print("⚠️ tesserocr indisponibil, folosesc pytesseract:", str(e))
+            _tesserocr_failed = True
+            fallback = True
+    if text is None:
+        text = pytesseract.image_to_string(img, lang=lang)
+        engine = "subprocess"
+    return {"text": text, "engine": engine, "seconds": time.monotonic() - started, "fallback": fallback}
+
+
+def record_ocr(result: dict) -> str:
+    """Adună în statisticile procesului curent un rezultat de la ocr_image (și din procesele copil); întoarce textul."""
+    with _handles_lock:
+        _stats[result["engine"]] += 1
+        _stats["seconds"] += result["seconds"]
+        _stats["init_errors"] += int(result["fallback"])
+    return result["text"]
+
+
+def image_to_string(img, lang: str = OCR_LANG) -> str:
+    """Textul dintr-o imagine PIL, cu motorul configurat, în procesul curent."""
+    return record_ocr(ocr_image(img, lang))
+
+
+def ocr_image_bytes(data: bytes, lang: str = OCR_LANG) -> dict:
+    """
+    Decodare + OCR pentru o poză; rulează în pool-ul de procese (services.cpu_pool).
+    Întoarce rezultatul lui ocr_image; apelantul îl trece prin record_ocr.
+    """
+    from PIL import Image
+
+    if register_heif_opener is not None:
+        register_heif_opener()  # pozele HEIC de pe iPhone
+    return ocr_image(Image.open(io.BytesIO(data)), lang=lang)
+
+
+def get_ocr_engine_stats():
+    with _handles_lock:
+        images = _stats["tesserocr"] + _stats["subprocess"]
+        return {
+            **{k: v for k, v in _stats.items() if k != "seconds"},
+            "images": images,
+            "avg_seconds": round(_stats["seconds"] / images, 3) if images else 0.0,
+        }
+
+
+@atexit.register
+def _close_handles():
+    with _handles_lock:
+        for api in _handles:
+            try:
+                api.End()
+            except Exception:
+                pass
+        _handles.clear()
+
+
+if __name__ == "__main__":
+    # Comparație rapidă între motoare: python -m services.ocr_engine bon1.jpg bon2.png --rounds 3
+    import argparse
+    from PIL import Image
+
+    parser = argparse.ArgumentParser(description="Imagini/secundă pentru fiecare motor OCR.")
+    parser.add_argument("images", nargs="+")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--lang", default=OCR_LANG)
+    args = parser.parse_args()
+
+    images = [Image.open(path).convert("L") for path in args.images]
+    for engine in ("subprocess", "tesserocr"):
+        if engine == "tesserocr" and tesserocr is None:
+            print("tesserocr: neinstalat")
+            continue
+        OCR_ENGINE = engine
+        image_to_string(images[0], lang=args.lang)  # încălzire (încărcarea traineddata)
+        started = time.monotonic()
+        for _ in range(args.rounds):
+            for img in images:
+                image_to_string(img, lang=args.lang)
+        elapsed = time.monotonic() - started
+        print(f"{engine}: {args.rounds * len(images) / elapsed:.2f} imagini/s")
@@ -0,0 +1,124 @@
+"""
+Extragerea textului din PDF-uri pentru process_pdf.
+
+  - citim cel mult PDF_MAX_PAGES pagini
+  - ne oprim mai devreme când textul adunat conține deja totalul, un IBAN și numărul facturii
+  - backend implicit PyPDF2; dacă e instalat, pypdfium2 sau PyMuPDF (fitz), mult mai rapide
+    (PDF_BACKEND=auto / pypdf2 / pdfium / fitz)
+  - timpul pe fiecare pagină e raportat în rezultat și în log
+"""
+
+import io
+import os
+import time
+
+from PyPDF2 import PdfReader
+
+from services.doc_patterns import key_fields_found
+
+try:
+    import pypdfium2
+except ImportError:  # pragma: no cover - dependență opțională
+    pypdfium2 = None
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:  # pragma: no cover - dependență opțională
+    fitz = None
+
+
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "10"))
+PDF_BACKEND = os.getenv("PDF_BACKEND", "auto")
+
+
+def _pages_pypdf2(fileobj):
+    reader = PdfReader(fileobj)
+    yield len(reader.pages)
+    for page in reader.pages:
+        yield page.extract_text() or ""
+
+
+def _pages_pdfium(fileobj):
+    pdf = pypdfium2.PdfDocument(fileobj)
+    try:
+        yield len(pdf)
+        for i in range(len(pdf)):
+            page = pdf[i]
+            textpage = page.get_textpage()
+            try:
+                yield textpage.get_text_range() or ""
+            finally:
+                textpage.close()
+                page.close()
+    finally:
+        pdf.close()
+
+
+def _pages_fitz(fileobj):
+    doc = fitz.open(stream=fileobj.read(), filetype="pdf")
+    try:
+        yield doc.page_count
+        for page in doc:
+            yield page.get_text() or ""
+    finally:
+        doc.close()
+
+
+BACKENDS = {"pypdf2": _pages_pypdf2, "pdfium": _pages_pdfium, "fitz": _pages_fitz}
+
+
+def pdf_backend() -> str:
+    if PDF_BACKEND in BACKENDS and (PDF_BACKEND != "pdfium" or pypdfium2) and (PDF_BACKEND != "fitz" or fitz):
+        return PDF_BACKEND
+    if pypdfium2 is not None:
+        return "pdfium"
+    if fitz is not None:
+        return "fitz"
+    return "pypdf2"
+
+
+def extract_pdf_text(fileobj, max_pages: int = PDF_MAX_PAGES, early_stop: bool = True) -> dict:
+    """
+    Textul primelor pagini ale unui PDF.
+    Returnează {"text", "page_texts", "pages_read", "pages_total", "backend", "page_seconds", "stopped_early"}.
+    """
+    backend = pdf_backend()
+    pages = BACKENDS[backend](fileobj)
+    pages_total = next(pages)
+
+    page_texts = []
+    page_seconds = []
+    found = dict.fromkeys(("total", "iban", "invoice_number"), False)
+    stopped_early = False
+    started = time.monotonic()
+    for text in pages:
+        page_seconds.append(round(time.monotonic() - started, 4))
+        page_texts.append(text)
+        if len(page_texts) >= max_pages:
+            break
+        if early_stop:
+            found = {k: v or found[k] for k, v in key_fields_found(text).items()}
+            if all(found.values()):
+                stopped_early = len(page_texts) < pages_total
+                break
+        started = time.monotonic()
+    pages.close()
+
+    print(
+        f"PDF ({backend}): {len(page_texts)}/{pages_total} pagini, "
+        f"{sum(page_seconds):.2f}s, per pagină: {page_seconds}" + (" (oprit devreme)" if stopped_early else "")
+    )
+    return {
+        "text": "\n".join(page_texts),
+        "page_texts": page_texts,
+        "pages_read": len(page_texts),
+        "pages_total": pages_total,
+        "backend": backend,
+        "page_seconds": page_seconds,
+        "stopped_early": stopped_early,
+    }
+
+
+def extract_pdf_bytes(data: bytes, max_pages: int = PDF_MAX_PAGES) -> dict:
+    """extract_pdf_text pentru conținutul brut; forma apelată din pool-ul de procese (services.cpu_pool)."""
+    return extract_pdf_text(io.BytesIO(data), max_pages)
@@ -0,0 +1,86 @@
+"""
+OCR pentru paginile scanate dintr-un PDF (fără strat de text).
+
+Paginile fără text sunt randate la OCR_TARGET_DPI și trecute prin același
+ocr_image ca pozele din process_image, câte o pagină per task în pool-ul de procese (services.cpu_pool). Randarea cere pypdfium2 sau PyMuPDF.
+"""
+
+import os
+import time
+import tempfile
+
+from services.cpu_pool import cpu_map
+from services.ocr_engine import ocr_image, record_ocr, OCR_LANG
+
+try:
+    import pypdfium2
+except ImportError:  # pragma: no cover - dependență opțională
+    pypdfium2 = None
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:  # pragma: no cover - dependență opțională
+    fitz = None
+
+
+# Sub câte caractere considerăm că pagina nu are strat de text
+MIN_TEXT_CHARS = int(os.getenv("PDF_MIN_TEXT_CHARS", "20"))
+OCR_TARGET_DPI = int(os.getenv("OCR_TARGET_DPI", "300"))
+
+
+def can_rasterize() -> bool:
+    return pypdfium2 is not None or fitz is not None
+
+
+def _render_page(path: str, index: int):
+    from PIL import Image
+
+    scale = OCR_TARGET_DPI / 72
+    if pypdfium2 is not None:
+        pdf = pypdfium2.PdfDocument(path)
+        try:
+            page = pdf[index]
+            img = page.render(scale=scale, grayscale=True).to_pil()
+            page.close()
+            return img
+        finally:
+            pdf.close()
+    doc = fitz.open(path)
+    try:
+        pix = doc[index].get_pixmap(matrix=fitz.Matrix(scale, scale), colorspace=fitz.csGRAY)
+        return Image.frombytes("L", (pix.width, pix.height), pix.samples)
+    finally:
+        doc.close()
+
+
+def ocr_pdf_page(path: str, index: int, lang: str = OCR_LANG) -> dict:
+    """Rulează în procesul copil: randare + OCR pentru o pagină (rezultatul lui ocr_image)."""
+    return ocr_image(_render_page(path, index), lang=lang)
+
+
+def fill_scanned_pages(fileobj, page_texts: list) -> list:
+    """
+    Completează paginile fără text din `page_texts` cu textul obținut prin OCR, păstrând ordinea.
+    `fileobj` e PDF-ul original (ex. MediaBuffer.open()).
+    """
+    missing = [i for i, text in enumerate(page_texts) if len((text or "").strip()) < MIN_TEXT_CHARS]
+    if not missing:
+        return page_texts
+    if not can_rasterize():
+        print(f"⚠️ {len(missing)} pagini scanate în PDF, dar nu pot fi randate (lipsește pypdfium2/PyMuPDF)")
+        return page_texts
+
+    started = time.monotonic()
+    # procesele copil deschid PDF-ul de pe disc, nu primesc conținutul serializat pentru fiecare pagină
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as tmp:
+        fileobj.seek(0)
+        while chunk := fileobj.read(1024 * 1024):
+            tmp.write(chunk)
+        tmp.flush()
+        ocr_texts = [record_ocr(r) for r in cpu_map(ocr_pdf_page, [tmp.name] * len(missing), missing)]
+
+    merged = list(page_texts)
+    for index, text in zip(missing, ocr_texts):
+        merged[index] = text
+    print(f"OCR PDF: {len(missing)} pagini scanate în {time.monotonic() - started:.2f}s")
+    return merged
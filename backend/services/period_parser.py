@@ -0,0 +1,276 @@
+"""
+Interpretare locală a perioadelor din întrebări de tip „cât am cheltuit ...”.
+
+Acoperă expresiile din `get_period_parse_prompt` (azi, ieri, săptămâna/luna/trimestrul
+trecut, ultimele N zile, Q1 2025, ianuarie 2025, între X și Y, de la X până la Y, ...)
+și returnează același JSON ca LLM-ul:
+    {"start_iso", "end_iso", "confidence", "normalized"}
+sau None dacă expresia nu e recunoscută (atunci se apelează LLM-ul).
+"""
+
+import re
+from datetime import date, datetime, time, timedelta, timezone
+
+from services.command_parser import strip_diacritics
+
+
+MONTHS = {
+    "ianuarie": 1, "ian": 1, "january": 1, "jan": 1,
+    "februarie": 2, "feb": 2, "february": 2,
+    "martie": 3, "mar": 3, "march": 3,
+    "aprilie": 4, "apr": 4, "april": 4,
+    "mai": 5, "may": 5,
+    "iunie": 6, "iun": 6, "june": 6, "jun": 6,
+    "iulie": 7, "iul": 7, "july": 7, "jul": 7,
+    "august": 8, "aug": 8,
+    "septembrie": 9, "sept": 9, "sep": 9, "september": 9,
+    "octombrie": 10, "oct": 10, "october": 10,
+    "noiembrie": 11, "noi": 11, "nov": 11, "november": 11,
+    "decembrie": 12, "dec": 12, "december": 12,
+}
+_MONTH_ALT = "|".join(sorted(MONTHS, key=len, reverse=True))
+ROMAN = {"i": 1, "ii": 2, "iii": 3, "iv": 4}
+NUMBER_WORDS = {
+    "o": 1, "un": 1, "una": 1, "doua": 2, "doi": 2, "trei": 3, "patru": 4, "cinci": 5, "sase": 6,
+    "sapte": 7, "opt": 8, "noua": 9, "zece": 10, "one": 1, "two": 2, "three": 3, "four": 4,
+    "five": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+}
+
+# O dată calendaristică: ISO, DD.MM.YYYY / DD/MM/YYYY (format european), „5 mai [2025]”, „may 5[, 2025]”,
+# sau un cuvânt relativ (azi/ieri)
+DATE_PATTERN = (
+    r"\d{4}-\d{1,2}-\d{1,2}"
+    r"|\d{1,2}[./]\d{1,2}[./]\d{4}"
+    rf"|\d{{1,2}}\s+(?:{_MONTH_ALT})\b(?:\s+\d{{4}})?"
+    rf"|(?:{_MONTH_ALT})\s+\d{{1,2}}\b(?:,?\s+\d{{4}})?"
+    r"|azi|astazi|today|ieri|yesterday|acum|now"
+)
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", strip_diacritics(text).lower()).strip()
+
+
+def _day_start(d: date) -> datetime:
+    return datetime.combine(d, time.min)
+
+
+def _day_end(d: date) -> datetime:
+    return datetime.combine(d, time(23, 59, 59))
+
+
+def _month_end(year: int, month: int) -> date:
+    first_next = date(year + (month == 12), month % 12 + 1, 1)
+    return first_next - timedelta(days=1)
+
+
+def _add_months(d: date, months: int) -> date:
+    index = d.year * 12 + d.month - 1 + months
+    year, month = divmod(index, 12)
+    return date(year, month + 1, min(d.day, _month_end(year, month + 1).day))
+
+
+def _to_number(token: str) -> int | None:
+    if token.isdigit():
+        return int(token)
+    return NUMBER_WORDS.get(token)
+
+
+def parse_date(token: str, today: date):
+    """Returnează (data, an_dedus) pentru un token care se potrivește cu DATE_PATTERN, sau None."""
+    token = token.strip()
+    if token in ("azi", "astazi", "today", "acum", "now"):
+        return today, False
+    if token in ("ieri", "yesterday"):
+        return today - timedelta(days=1), False
+    try:
+        m = re.fullmatch(r"(\d{4})-(\d{1,2})-(\d{1,2})", token)
+        if m:
+            return date(int(m.group(1)), int(m.group(2)), int(m.group(3))), False
+        m = re.fullmatch(r"(\d{1,2})[./](\d{1,2})[./](\d{4})", token)
+        if m:
+            return date(int(m.group(3)), int(m.group(2)), int(m.group(1))), False
+        m = re.fullmatch(rf"(\d{{1,2}})\s+({_MONTH_ALT})(?:\s+(\d{{4}}))?", token)
+        if not m:
+            m2 = re.fullmatch(rf"({_MONTH_ALT})\s+(\d{{1,2}})(?:,?\s+(\d{{4}}))?", token)
+            if m2:
+                m = m2
+                day, month, year = int(m2.group(2)), MONTHS[m2.group(1)], m2.group(3)
+            else:
+                return None
+        else:
+            day, month, year = int(m.group(1)), MONTHS[m.group(2)], m.group(3)
+        if year:
+            return date(int(year), month, day), False
+        # fără an: cea mai recentă apariție a datei (nu în viitor)
+        candidate = date(today.year, month, day)
+        if candidate > today:
+            candidate = date(today.year - 1, month, day)
+        return candidate, True
+    except ValueError:
+        return None
+
+
+def _result(start: datetime, end: datetime, normalized: str, confidence: float = 1.0):
+    if end < start:
+        return None
+    return {
+        "start_iso": start.replace(microsecond=0).isoformat(),
+        "end_iso": end.replace(microsecond=0).isoformat(),
+        "confidence": confidence,
+        "normalized": normalized,
+    }
+
+
+def _explicit_range(text: str, now: datetime):
+    """Intervalul explicit din text; None dacă nu există, False dacă există dar datele sunt invalide."""
+    today = now.date()
+    m = re.search(rf"\b(?:intre|between|de la|din|from)\s+({DATE_PATTERN})\s+(?:si|and|pana la|pana pe|pana in|pana|la|to|until|-)\s+({DATE_PATTERN})\b", text)
+    if m:
+        start, end = parse_date(m.group(1), today), parse_date(m.group(2), today)
+        if not start or not end:
+            return False
+        if start[1] and not end[1]:
+            # „între 5 mai și 10 iunie 2025”: începutul fără an ia anul finalului
+            start_d = start[0].replace(year=end[0].year)
+            if start_d > end[0]:
+                start_d = start_d.replace(year=end[0].year - 1)
+            start = (start_d, True)
+        end_dt = now if m.group(2) in ("acum", "now") else _day_end(end[0])
+        return _result(_day_start(start[0]), end_dt, f"{start[0]} – {end[0]}", 0.9 if start[1] or end[1] else 1.0) or False
+
+    m = re.search(rf"\b(?:de la|din|since|from)\s+({DATE_PATTERN})\b", text)
+    if m and not re.search(r"\bpana\b|\buntil\b", text[m.end():]):
+        start = parse_date(m.group(1), today)
+        if not start:
+            return False
+        return _result(_day_start(start[0]), now, f"{start[0]} – acum", 0.9 if start[1] else 1.0)
+
+    m = re.search(rf"\b(?:pana la|pana pe|pana in|until)\s+({DATE_PATTERN})\b", text)
+    if m:
+        end = parse_date(m.group(1), today)
+        if not end:
+            return False
+        # fără început: o perioadă rezonabilă de 30 de zile înainte de final
+        start = end[0] - timedelta(days=30)
+        return _result(_day_start(start), _day_end(end[0]), f"{start} – {end[0]}", 0.8)
+    return None
+
+
+def _relative(text: str, now: datetime):
+    """Toate expresiile relative/absolute „simple” din text, ca listă de rezultate."""
+    today = now.date()
+    found = []
+
+    def add(start_d, end_d, normalized, confidence=1.0, end_dt=None):
+        found.append(_result(_day_start(start_d), end_dt or _day_end(end_d), normalized, confidence))
+
+    if re.search(r"\b(?:azi|astazi|today)\b", text):
+        add(today, today, "azi")
+    if re.search(r"\b(?:ieri|yesterday)\b", text):
+        add(today - timedelta(days=1), today - timedelta(days=1), "ieri")
+    if re.search(r"\b(?:maine|tomorrow)\b", text):
+        add(today + timedelta(days=1), today + timedelta(days=1), "mâine")
+
+    monday = today - timedelta(days=today.weekday())
+    if re.search(r"\b(?:saptamana|sapt) (?:trecuta|anterioara)\b|\blast week\b", text):
+        add(monday - timedelta(days=7), monday - timedelta(days=1), "săptămâna trecută")
+    if re.search(r"\b(?:saptamana|sapt) (?:asta|aceasta|curenta)\b|\bthis week\b", text):
+        add(monday, monday + timedelta(days=6), "săptămâna curentă")
+    if re.search(r"\bweekend(?:ul)? (?:trecut|anterior)\b|\blast weekend\b", text):
+        saturday = monday - timedelta(days=2)
+        add(saturday, saturday + timedelta(days=1), "weekendul trecut")
+
+    month_start = today.replace(day=1)
+    if re.search(r"\bluna (?:trecuta|anterioara)\b|\blast month\b", text):
+        prev = _add_months(month_start, -1)
+        add(prev, _month_end(prev.year, prev.month), "luna trecută")
+    if re.search(r"\bluna (?:asta|aceasta|curenta)\b|\bthis month\b", text):
+        add(month_start, _month_end(today.year, today.month), "luna curentă")
+
+    quarter = (today.month - 1) // 3
+    quarter_start = date(today.year, quarter * 3 + 1, 1)
+    if re.search(r"\btrimestrul (?:trecut|anterior)\b|\blast quarter\b", text):
+        prev = _add_months(quarter_start, -3)
+        add(prev, _add_months(prev, 3) - timedelta(days=1), "trimestrul trecut")
+    if re.search(r"\btrimestrul (?:asta|acesta|curent)\b|\bthis quarter\b", text):
+        add(quarter_start, _add_months(quarter_start, 3) - timedelta(days=1), "trimestrul curent")
+    for m in re.finditer(r"\b(?:q([1-4])|trimestrul (i{1,3}|iv|[1-4]))(?:\s+(?:din\s+|of\s+)?(\d{4}))?\b", text):
+        q = int(m.group(1)) if m.group(1) else (ROMAN.get(m.group(2)) or int(m.group(2)))
+        year = int(m.group(3)) if m.group(3) else today.year
+        start = date(year, (q - 1) * 3 + 1, 1)
+        add(start, _add_months(start, 3) - timedelta(days=1), f"Q{q} {year}", 1.0 if m.group(3) else 0.9)
+
+    if re.search(r"\banul (?:asta|acesta|curent)\b|\bthis year\b", text):
+        add(date(today.year, 1, 1), date(today.year, 12, 31), "anul curent")
+    if re.search(r"\banul (?:trecut|anterior)\b|\blast year\b", text):
+        add(date(today.year - 1, 1, 1), date(today.year - 1, 12, 31), "anul trecut")
+    for m in re.finditer(r"\b(?:in anul|anul|in|year)\s+(\d{4})\b(?!\s*-)", text):
+        year = int(m.group(1))
+        if not re.search(rf"(?:{_MONTH_ALT}|q[1-4]|trimestrul \w+)\s+{year}", text):
+            add(date(year, 1, 1), date(year, 12, 31), f"anul {year}")
+
+    m = re.search(r"\b(?:ultimele|ultimii|last|past)\s+(\d+|\w+)\s+(zile|days|saptamani|weeks|luni|months)\b", text) \
+        or re.search(r"\b(?:ultima|ultimul|past)\s+()(zi|day|saptamana|week|luna|month)\b", text)
+    if m:
+        n = _to_number(m.group(1)) if m.group(1) else 1
+        unit = m.group(2)
+        if n:
+            if unit in ("zile", "days", "zi", "day"):
+                start = today - timedelta(days=n - 1)
+            elif unit in ("saptamani", "weeks", "saptamana", "week"):
+                start = today - timedelta(days=7 * n - 1)
+            else:
+                start = _add_months(today, -n) + timedelta(days=1)
+            add(start, today, f"ultimele {n} {unit}", end_dt=now)
+
+    # „ianuarie 2025”, „luna mai”, „în martie” (fără zi)
+    for m in re.finditer(rf"\b(?:(luna|in|on)\s+)?({_MONTH_ALT})\b(?:\s+(\d{{4}}))?", text):
+        name, year = m.group(2), m.group(3)
+        before = text[:m.start()].rstrip()
+        if re.search(r"\d$", before):
+            continue  # „5 mai” e o dată, nu o lună
+        if not year and not m.group(1):
+            continue
+        if name == "mai" and not year and m.group(1) != "luna":
+            continue  # „mai” e și adverb („cât am mai cheltuit”)
+        if len(name) <= 3 and not year and name not in ("mai", "may"):
+            continue  # abrevierile doar cu an
+        month = MONTHS[name]
+        if year:
+            y = int(year)
+        else:
+            y = today.year if month <= today.month else today.year - 1
+        add(date(y, month, 1), _month_end(y, month), f"{name} {y}", 1.0 if year else 0.9)
+
+    # o singură dată („pe 5 mai”, „2025-01-05”, „05.01.2025”)
+    for m in re.finditer(rf"\b(?:pe|on|in|din|data)\s+({DATE_PATTERN})\b|(?<![\w-])(\d{{4}}-\d{{1,2}}-\d{{1,2}}|\d{{1,2}}[./]\d{{1,2}}[./]\d{{4}})\b", text):
+        token = m.group(1) or m.group(2)
+        if token in ("azi", "astazi", "today", "ieri", "yesterday", "acum", "now"):
+            continue
+        parsed = parse_date(token, today)
+        if parsed:
+            add(parsed[0], parsed[0], str(parsed[0]), 0.9 if parsed[1] else 1.0)
+
+    return [r for r in found if r]
+
+
+def resolve_period(message: str, now: datetime | None = None):
+    """
+    Rezolvă local perioada din mesaj. `now` e timpul curent UTC (implicit datetime.now(timezone.utc)).
+    Returnează dict-ul {"start_iso","end_iso","confidence","normalized"} sau None dacă nu e recunoscută
+    sau e ambiguă (mai multe perioade diferite în același mesaj).
+    """
+    now = (now or datetime.now(timezone.utc)).astimezone(timezone.utc).replace(tzinfo=None, microsecond=0)
+    text = _normalize(message)
+
+    explicit = _explicit_range(text, now)
+    if explicit is not None:
+        # interval explicit cu o dată invalidă: nu ghicim din restul textului, decide LLM-ul
+        return explicit or None
+
+    found = _relative(text, now)
+    distinct = {(r["start_iso"], r["end_iso"]): r for r in found}
+    if len(distinct) != 1:
+        return None
+    return next(iter(distinct.values()))
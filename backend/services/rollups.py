@@ -0,0 +1,112 @@
+"""
+Agregate zilnice per cont din tabela `Daily_Rollups`.
+
+Tabela e întreținută de trigger-ul `transactions_daily_rollup` (vezi supabase/migrations),
+deci orice insert/delete pe `Transactions` o actualizează automat; tranzacțiile fără cont
+sunt agregate sub contul ''. Totalurile pe un interval sunt adunate tot în DB (funcția
+`rollup_totals`), nu rând cu rând în Python. Migrarea reconstruiește agregatele din istoric la aplicare;
+backfill-ul manual rămâne pentru reparații:
+
+    python -m services.rollups --days-per-batch 31
+"""
+
+import argparse
+from datetime import date, datetime, timedelta
+
+from services.db_utils import MISSING_RPC_CODES
+
+
+PAGE_SIZE = 1000
+
+
+def get_rollup_totals(supabase_client, start_day: str, end_day: str, iban: str | None = None):
+    """
+    Totaluri pentru zilele [start_day, end_day] (format YYYY-MM-DD), adunate în DB (funcția `rollup_totals`):
+    {"debit_total", "credit_total", "debit_count", "transaction_count"}.
+    """
+    try:
+        resp = supabase_client.rpc("rollup_totals", {
+            "from_day": start_day,
+            "to_day": end_day,
+            "p_iban": iban,
+        }).execute()
+        data = resp.data or {}
+        return {
+            "debit_total": round(float(data.get("debit_total") or 0), 2),
+            "credit_total": round(float(data.get("credit_total") or 0), 2),
+            "debit_count": int(data.get("debit_count") or 0),
+            "transaction_count": int(data.get("transaction_count") or 0),
+        }
+    except Exception as e:
+        if getattr(e, "code", None) not in MISSING_RPC_CODES:
+            raise
+        print("⚠️ RPC rollup_totals indisponibil, adun local:", str(e))
+    return _get_rollup_totals_local(supabase_client, start_day, end_day, iban)
+
+
+def _get_rollup_totals_local(supabase_client, start_day: str, end_day: str, iban: str | None = None):
+    """Varianta de rezervă: citește agregatele în pagini (PostgREST taie un răspuns la 1000 de rânduri) și le adună."""
+    totals = {"debit_total": 0.0, "credit_total": 0.0, "debit_count": 0, "transaction_count": 0}
+    offset = 0
+    while True:
+        q = supabase_client.table("Daily_Rollups")\
+            .select("debit_total,credit_total,debit_count,trx_count")\
+            .gte("day", start_day)\
+            .lte("day", end_day)
+        if iban:
+            q = q.eq("account", iban)
+        rows = q.order("account").order("day").range(offset, offset + PAGE_SIZE - 1).execute().data or []
+        for row in rows:
+            totals["debit_total"] += float(row.get("debit_total") or 0)
+            totals["credit_total"] += float(row.get("credit_total") or 0)
+            totals["debit_count"] += int(row.get("debit_count") or 0)
+            totals["transaction_count"] += int(row.get("trx_count") or 0)
+        if len(rows) < PAGE_SIZE:
+            break
+        offset += PAGE_SIZE
+    totals["debit_total"] = round(totals["debit_total"], 2)
+    totals["credit_total"] = round(totals["credit_total"], 2)
+    return totals
+
+
+def backfill_rollups(supabase_client, days_per_batch: int = 31, start: date | None = None, end: date | None = None):
+    """Reconstruiește agregatele din istoric, pe loturi de `days_per_batch` zile (fiecare lot e atomic în DB)."""
+    if start is None:
+        first = supabase_client.table("Transactions").select("created_at").order("created_at").limit(1).execute()
+        if not first.data:
+            print("Nu există tranzacții, nimic de reconstruit.")
+            return 0
+        start = datetime.fromisoformat(first.data[0]["created_at"].replace("Z", "+00:00")).date()
+    end = end or datetime.utcnow().date()
+
+    rebuilt = 0
+    batch_start = start
+    while batch_start <= end:
+        batch_end = min(batch_start + timedelta(days=days_per_batch - 1), end)
+        resp = supabase_client.rpc("backfill_daily_rollups", {
+            "from_day": batch_start.isoformat(),
+            "to_day": batch_end.isoformat(),
+        }).execute()
+        rows = resp.data or 0
+        rebuilt += rows
+        print(f"✅ {batch_start} → {batch_end}: {rows} rânduri agregate")
+        batch_start = batch_end + timedelta(days=1)
+    return rebuilt
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'shared'))
+
+    from config import SUPABASE_URL, SUPABASE_KEY
+    from supabase import create_client
+
+    parser = argparse.ArgumentParser(description="Reconstruiește Daily_Rollups din istoricul Transactions.")
+    parser.add_argument("--days-per-batch", type=int, default=31)
+    parser.add_argument("--start", type=date.fromisoformat, default=None, help="YYYY-MM-DD (implicit: prima tranzacție)")
+    parser.add_argument("--end", type=date.fromisoformat, default=None, help="YYYY-MM-DD (implicit: azi)")
+    args = parser.parse_args()
+
+    total = backfill_rollups(create_client(SUPABASE_URL, SUPABASE_KEY), args.days_per_batch, args.start, args.end)
+    print(f"Gata: {total} rânduri agregate.")
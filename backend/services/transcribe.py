@@ -0,0 +1,55 @@
+"""
+Transcrierea mesajelor vocale cu OpenAI. Un mesaj lung, împărțit de services.audio_prep.split_audio,
+e transcris pe bucăți în paralel (cel mult TRANSCRIBE_FANOUT cereri simultane per worker,
+pentru toate mesajele), iar textele sunt lipite la loc în ordine.
+"""
+
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+
+TRANSCRIBE_MODEL = os.getenv("TRANSCRIBE_MODEL", "gpt-4o-mini-transcribe")
+TRANSCRIBE_FANOUT = int(os.getenv("TRANSCRIBE_FANOUT", "4"))
+
+_executor = ThreadPoolExecutor(max_workers=TRANSCRIBE_FANOUT, thread_name_prefix="transcribe")
+_lock = Lock()
+_stats = {"notes": 0, "chunks": 0, "seconds_total": 0.0}
+
+
+def _transcribe_one(client, upload) -> str:
+    transcript = client.audio.transcriptions.create(model=TRANSCRIBE_MODEL, file=upload)
+    return transcript.text.strip()
+
+
+def transcribe(client, chunks, fmt: str = "ogg") -> str:
+    """Textul pentru bucățile (bytes) unui mesaj vocal, în ordine."""
+    started = time.monotonic()
+    uploads = [(f"voice_{i}.{fmt}", io.BytesIO(chunk)) for i, chunk in enumerate(chunks)]
+    if len(uploads) == 1:
+        texts = [_transcribe_one(client, uploads[0])]
+    else:
+        futures = [_executor.submit(_transcribe_one, client, upload) for upload in uploads]
+        texts = [future.result() for future in futures]
+    elapsed = time.monotonic() - started
+
+    with _lock:
+        _stats["notes"] += 1
+        _stats["chunks"] += len(uploads)
+        _stats["seconds_total"] += elapsed
+    if len(uploads) > 1:
+        print(f"🎙️ Transcriere: {len(uploads)} bucăți în paralel, {elapsed:.1f}s")
+    return " ".join(text for text in texts if text)
+
+
+def get_transcribe_stats():
+    with _lock:
+        notes = _stats["notes"]
+        return {
+            "notes": notes,
+            "chunks": _stats["chunks"],
+            "fanout": TRANSCRIBE_FANOUT,
+            "avg_seconds": round(_stats["seconds_total"] / notes, 2) if notes else 0.0,
+        }
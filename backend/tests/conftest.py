@@ -0,0 +1,227 @@
+import os
+import sys
+import json
+import time
+import itertools
+
+import pytest
+
+# modulele din backend se importă ca la rulare (services.*), iar reference_data/config vin din shared/
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [BACKEND_DIR, os.path.join(BACKEND_DIR, "..", "shared")]
+
+
+def pytest_addoption(parser):
+    parser.addoption("--run-slow", action="store_true", help="rulează și benchmark-urile (marcate slow)")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "slow: benchmark lent, rulează doar cu --run-slow")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--run-slow"):
+        return
+    skip = pytest.mark.skip(reason="benchmark: rulează cu --run-slow")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(skip)
+
+
+class FakeRpcError(Exception):
+    """Ca postgrest.APIError: eroarea are `code` (ex. PGRST202 = funcția nu există)."""
+
+    def __init__(self, code, message=""):
+        super().__init__(message or code)
+        self.code = code
+
+
+class FakeResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class FakeQuery:
+    """Subsetul de query builder PostgREST folosit de backend, peste liste de dict-uri în memorie."""
+
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.action = "select"
+        self.payload = None
+        self.filters = []
+        self.orders = []
+        self.window = None
+        self.count = None
+        self.single_row = False
+        self._negate = False
+
+    # --- acțiuni ---
+    def select(self, columns="*", count=None):
+        self.action, self.count = "select", count
+        return self
+
+    def insert(self, row):
+        self.action, self.payload = "insert", row
+        return self
+
+    def update(self, values):
+        self.action, self.payload = "update", values
+        return self
+
+    def delete(self):
+        self.action = "delete"
+        return self
+
+    # --- filtre ---
+    def _filter(self, test):
+        negate, self._negate = self._negate, False
+        self.filters.append((lambda row: not test(row)) if negate else test)
+        return self
+
+    @property
+    def not_(self):
+        self._negate = True
+        return self
+
+    def eq(self, col, value):
+        return self._filter(lambda row: row.get(col) == value)
+
+    def neq(self, col, value):
+        return self._filter(lambda row: row.get(col) != value)
+
+    def gte(self, col, value):
+        return self._filter(lambda row: row.get(col) is not None and row.get(col) >= value)
+
+    def lte(self, col, value):
+        return self._filter(lambda row: row.get(col) is not None and row.get(col) <= value)
+
+    def lt(self, col, value):
+        return self._filter(lambda row: row.get(col) is not None and row.get(col) < value)
+
+    def in_(self, col, values):
+        values = list(values)
+        return self._filter(lambda row: row.get(col) in values)
+
+    def is_(self, col, value):
+        return self._filter(lambda row: row.get(col) is None if value == "null" else row.get(col) == value)
+
+    def or_(self, filters):
+        # filtrul PostgREST nu e interpretat: îl păstrăm ca să-l verifice testele
+        self.db.or_filters.append(filters)
+        return self
+
+    # --- ordine / paginare ---
+    def order(self, col, desc=False):
+        self.orders.append((col, desc))
+        return self
+
+    def range(self, start, end):
+        self.window = (start, end + 1)
+        return self
+
+    def limit(self, n):
+        self.window = (0, n)
+        return self
+
+    def single(self):
+        self.single_row = True
+        return self
+
+    def execute(self):
+        return self.db.execute(self)
+
+
+class FakeSupabase:
+    """
+    Client Supabase în memorie pentru teste: `tables` = {nume: [rânduri]}, `rpcs` = {nume: fn(params)}.
+    Ca PostgREST, un select întoarce cel mult `max_rows` rânduri (implicit 1000).
+    Un RPC care nu e în `rpcs` ridică FakeRpcError("PGRST202").
+    """
+
+    def __init__(self, tables=None, rpcs=None, max_rows=1000):
+        self.tables = {name: list(rows) for name, rows in (tables or {}).items()}
+        self.rpcs = dict(rpcs or {})
+        self.max_rows = max_rows
+        self.calls = []
+        self.or_filters = []
+        self._ids = itertools.count(1 + max((r.get("id") or 0 for rows in self.tables.values() for r in rows), default=0))
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def rpc(self, name, params=None):
+        self.calls.append(("rpc", name))
+        if name not in self.rpcs:
+            raise FakeRpcError("PGRST202", f"Could not find the function public.{name}")
+        fn = self.rpcs[name]
+        return type("FakeRpc", (), {"execute": lambda _self: FakeResponse(fn(params or {}))})()
+
+    def execute(self, query):
+        self.calls.append((query.action, query.table))
+        rows = self.tables.setdefault(query.table, [])
+        if query.action == "insert":
+            new_rows = [dict(r) for r in (query.payload if isinstance(query.payload, list) else [query.payload])]
+            for row in new_rows:
+                row.setdefault("id", next(self._ids))
+            rows.extend(new_rows)
+            return FakeResponse(new_rows)
+
+        matched = [row for row in rows if all(test(row) for test in query.filters)]
+        if query.action == "delete":
+            self.tables[query.table] = [row for row in rows if row not in matched]
+            return FakeResponse(matched)
+        if query.action == "update":
+            for row in matched:
+                row.update(query.payload)
+            return FakeResponse(matched)
+
+        for col, desc in reversed(query.orders):
+            matched.sort(key=lambda row: row.get(col), reverse=desc)
+        total = len(matched)
+        start, end = query.window or (0, total)
+        data = [dict(row) for row in matched[start:min(end, start + self.max_rows)]]
+        if query.single_row:
+            return FakeResponse(data[0] if data else None)
+        return FakeResponse(data, total if query.count else None)
+
+
+class WireSupabase(FakeSupabase):
+    """
+    FakeSupabase care simulează drumul prin rețea: fiecare răspuns e serializat JSON (ca de la PostgREST)
+    și fiecare cerere costă `round_trip` secunde. Numără octeții transferați și ține separat timpul
+    petrecut în „DB” (filtrarea listelor din memorie), care nu spune nimic despre Postgres.
+    """
+
+    def __init__(self, *args, round_trip=0.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.round_trip = round_trip
+        self.bytes = 0
+        self.db_seconds = 0.0
+
+    def _over_the_wire(self, data):
+        time.sleep(self.round_trip)
+        payload = json.dumps(data)
+        self.bytes += len(payload)
+        return json.loads(payload)
+
+    def _timed(self, fn):
+        started = time.perf_counter()
+        try:
+            return fn()
+        finally:
+            self.db_seconds += time.perf_counter() - started
+
+    def rpc(self, name, params=None):
+        call = super().rpc(name, params)
+        return type("WireRpc", (), {"execute": lambda _self: FakeResponse(self._over_the_wire(self._timed(call.execute).data))})()
+
+    def execute(self, query):
+        resp = self._timed(lambda: super(WireSupabase, self).execute(query))
+        return FakeResponse(self._over_the_wire(resp.data), resp.count)
+
+
+@pytest.fixture
+def fake_supabase():
+    return FakeSupabase
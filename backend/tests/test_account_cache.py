@@ -0,0 +1,47 @@
+import json
+
+import pytest
+
+from services import account_cache
+from services.db_utils import execute_db_action, insert_transaction
+
+
+IBAN = "RO49AAAA1B31007593840000"
+
+
+@pytest.fixture
+def db(fake_supabase):
+    account_cache.invalidate_accounts()
+    sb = fake_supabase({
+        "Accounts": [{"iban": IBAN, "banca": "BCR", "compania": "Dinergy AI", "sum": 100.0}],
+        "Transactions": [],
+    })
+    account_cache.find_accounts(sb, iban=IBAN)  # încarcă directorul
+    return sb
+
+
+def directory_loaded():
+    return account_cache.get_account_cache_stats()["age_seconds"] is not None
+
+
+def test_transaction_writes_keep_the_directory(db):
+    insert_transaction(db, {"amount": -10.0, "currency": "RON", "account": IBAN, "profile_name": "a"})
+    execute_db_action(db, json.dumps({
+        "operation": "update", "table": "Accounts",
+        "data": {"sum": 90.0}, "conditions": {"iban": IBAN},
+    }))
+    assert directory_loaded()
+
+
+def test_editing_directory_columns_invalidates(db):
+    execute_db_action(db, json.dumps({
+        "operation": "update", "table": "Accounts",
+        "data": {"compania": "Dinergy Digital"}, "conditions": {"iban": IBAN},
+    }))
+    assert not directory_loaded()
+    assert account_cache.find_accounts(db, iban=IBAN)[0]["compania"] == "Dinergy Digital"
+
+
+def test_balances_always_come_from_the_database(db):
+    db.tables["Accounts"][0]["sum"] = 42.0  # alt worker a schimbat soldul
+    assert account_cache.get_balances(db, [IBAN])[IBAN]["sum"] == 42.0
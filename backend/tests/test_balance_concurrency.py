@@ -0,0 +1,122 @@
+"""
+Stres pe calea soldului: sute de incremente, inserări și undo-uri în paralel, cu baza de date
+simulată la nivelul RPC-urilor (increment_account_sum, insert_transaction_with_balance) și al
+triggerului care actualizează "Accounts".sum la insert/delete în "Transactions".
+"""
+
+import importlib
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from conftest import FakeSupabase
+from services.db_utils import execute_db_action, insert_transaction
+
+
+IBAN = "RO49AAAA1B31007593840000"
+START_BALANCE = 1000.0
+
+
+class ConcurrentDb(FakeSupabase):
+    """
+    Fiecare apel e o instrucțiune atomică (ca în Postgres), dar între apeluri firele se intercalează:
+    un read-then-write din Python ar pierde incremente, un UPDATE ... RETURNING nu.
+    """
+
+    def __init__(self):
+        super().__init__({
+            "Accounts": [{"iban": IBAN, "banca": "BCR", "compania": "Dinergy AI", "sum": START_BALANCE}],
+            "Transactions": [],
+        })
+        self.lock = threading.Lock()
+        self.clock = itertools.count()
+        self.rpcs = {
+            "increment_account_sum": self._increment,
+            "insert_transaction_with_balance": self._insert_with_balance,
+        }
+
+    def _pause(self):
+        time.sleep(random.random() / 1000)
+
+    def _account(self, iban):
+        return next(a for a in self.tables["Accounts"] if a["iban"] == iban)
+
+    def _increment(self, params):
+        with self.lock:
+            account = self._account(params["p_iban"])
+            account["sum"] += params["p_delta"]
+            return account["sum"]
+
+    def _insert_with_balance(self, params):
+        with self.lock:
+            trx = dict(params["p_trx"], created_at=f"2025-03-05T10:00:{next(self.clock):08d}")
+            row = super().execute(self.table("Transactions").insert(trx)).data[0]
+            account = self._account(row["account"])
+            account["sum"] += row["amount"]  # triggerul pe INSERT
+            return {"transaction": row, "balance": account["sum"]}
+
+    def rpc(self, name, params=None):
+        self._pause()
+        return super().rpc(name, params)
+
+    def execute(self, query):
+        self._pause()
+        with self.lock:
+            result = super().execute(query)
+            if query.table == "Transactions" and query.action == "delete":
+                for row in result.data:
+                    self._account(row["account"])["sum"] -= row["amount"]  # triggerul pe DELETE
+            return result
+
+
+@pytest.fixture
+def undo_last_transaction():
+    for name, value in {"OPENAI_KEY": "test", "SUPABASE_URL": "http://localhost", "SUPABASE_KEY": "test",
+                        "TWILIO_ACCOUNT_SID": "ACtest", "TWILIO_AUTH_TOKEN": "test"}.items():
+        os.environ.setdefault(name, value)
+    return importlib.import_module("reply_whatsapp").undo_last_transaction
+
+
+def test_parallel_increments_inserts_and_undos_keep_the_balance(undo_last_transaction):
+    db = ConcurrentDb()
+    rng = random.Random(25)
+    increments = [rng.choice([-1, 1]) * rng.randint(1, 500) / 4 for _ in range(300)]
+    kept = [-rng.randint(1, 400) / 2 for _ in range(100)]
+    undone = [-rng.randint(1, 400) / 2 for _ in range(100)]
+    returned = []
+
+    def increment(delta):
+        result = execute_db_action(db, json.dumps({
+            "operation": "update", "table": "Accounts",
+            "data": {"sum": {"increment": delta}}, "conditions": {"iban": IBAN},
+        }))
+        assert result.get("status") == "success", result
+        returned.append(result["values"]["sum"])
+
+    def insert(i, amount):
+        insert_transaction(db, {"amount": amount, "currency": "RON", "invoice_number": None,
+                                "profile_name": f"kept-{i}", "account": IBAN})
+
+    def insert_and_undo(i, amount):
+        insert_transaction(db, {"amount": amount, "currency": "RON", "invoice_number": None,
+                                "profile_name": f"undo-{i}", "account": IBAN})
+        assert "anulată" in undo_last_transaction(db, f"undo-{i}")
+
+    jobs = [(increment, (d,)) for d in increments]
+    jobs += [(insert, (i, a)) for i, a in enumerate(kept)]
+    jobs += [(insert_and_undo, (i, a)) for i, a in enumerate(undone)]
+    rng.shuffle(jobs)
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        for future in [pool.submit(fn, *args) for fn, args in jobs]:
+            future.result()
+
+    balance = db.tables["Accounts"][0]["sum"]
+    assert balance == pytest.approx(START_BALANCE + sum(increments) + sum(kept))
+    assert len(db.tables["Transactions"]) == len(kept)
+    assert len(returned) == len(increments)
@@ -0,0 +1,73 @@
+import importlib
+import os
+import time
+
+import pytest
+
+from conftest import WireSupabase
+from services import account_cache
+
+
+def iban(i):
+    return f"RO{i:02d}TEST{i:016d}"
+
+
+@pytest.fixture
+def reply_whatsapp():
+    for name, value in {"OPENAI_KEY": "test", "SUPABASE_URL": "http://localhost", "SUPABASE_KEY": "test",
+                        "TWILIO_ACCOUNT_SID": "ACtest", "TWILIO_AUTH_TOKEN": "test"}.items():
+        os.environ.setdefault(name, value)
+    return importlib.import_module("reply_whatsapp")
+
+
+def accounts_db(n, round_trip=0.0):
+    account_cache.invalidate_accounts()
+    rows = [{"iban": iban(i), "banca": f"Banca {i}", "compania": "Dinergy AI", "sum": 10.0 * i} for i in range(n)]
+    return WireSupabase({"Accounts": rows}, round_trip=round_trip)
+
+
+def candidates(n):
+    return [{"iban": iban(i), "banca": f"Banca {i}", "compania": "Dinergy AI"} for i in range(n)]
+
+
+def one_query_per_account(sb, reply_whatsapp, cands):
+    """Cum se citeau soldurile înainte: câte un drum la `Accounts` pentru fiecare IBAN."""
+    replies = []
+    for c in cands:
+        row = sb.table("Accounts").select("iban,banca,compania,sum").eq("iban", c["iban"]).single().execute().data
+        replies.append(reply_whatsapp.format_balance(row, c["iban"], c["banca"], c["compania"]))
+    return replies
+
+
+@pytest.mark.parametrize("n", [1, 10, 50])
+def test_balances_take_one_query_whatever_the_number_of_accounts(reply_whatsapp, n):
+    sb = accounts_db(n)
+    account_cache.find_accounts(sb, iban=iban(0))  # directorul e deja în memorie
+    sb.calls.clear()
+
+    replies = reply_whatsapp.get_account_balances(sb, candidates(n))
+
+    assert sb.calls == [("select", "Accounts")]
+    assert replies == one_query_per_account(accounts_db(n), reply_whatsapp, candidates(n))
+    assert replies[-1] == f"📊 Sold cont Banca {n - 1} - Dinergy AI: {10.0 * (n - 1):.2f} RON."
+
+
+@pytest.mark.slow
+def test_benchmark_reply_latency_for_1_10_50_accounts(reply_whatsapp):
+    """Latența răspunsului „sold 1 2 3 ...” cu 5 ms pe drum dus-întors: un query `in_` vs câte un query per cont."""
+    for n in (1, 10, 50):
+        timings = {}
+        for label, lookup in (("batch", reply_whatsapp.get_account_balances),
+                              ("per-cont", lambda sb, cands: one_query_per_account(sb, reply_whatsapp, cands))):
+            sb = accounts_db(n, round_trip=0.005)
+            account_cache.find_accounts(sb, iban=iban(0))
+            sb.calls.clear()
+            started = time.perf_counter()
+            lookup(sb, candidates(n))
+            timings[label] = (time.perf_counter() - started, len(sb.calls))
+
+        print(f"{n:>2} conturi: " + ", ".join(f"{label} {t * 1000:.1f} ms / {calls} cereri"
+                                             for label, (t, calls) in timings.items()))
+        assert timings["batch"][1] == 1
+        if n > 1:
+            assert timings["batch"][0] < timings["per-cont"][0]
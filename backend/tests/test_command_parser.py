@@ -0,0 +1,104 @@
+import pytest
+
+from services.command_parser import parse_amount, parse_financial_command, split_commands
+
+
+@pytest.mark.parametrize("text, commands", [
+    # o singură comandă rămâne neatinsă
+    ("am plătit 100 lei din BCR", ["am plătit 100 lei din BCR"]),
+    ("", [""]),
+    # final de propoziție / rând nou
+    ("Am plătit 100 lei din BCR. Am primit 300 lei în BT.", ["Am plătit 100 lei din BCR.", "Am primit 300 lei în BT."]),
+    ("am platit 100 lei\nam primit 20 lei", ["am platit 100 lei", "am primit 20 lei"]),
+    ("sold BT. sold ING", ["sold BT.", "sold ING"]),
+    # conectori: „și am ...”, „apoi”, „and then”
+    ("am plătit 100 lei din BCR și am primit 300 lei în BT", ["am plătit 100 lei din BCR", "am primit 300 lei în BT"]),
+    ("Am plătit 50 de lei pentru benzină, apoi am primit 200 lei în ING, apoi sold BT",
+     ["Am plătit 50 de lei pentru benzină", "am primit 200 lei în ING", "sold BT"]),
+    ("I paid 20 lei from BT and then I received 50 lei in ING", ["I paid 20 lei from BT", "I received 50 lei in ING"]),
+    # „și” fără verb după el nu desparte comanda
+    ("am plătit 100 lei pentru pâine și lapte din BCR", ["am plătit 100 lei pentru pâine și lapte din BCR"]),
+    # bucata fără verb rămâne lipită de comanda vecină (după sau înainte)
+    ("am plătit 100 lei. Din contul BCR.", ["am plătit 100 lei. Din contul BCR."]),
+    ("Din contul BCR. Am plătit 100 lei.", ["Din contul BCR. Am plătit 100 lei."]),
+    ("am plătit 100 lei. Din contul BCR. Am primit 20 lei în BT.", ["am plătit 100 lei. Din contul BCR.", "Am primit 20 lei în BT."]),
+    # text fără nicio comandă: întreg, pentru answer_request
+    ("hello. how are you?", ["hello. how are you?"]),
+])
+def test_split_commands(text, commands):
+    assert split_commands(text) == commands
+
+
+@pytest.mark.parametrize("raw, value", [
+    ("100", 100.0),
+    ("1.500", 1500.0),
+    ("1.234.567", 1234567.0),
+    ("1,234.56", 1234.56),
+    ("1.234,56", 1234.56),
+    ("1 234,50", 1234.5),
+    ("100,5", 100.5),
+    ("100,50", 100.5),
+    ("1,500", 1500.0),
+    ("12.5", 12.5),
+])
+def test_parse_amount(raw, value):
+    assert parse_amount(raw) == value
+
+
+def update(increment, description, **conditions):
+    return {
+        "operation": "update",
+        "table": "Accounts",
+        "data": {"sum": {"increment": increment}, "description": description},
+        "conditions": conditions,
+    }
+
+
+@pytest.mark.parametrize("message, action", [
+    # sume în formatele RO/EN
+    ("am plătit 1.500 lei din BCR", update(-1500.0, "Plată comercială", banca="BCR")),
+    ("am primit 1,234.56 RON in BT", update(1234.56, "Încasare", banca="Banca Transilvania")),
+    ("am plătit 100,5 lei din ING", update(-100.5, "Plată comercială", banca="ING Bank")),
+    ("am primit 1 234,50 lei in CEC", update(1234.5, "Încasare", banca="CEC Bank")),
+    # fără monedă: lei
+    ("am platit 100 din contul BCR", update(-100.0, "Plată comercială", banca="BCR")),
+    # prescurtări de bănci, numele canonic și companii
+    ("I paid 30 lei from Raiffeisen", update(-30.0, "Plată comercială", banca="Raiffeisen Bank")),
+    ("am primit 300 RON în Banca Transilvania Dinergy AI",
+     update(300.0, "Încasare", banca="Banca Transilvania", compania="Dinergy AI")),
+    ("am plătit 100 lei pentru benzina din BCR", update(-100.0, "Plată benzina", banca="BCR")),
+    ("am primit 50 lei in RO49AAAA1B31007593840000",
+     update(50.0, "Încasare", iban="RO49AAAA1B31007593840000")),
+    # sold
+    ("sold BT Dinergy AI", {"operation": "select", "table": "Accounts", "data": {},
+                            "conditions": {"banca": "Banca Transilvania", "compania": "Dinergy AI"}}),
+    ("soldul din OTP", {"operation": "select", "table": "Accounts", "data": {}, "conditions": {"banca": "OTP Bank"}}),
+])
+def test_fast_path(message, action):
+    assert parse_financial_command(message) == action
+
+
+@pytest.mark.parametrize("message", [
+    # negații, condiționale, intenții viitoare
+    "nu am platit 100 lei din BCR",
+    "daca platesc 100 lei din BCR",
+    "vreau sa platesc 100 lei din BCR",
+    "I will pay 100 lei from BT",
+    # mai multe sume / bănci / direcții
+    "am platit 100 lei si 200 lei din BCR",
+    "am platit 10 lei din BT si ING",
+    "am platit si am primit 100 lei in BT",
+    "sold BT, am platit 100 lei",
+    # altă monedă decât lei/RON
+    "am platit 50 eur din BCR",
+    "am primit 5 euro in BT",
+    "am platit 20 $ din BT",
+    "I paid 20 usd from ING",
+    "am platit 50 din BCR in euro",
+    # fără verb sau fără sumă
+    "100 lei BCR",
+    "am platit din BCR",
+    "",
+])
+def test_falls_back_to_llm(message):
+    assert parse_financial_command(message) is None
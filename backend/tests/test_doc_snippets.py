@@ -0,0 +1,131 @@
+import random
+
+import pytest
+
+from services.doc_snippets import select_snippets, shrink_document_text, estimate_tokens, PROMPT_SNIPPET_MAX_CHARS
+from services.doc_patterns import key_fields_found
+from services.invoice_extractor import extract_invoice_fields
+
+
+def ro_iban(bank, account):
+    """IBAN românesc valid (cifrele de control calculate mod 97)."""
+    body = f"{bank}{account}RO00"
+    check = 98 - int("".join(str(int(c, 36)) for c in body)) % 97
+    return f"RO{check:02d}{bank}{account}"
+
+
+IBAN_A = ro_iban("BTRL", "0000012345678901")
+IBAN_B = ro_iban("RNCB", "0072049512340001")
+IBAN_C = ro_iban("INGB", "0000999901234567")
+
+PRODUCTS = ["LAPTE 1.5% 1L", "PAINE FELIATA", "OUA M 10BUC", "CAFEA MACINATA 250G", "DETERGENT 2L",
+            "APA PLATA 2L", "BANANE KG", "ROSII KG", "BRANZA TELEMEA", "IAURT GRECESC"]
+BOILERPLATE = [
+    "Furnizorul isi rezerva dreptul de a modifica tarifele conform legislatiei in vigoare.",
+    "Reclamatiile se pot depune in termen de 30 de zile de la emiterea documentului.",
+    "Datele cu caracter personal sunt prelucrate conform Regulamentului UE 2016/679.",
+    "Pentru intrebari contactati serviciul clienti la numarul afisat pe site.",
+    "Consumul estimat se regularizeaza la urmatoarea citire a contorului.",
+]
+
+
+def supermarket_receipt(items=120, seed=1):
+    rng = random.Random(seed)
+    lines = ["MEGA MARKET SRL", "CUI RO1234567", "Str. Exemplu nr. 10, Cluj-Napoca", "Bon fiscal nr 004512"]
+    total = 0.0
+    for i in range(items):
+        qty, price = rng.randint(1, 3), rng.randint(150, 4999) / 100
+        total += qty * price
+        lines += [f"{rng.choice(PRODUCTS)} #{i:03d}", f"{qty} BUC x {price:.2f} = {qty * price:.2f} B"]
+    lines += [f"SUBTOTAL {total:.2f}", f"TOTAL {total:.2f} LEI", f"CARD {total:.2f}",
+              f"IBAN {IBAN_A}", "Va multumim! Pastrati bonul."]
+    return "\n".join(lines), round(total, 2)
+
+
+def utility_invoice(seed=2):
+    rng = random.Random(seed)
+    lines = ["ENERGIE FURNIZARE SA", "Cod client 7700123456", "Factura seria EF nr 2025001234", "Data emiterii 05.10.2025"]
+    for month in range(1, 13):
+        lines.append(f"Istoric consum luna {month:02d}: {rng.randint(80, 300)} kWh")
+    for _ in range(8):
+        lines += rng.sample(BOILERPLATE, 3)
+    lines += ["Valoare fara TVA 250,42", "TVA 19% 47,58", "Total de plata 298,00 RON", f"Cont IBAN {IBAN_B}"]
+    for _ in range(6):
+        lines += rng.sample(BOILERPLATE, 2)
+    return "\n".join(lines), 298.0
+
+
+def english_invoice(seed=3):
+    rng = random.Random(seed)
+    lines = ["ACME CLOUD LTD", "Invoice number INV-88231", "Billing period: September 2025"]
+    for i in range(60):
+        lines.append(f"Compute instance vm-{i:03d} usage {rng.randint(1, 720)} h   {rng.randint(100, 9999) / 100:.2f} EUR")
+    lines += ["Subtotal 1,980.00 EUR", "VAT 0.00 EUR", "Amount due 1,980.00 EUR"]
+    lines += [rng.choice(BOILERPLATE) for _ in range(15)]
+    lines.append(f"Pay to IBAN {IBAN_C}")
+    return "\n".join(lines), 1980.0
+
+
+def footer_iban_invoice(seed=4):
+    rng = random.Random(seed)
+    lines = ["SERVICII IT EXEMPLU SRL", "Factura nr SIT-0457", "Data 01.10.2025", "Total factura 4.760,00 RON"]
+    for i in range(70):
+        lines.append(f"Ora suport tehnic tichet #{1000 + i} - interventie remote {rng.randint(1, 4)} h")
+    lines += [rng.choice(BOILERPLATE) for _ in range(10)]
+    lines += ["Plata se face in contul deschis la Banca Transilvania:", IBAN_A]
+    return "\n".join(lines), 4760.0
+
+
+CORPUS = {
+    "bon-supermarket": supermarket_receipt,
+    "factura-utilitati": utility_invoice,
+    "invoice-en": english_invoice,
+    "factura-iban-subsol": footer_iban_invoice,
+}
+FIELDS = ("invoice_number", "account", "amount", "currency", "description")
+
+
+@pytest.mark.parametrize("name", CORPUS)
+def test_snippets_keep_the_extracted_fields(name):
+    """Ce ar trimite promptul: aceleași câmpuri extrase din fragmente ca din textul întreg, cu mai puțini tokeni."""
+    text, total = CORPUS[name]()
+    snippet = select_snippets(text)
+
+    assert len(text) > PROMPT_SNIPPET_MAX_CHARS
+    assert len(snippet) <= PROMPT_SNIPPET_MAX_CHARS + 100  # + marcajele [...]
+    assert key_fields_found(snippet) == key_fields_found(text)
+
+    full, full_confidence = extract_invoice_fields(text, "s")
+    shrunk, shrunk_confidence = extract_invoice_fields(snippet, "s")
+    assert full["amount"] == -total
+    assert {k: shrunk[k] for k in FIELDS} == {k: full[k] for k in FIELDS}
+    assert shrunk_confidence == full_confidence > 0
+
+
+def test_corpus_token_reduction():
+    """Comparația pe tot corpusul: câmpuri păstrate și tokenii din prompt înainte/după."""
+    kept = before = after = 0
+    for name, build in CORPUS.items():
+        text, _ = build()
+        snippet = shrink_document_text(text, name)
+        full, _ = extract_invoice_fields(text, "s")
+        shrunk, _ = extract_invoice_fields(snippet, "s")
+        kept += sum(full[k] == shrunk[k] for k in FIELDS)
+        before += estimate_tokens(text)
+        after += estimate_tokens(snippet)
+
+    print(f"fragmente: {kept}/{len(CORPUS) * len(FIELDS)} câmpuri identice, {before} → {after} tokeni")
+    assert kept == len(CORPUS) * len(FIELDS)
+    assert after * 2 < before
+
+
+def test_short_text_is_sent_whole():
+    text = "SC EXEMPLU SRL\nFactura nr FX-1\nTOTAL 10,00 LEI"
+    assert select_snippets(text) == text
+
+
+def test_text_without_anchors_is_truncated():
+    text = "\n".join(BOILERPLATE * 40)
+    snippet = select_snippets(text)
+    assert len(snippet) == PROMPT_SNIPPET_MAX_CHARS
+    assert text.startswith(snippet)
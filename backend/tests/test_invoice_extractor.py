@@ -0,0 +1,61 @@
+import pytest
+
+from services.invoice_extractor import extract_invoice_fields, is_valid_iban, LOCAL_EXTRACT_MIN_CONFIDENCE
+
+
+IBAN = "RO49AAAA1B31007593840000"
+
+
+def receipt(total_line, iban=IBAN):
+    lines = ["SC EXEMPLU SRL", "Factura nr FX-123", "Data 12.10.2025"]
+    if iban:
+        lines.append(f"IBAN {iban}")
+    lines.append(total_line)
+    return "\n".join(lines)
+
+
+@pytest.mark.parametrize("total_line, amount", [
+    ("TOTAL 1 234 LEI", -1234.0),
+    ("TOTAL 12 345 678 lei", -12345678.0),
+    ("TOTAL 1.234 LEI", -1234.0),
+    ("TOTAL 100 lei", -100.0),
+    ("TOTAL 1.234,56 RON", -1234.56),
+    ("TOTAL 1 234,56 RON", -1234.56),
+    ("TOTAL 1,234.56 RON", -1234.56),
+    ("Total de plata: 12,50 lei", -12.5),
+])
+def test_total_amount_formats(total_line, amount):
+    data, confidence = extract_invoice_fields(receipt(total_line), "whatsapp:+40700000000")
+    assert data["amount"] == amount
+    assert confidence >= LOCAL_EXTRACT_MIN_CONFIDENCE
+
+
+def test_missing_iban_routes_to_llm():
+    data, confidence = extract_invoice_fields(receipt("TOTAL 1 234 LEI", iban=None), "s")
+    assert data["account"] is None
+    assert confidence < LOCAL_EXTRACT_MIN_CONFIDENCE
+
+
+def test_bad_iban_checksum_routes_to_llm():
+    _, confidence = extract_invoice_fields(receipt("TOTAL 50,00 RON", iban="RO49AAAA1B31007593840001"), "s")
+    assert confidence < LOCAL_EXTRACT_MIN_CONFIDENCE
+
+
+def test_conflicting_totals_route_to_llm():
+    _, confidence = extract_invoice_fields(receipt("TOTAL 50,00 RON\nTOTAL 60,00 RON"), "s")
+    assert confidence < LOCAL_EXTRACT_MIN_CONFIDENCE
+
+
+def test_sender_is_profile_name():
+    data, _ = extract_invoice_fields(receipt("TOTAL 50,00 RON"), "whatsapp:+40700000000")
+    assert data["profile_name"] == "whatsapp:+40700000000"
+
+
+@pytest.mark.parametrize("iban, valid", [
+    (IBAN, True),
+    ("RO49 AAAA 1B31 0075 9384 0000", True),
+    ("RO49AAAA1B31007593840001", False),
+    ("RO49AAAA1B3100759384000", False),
+])
+def test_is_valid_iban(iban, valid):
+    assert is_valid_iban(iban) is valid
@@ -0,0 +1,102 @@
+import threading
+from datetime import datetime, timezone
+
+import pytest
+
+from conftest import FakeRpcError
+from services import invoice_index
+from services.db_utils import insert_transaction
+from services.invoice_index import DuplicateInvoice, find_duplicate, invoice_key
+
+
+IBAN = "RO49AAAA1B31007593840000"
+RECEIPT = {"amount": -120.5, "currency": "RON", "invoice_number": "FX-123", "account": IBAN, "profile_name": "a"}
+
+
+@pytest.fixture(autouse=True)
+def empty_index():
+    invoice_index._index = {"loaded_at": None, "by_key": {}, "by_id": {}}
+    yield
+
+
+def insert_rpc(db):
+    """insert_transaction_with_balance cu indexul unic transactions_invoice_key_uidx."""
+    def rpc(params):
+        trx = params["p_trx"]
+        key = invoice_key(trx)
+        if key is not None and any(invoice_key(row) == key for row in db.tables["Transactions"]):
+            raise FakeRpcError("23505", 'duplicate key value violates unique constraint "transactions_invoice_key_uidx"')
+        row = db.execute(db.table("Transactions").insert({**trx, "created_at": datetime.now(timezone.utc).isoformat()})).data[0]
+        return {"transaction": row, "balance": 0}
+    return rpc
+
+
+def make_db(fake_supabase):
+    db = fake_supabase({"Transactions": []})
+    db.rpcs["insert_transaction_with_balance"] = insert_rpc(db)
+    return db
+
+
+def test_resend_on_another_worker_is_rejected_by_the_database(fake_supabase):
+    db = make_db(fake_supabase)
+    # workerul B și-a încărcat indexul (gol) înainte ca workerul A să înregistreze factura
+    assert find_duplicate(db, RECEIPT) is None
+    saved = db.rpcs["insert_transaction_with_balance"]({"p_trx": dict(RECEIPT, invoice_number="FX 123")})
+
+    # B nu vede factura în memorie, dar insertul lui e refuzat de indexul unic
+    assert find_duplicate(db, RECEIPT) is None
+    with pytest.raises(DuplicateInvoice) as e:
+        insert_transaction(db, dict(RECEIPT))
+    assert e.value.match["id"] == saved["transaction"]["id"]
+    assert len(db.tables["Transactions"]) == 1
+
+    # de acum B o știe și din index, fără insert
+    assert find_duplicate(db, RECEIPT)["id"] == saved["transaction"]["id"]
+
+
+def test_other_unique_violations_are_not_reported_as_duplicates(fake_supabase):
+    db = make_db(fake_supabase)
+
+    def conflict(params):
+        raise FakeRpcError("23505", 'duplicate key value violates unique constraint "Transactions_pkey"')
+
+    db.rpcs["insert_transaction_with_balance"] = conflict
+    with pytest.raises(FakeRpcError):
+        insert_transaction(db, dict(RECEIPT))
+
+
+def test_index_hit_deleted_by_another_worker_is_accepted(fake_supabase):
+    db = make_db(fake_supabase)
+    insert_transaction(db, dict(RECEIPT))
+    assert find_duplicate(db, RECEIPT) is not None
+
+    # undo în alt worker: rândul dispare din DB, dar nu și din indexul acestui worker
+    db.tables["Transactions"].clear()
+    assert find_duplicate(db, RECEIPT) is None
+    assert invoice_index.get_invoice_index_stats()["entries"] == 0
+
+
+def test_index_load_does_not_hold_the_lock(fake_supabase, monkeypatch):
+    db = make_db(fake_supabase)
+    loading = threading.Event()
+    release = threading.Event()
+    real_load = invoice_index._load_index
+
+    def slow_load(supabase_client):
+        loading.set()
+        release.wait(5)
+        return real_load(supabase_client)
+
+    monkeypatch.setattr(invoice_index, "_load_index", slow_load)
+    checker = threading.Thread(target=find_duplicate, args=(db, RECEIPT))
+    checker.start()
+    try:
+        assert loading.wait(5)
+        # cât timp se citește tabela, celelalte operații pe index nu așteaptă
+        done = threading.Event()
+        threading.Thread(target=lambda: (invoice_index.forget_transaction({"id": 1}),
+                                         invoice_index.get_invoice_index_stats(), done.set())).start()
+        assert done.wait(1)
+    finally:
+        release.set()
+        checker.join(5)
@@ -0,0 +1,21 @@
+import pytest
+
+from services.media_download import sniff_media
+
+
+def iso_bmff(brand: bytes) -> bytes:
+    return b"\x00\x00\x00\x18ftyp" + brand + b"\x00\x00\x00\x00"
+
+
+@pytest.mark.parametrize("head, content_type, expected", [
+    (iso_bmff(b"heic"), "image/jpeg", ("heic", "heic")),
+    (iso_bmff(b"mif1"), "", ("heic", "heic")),
+    (iso_bmff(b"M4A "), "", ("audio", "mp4")),
+    (iso_bmff(b"isom"), "audio/mp4", ("audio", "mp4")),
+    (iso_bmff(b"isom"), "video/mp4", (None, None)),
+    (iso_bmff(b"mp42"), "", (None, None)),
+    (b"%PDF-1.7\n%\xe2\xe3\xcf\xd3", "application/pdf", ("pdf", "pdf")),
+    (b"OggS\x00\x02" + b"\x00" * 10, "audio/ogg", ("audio", "ogg")),
+])
+def test_sniff_media(head, content_type, expected):
+    assert sniff_media(head, content_type) == expected
@@ -0,0 +1,39 @@
+import pytest
+
+from services import ocr_engine
+
+
+@pytest.fixture
+def fresh_stats(monkeypatch):
+    monkeypatch.setattr(ocr_engine, "_stats", {"tesserocr": 0, "subprocess": 0, "init_errors": 0, "seconds": 0.0})
+    monkeypatch.setattr(ocr_engine, "OCR_ENGINE", "subprocess")
+    monkeypatch.setattr(ocr_engine.pytesseract, "image_to_string", lambda img, lang: "TOTAL 12,50")
+
+
+def test_ocr_image_leaves_stats_to_the_caller(fresh_stats):
+    # în pool-ul de procese ocr_image rulează în copil: statisticile de acolo s-ar pierde
+    result = ocr_engine.ocr_image(object())
+    assert result["text"] == "TOTAL 12,50"
+    assert result["engine"] == "subprocess"
+    assert ocr_engine.get_ocr_engine_stats()["images"] == 0
+
+
+def test_record_ocr_aggregates_results_from_children(fresh_stats):
+    child_results = [
+        {"text": "a", "engine": "tesserocr", "seconds": 0.2, "fallback": False},
+        {"text": "b", "engine": "subprocess", "seconds": 0.6, "fallback": True},
+        {"text": "c", "engine": "subprocess", "seconds": 0.4, "fallback": False},
+    ]
+    assert [ocr_engine.record_ocr(r) for r in child_results] == ["a", "b", "c"]
+
+    stats = ocr_engine.get_ocr_engine_stats()
+    assert stats["tesserocr"] == 1
+    assert stats["subprocess"] == 2
+    assert stats["init_errors"] == 1
+    assert stats["images"] == 3
+    assert stats["avg_seconds"] == 0.4
+
+
+def test_image_to_string_records_in_process(fresh_stats):
+    assert ocr_engine.image_to_string(object()) == "TOTAL 12,50"
+    assert ocr_engine.get_ocr_engine_stats()["subprocess"] == 1
@@ -0,0 +1,57 @@
+import importlib
+import os
+
+import pytest
+
+
+@pytest.fixture
+def reply_whatsapp(monkeypatch):
+    for name, value in {"OPENAI_KEY": "test", "SUPABASE_URL": "http://localhost", "SUPABASE_KEY": "test",
+                        "TWILIO_ACCOUNT_SID": "ACtest", "TWILIO_AUTH_TOKEN": "test"}.items():
+        os.environ.setdefault(name, value)
+    module = importlib.import_module("reply_whatsapp")
+    pending = {"action_type": "add_trx", "payload": {"remaining_commands": ["sold BT", "sold ING"], "next_number": 2}}
+    state = {"pending": pending, "submitted": [], "answered": []}
+
+    monkeypatch.setattr(module, "get_pending_action", lambda sb, profile: state["pending"])
+
+    def resolve(sb, profile, text, p):
+        state["pending"] = None  # alegerea a fost făcută
+        return "✅ Tranzacție salvată"
+
+    monkeypatch.setattr(module, "resolve_pending", resolve)
+    monkeypatch.setattr(module, "answer_commands", lambda *args: state["answered"].append(args) or "răspunsuri")
+    monkeypatch.setattr(module, "submit_media_job", lambda kind, fn, *args: state["submitted"].append((kind, fn, args)) or True)
+    return module, state
+
+
+def test_remaining_commands_are_queued_not_run_in_the_webhook(reply_whatsapp):
+    module, state = reply_whatsapp
+    reply = module.try_resolve_pending(None, "whatsapp:+40700000000", "1")
+
+    assert state["answered"] == []
+    [(kind, fn, args)] = state["submitted"]
+    assert kind == "commands" and fn is module.background_answer_commands
+    assert args[:3] == ("whatsapp:+40700000000", ["sold BT", "sold ING"], 2)
+    assert reply.startswith("✅ Tranzacție salvată") and "celelalte 2 comenzi" in reply
+
+
+def test_queued_commands_are_answered_over_twilio(reply_whatsapp, monkeypatch):
+    module, state = reply_whatsapp
+    sent = []
+    monkeypatch.setattr(module, "send_whatsapp", lambda to, body: sent.append((to, body)))
+
+    module.background_answer_commands("whatsapp:+40700000000", ["sold BT"], 2, None, None)
+
+    assert state["answered"][0][0] == ["sold BT"] and state["answered"][0][4] == 2
+    assert sent == [("whatsapp:+40700000000", "răspunsuri")]
+
+
+def test_full_queue_lists_the_commands_to_resend(reply_whatsapp, monkeypatch):
+    module, state = reply_whatsapp
+    monkeypatch.setattr(module, "submit_media_job", lambda *args: False)
+
+    reply = module.try_resolve_pending(None, "whatsapp:+40700000000", "1")
+
+    assert state["answered"] == []
+    assert "2) sold BT\n3) sold ING" in reply
@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from services.period_parser import resolve_period
+
+
+# miercuri, 5 martie 2025, 10:30 UTC (luni = 3 martie)
+NOW = datetime(2025, 3, 5, 10, 30, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("message, start, end", [
+    # zile
+    ("cât am cheltuit azi", "2025-03-05T00:00:00", "2025-03-05T23:59:59"),
+    ("cat am cheltuit ieri", "2025-03-04T00:00:00", "2025-03-04T23:59:59"),
+    # săptămâni
+    ("cât am cheltuit săptămâna trecută", "2025-02-24T00:00:00", "2025-03-02T23:59:59"),
+    ("cât am cheltuit saptamana asta", "2025-03-03T00:00:00", "2025-03-09T23:59:59"),
+    ("how much last week", "2025-02-24T00:00:00", "2025-03-02T23:59:59"),
+    ("cât am cheltuit weekendul trecut", "2025-03-01T00:00:00", "2025-03-02T23:59:59"),
+    # luni (februarie 2025 are 28 de zile)
+    ("cât am cheltuit luna trecută", "2025-02-01T00:00:00", "2025-02-28T23:59:59"),
+    ("cât am cheltuit luna asta", "2025-03-01T00:00:00", "2025-03-31T23:59:59"),
+    ("cât am cheltuit în ianuarie 2025", "2025-01-01T00:00:00", "2025-01-31T23:59:59"),
+    ("cât am cheltuit în decembrie", "2024-12-01T00:00:00", "2024-12-31T23:59:59"),
+    # trimestre și ani
+    ("cât am cheltuit trimestrul trecut", "2024-10-01T00:00:00", "2024-12-31T23:59:59"),
+    ("cât am cheltuit în Q1 2025", "2025-01-01T00:00:00", "2025-03-31T23:59:59"),
+    ("cât am cheltuit în trimestrul II 2024", "2024-04-01T00:00:00", "2024-06-30T23:59:59"),
+    ("cât am cheltuit anul trecut", "2024-01-01T00:00:00", "2024-12-31T23:59:59"),
+    ("cât am cheltuit în anul 2023", "2023-01-01T00:00:00", "2023-12-31T23:59:59"),
+    # ultimele N
+    ("cât am cheltuit în ultimele 7 zile", "2025-02-27T00:00:00", "2025-03-05T10:30:00"),
+    ("cât am cheltuit în ultimele trei zile", "2025-03-03T00:00:00", "2025-03-05T10:30:00"),
+    # date și intervale explicite
+    ("cât am cheltuit pe 2025-02-14", "2025-02-14T00:00:00", "2025-02-14T23:59:59"),
+    ("cât am cheltuit între 1 februarie și 10 februarie 2025", "2025-02-01T00:00:00", "2025-02-10T23:59:59"),
+    ("cât am cheltuit de la 2025-01-10 până la 2025-01-20", "2025-01-10T00:00:00", "2025-01-20T23:59:59"),
+    ("cât am cheltuit între 20.12.2024 și 05.01.2025", "2024-12-20T00:00:00", "2025-01-05T23:59:59"),
+    ("cât am cheltuit din 1 martie", "2025-03-01T00:00:00", "2025-03-05T10:30:00"),
+])
+def test_resolves_period(message, start, end):
+    result = resolve_period(message, NOW)
+    assert result is not None
+    assert (result["start_iso"], result["end_iso"]) == (start, end)
+    assert 0 < result["confidence"] <= 1
+
+
+@pytest.mark.parametrize("now, message, start, end", [
+    # luna trecută peste granița de an și în an bisect
+    (datetime(2025, 1, 15, 8, 0, tzinfo=timezone.utc), "luna trecută", "2024-12-01T00:00:00", "2024-12-31T23:59:59"),
+    (datetime(2024, 3, 10, 8, 0, tzinfo=timezone.utc), "luna trecută", "2024-02-01T00:00:00", "2024-02-29T23:59:59"),
+    # săptămâna trecută peste granița de lună/an
+    (datetime(2025, 1, 2, 8, 0, tzinfo=timezone.utc), "săptămâna trecută", "2024-12-23T00:00:00", "2024-12-29T23:59:59"),
+    # trimestrul trecut din primul trimestru
+    (datetime(2025, 2, 1, 8, 0, tzinfo=timezone.utc), "trimestrul trecut", "2024-10-01T00:00:00", "2024-12-31T23:59:59"),
+    # ieri pe 1 ianuarie
+    (datetime(2025, 1, 1, 0, 30, tzinfo=timezone.utc), "ieri", "2024-12-31T00:00:00", "2024-12-31T23:59:59"),
+    # `now` cu alt fus orar e convertit în UTC
+    (datetime(2025, 3, 6, 1, 0, tzinfo=timezone(timedelta(hours=2))), "azi", "2025-03-05T00:00:00", "2025-03-05T23:59:59"),
+])
+def test_month_and_year_boundaries(now, message, start, end):
+    result = resolve_period(message, now)
+    assert (result["start_iso"], result["end_iso"]) == (start, end)
+
+
+def test_month_without_year_has_lower_confidence():
+    assert resolve_period("cât am cheltuit în decembrie", NOW)["confidence"] < 1
+    assert resolve_period("cât am cheltuit în decembrie 2024", NOW)["confidence"] == 1
+
+
+@pytest.mark.parametrize("message", [
+    "cât am cheltuit",                                  # fără perioadă
+    "cât am cheltuit la mulți ani",                     # text fără dată
+    "cât am cheltuit azi și ieri",                      # ambiguu: două perioade
+    "cât am cheltuit între 31.02.2025 și 10.03.2025",   # dată inexistentă
+    "cât am cheltuit pe 2025-13-01",                    # lună inexistentă
+    "cât am cheltuit între 2025-03-10 și 2025-03-01",   # final înainte de început
+])
+def test_unresolved_returns_none(message):
+    assert resolve_period(message, NOW) is None
@@ -0,0 +1,77 @@
+from datetime import date, timedelta
+
+import pytest
+
+from services.rollups import get_rollup_totals
+
+
+def rollup_rows(accounts=60, days=30):
+    """accounts × days rânduri de agregate (peste limita de 1000 de rânduri a PostgREST)."""
+    rows = []
+    for a in range(accounts):
+        for d in range(days):
+            rows.append({
+                "account": f"RO{a:02d}TEST",
+                "day": (date(2025, 1, 1) + timedelta(days=d)).isoformat(),
+                "debit_total": 10.25,
+                "credit_total": 1.5,
+                "debit_count": 2,
+                "trx_count": 3,
+            })
+    return rows
+
+
+def rollup_totals_rpc(rows):
+    """Ce face funcția SQL `rollup_totals`: un singur rând cu sumele, oricâte agregate sunt în interval."""
+    def rpc(params):
+        picked = [r for r in rows if params["from_day"] <= r["day"] <= params["to_day"]
+                  and (params["p_iban"] is None or r["account"] == params["p_iban"])]
+        return {
+            "debit_total": round(sum(r["debit_total"] for r in picked), 2),
+            "credit_total": round(sum(r["credit_total"] for r in picked), 2),
+            "debit_count": sum(r["debit_count"] for r in picked),
+            "transaction_count": sum(r["trx_count"] for r in picked),
+        }
+    return rpc
+
+
+EXPECTED_ALL = {"debit_total": 18450.0, "credit_total": 2700.0, "debit_count": 3600, "transaction_count": 5400}
+
+
+@pytest.mark.parametrize("with_rpc", [True, False], ids=["rpc", "fallback-paged"])
+def test_totals_are_not_truncated_by_row_limit(fake_supabase, with_rpc):
+    rows = rollup_rows()
+    assert len(rows) > 1000
+    rpcs = {"rollup_totals": rollup_totals_rpc(rows)} if with_rpc else {}
+    sb = fake_supabase({"Daily_Rollups": rows}, rpcs=rpcs, max_rows=1000)
+
+    assert get_rollup_totals(sb, "2025-01-01", "2025-01-30") == EXPECTED_ALL
+
+
+def test_totals_use_one_rpc_call(fake_supabase):
+    rows = rollup_rows()
+    sb = fake_supabase({"Daily_Rollups": rows}, rpcs={"rollup_totals": rollup_totals_rpc(rows)})
+
+    get_rollup_totals(sb, "2025-01-01", "2025-01-30")
+
+    assert sb.calls == [("rpc", "rollup_totals")]
+
+
+def test_totals_for_one_account_and_partial_range(fake_supabase):
+    rows = rollup_rows()
+    sb = fake_supabase({"Daily_Rollups": rows}, rpcs={"rollup_totals": rollup_totals_rpc(rows)})
+
+    totals = get_rollup_totals(sb, "2025-01-01", "2025-01-10", "RO07TEST")
+
+    assert totals == {"debit_total": 102.5, "credit_total": 15.0, "debit_count": 20, "transaction_count": 30}
+
+
+def test_rpc_errors_other_than_missing_function_are_raised(fake_supabase):
+    from conftest import FakeRpcError
+
+    def broken(params):
+        raise FakeRpcError("57014", "canceling statement due to statement timeout")
+
+    sb = fake_supabase({"Daily_Rollups": rollup_rows()}, rpcs={"rollup_totals": broken})
+    with pytest.raises(FakeRpcError):
+        get_rollup_totals(sb, "2025-01-01", "2025-01-30")
@@ -0,0 +1,112 @@
+import time
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from conftest import WireSupabase, FakeRpcError
+from services.db_utils import compute_spent_summary
+
+START, END = "2025-01-01T00:00:00+00:00", "2025-12-31T23:59:59+00:00"
+ACCOUNTS = [f"RO{i:02d}BANK{i:012d}" for i in range(8)]
+
+
+def transaction_rows(n, seed=7):
+    """n tranzacții sintetice în 2025: ~70% plăți (negative), restul încasări, pe ACCOUNTS."""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    rows = []
+    for i in range(1, n + 1):
+        amount = round(rng.uniform(1, 900), 2)
+        rows.append({
+            "id": i,
+            "account": rng.choice(ACCOUNTS),
+            "amount": -amount if rng.random() < 0.7 else amount,
+            "created_at": (start + timedelta(seconds=rng.randrange(364 * 86400))).isoformat(),
+        })
+    return rows
+
+
+def expected_summary(rows, iban=None):
+    by_account = {}
+    count = 0
+    for row in rows:
+        if row["amount"] < 0 and (iban is None or row["account"] == iban):
+            by_account[row["account"]] = by_account.get(row["account"], 0.0) - row["amount"]
+            count += 1
+    return {
+        "total": round(sum(by_account.values()), 2),
+        "count": count,
+        "by_account": {k: round(v, 2) for k, v in by_account.items()},
+    }
+
+
+def spent_summary_rpc(rows):
+    """Ce întoarce funcția SQL `spent_summary`: un singur obiect JSON, oricâte tranzacții sunt în interval."""
+    def rpc(params):
+        picked = [r for r in rows if params["start_ts"] <= r["created_at"] <= params["end_ts"]]
+        return expected_summary(picked, params["p_iban"])
+    return rpc
+
+
+@pytest.mark.parametrize("with_rpc", [True, False], ids=["rpc", "fallback-paged"])
+def test_summary_is_not_truncated_by_row_limit(fake_supabase, with_rpc):
+    rows = transaction_rows(2500)
+    rpcs = {"spent_summary": spent_summary_rpc(rows)} if with_rpc else {}
+    sb = fake_supabase({"Transactions": rows}, rpcs=rpcs, max_rows=1000)
+
+    assert compute_spent_summary(sb, START, END) == expected_summary(rows)
+
+
+def test_summary_for_one_account(fake_supabase):
+    rows = transaction_rows(1500)
+    sb = fake_supabase({"Transactions": rows})
+
+    summary = compute_spent_summary(sb, START, END, ACCOUNTS[3])
+
+    assert summary == expected_summary(rows, ACCOUNTS[3])
+    assert list(summary["by_account"]) == [ACCOUNTS[3]]
+
+
+def test_summary_uses_one_rpc_call(fake_supabase):
+    rows = transaction_rows(2500)
+    sb = fake_supabase({"Transactions": rows}, rpcs={"spent_summary": spent_summary_rpc(rows)})
+
+    compute_spent_summary(sb, START, END)
+
+    assert sb.calls == [("rpc", "spent_summary")]
+
+
+def test_other_rpc_errors_are_not_hidden_by_the_fallback(fake_supabase):
+    def broken(params):
+        raise FakeRpcError("57014", "canceling statement due to statement timeout")
+
+    sb = fake_supabase({"Transactions": transaction_rows(10)}, rpcs={"spent_summary": broken})
+
+    with pytest.raises(FakeRpcError):
+        compute_spent_summary(sb, START, END)
+    assert ("select", "Transactions") not in sb.calls
+
+
+@pytest.mark.slow
+def test_benchmark_rpc_vs_local_loop_on_100k_rows():
+    """
+    „Cât am cheltuit anul ăsta” pe toate conturile, 100k tranzacții: RPC-ul `spent_summary` vs bucla locală.
+    Timpul din „DB” (listele din memorie) e scăzut: diferența măsurată e transferul
+    (100 de pagini JSON vs un obiect), drumurile dus-întors și bucla din Python, nu viteza Postgres.
+    """
+    rows = transaction_rows(100_000)
+    expected = expected_summary(rows)
+    results = {}
+    for label, rpcs in (("rpc", {"spent_summary": spent_summary_rpc(rows)}), ("local", {})):
+        sb = WireSupabase({"Transactions": rows}, rpcs=rpcs, round_trip=0.005)
+        started = time.perf_counter()
+        summary = compute_spent_summary(sb, START, END)
+        elapsed = time.perf_counter() - started - sb.db_seconds
+        assert summary == expected
+        results[label] = (elapsed, sb.bytes, len(sb.calls))
+
+    for label, (elapsed, sent, calls) in results.items():
+        print(f"spent_summary {label}: {elapsed * 1000:.0f} ms în client, {sent / 1024:.0f} KiB, {calls} cereri")
+    assert results["rpc"][1] * 100 < results["local"][1]
+    assert results["rpc"][0] < results["local"][0]
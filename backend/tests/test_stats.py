@@ -0,0 +1,63 @@
+import importlib
+import os
+
+import pytest
+
+
+@pytest.fixture
+def app_module(fake_supabase, monkeypatch):
+    os.environ.setdefault("SUPABASE_URL", "http://localhost")
+    os.environ.setdefault("SUPABASE_KEY", "test")
+    module = importlib.import_module("app")
+    sb = fake_supabase(
+        {
+            "Accounts": [{"iban": f"RO{i:02d}", "banca": "BT", "compania": "X", "sum": 10.5} for i in range(3)],
+            "Transactions": [{"id": 1, "amount": -5.0, "account": "RO00", "created_at": "2025-03-01T10:00:00+00:00"}],
+            "Daily_Rollups": [],
+        },
+        rpcs={"accounts_total_balance": lambda params: {"total": 31.5, "accounts": 3}},
+    )
+    monkeypatch.setattr(module, "supabase", sb)
+    module.invalidate_stats_cache()
+    return module
+
+
+def test_total_balance_comes_from_the_aggregate_rpc(app_module):
+    data = app_module.compute_stats()
+    assert data["total_balance"] == 31.5
+    assert ("select", "Accounts") not in app_module.supabase.calls
+
+
+@pytest.mark.parametrize("args, key", [
+    ((None, None, None), (None, None, None)),
+    (("2025-03-01", None, "RO00"), (None, None, None)),
+    (("2025-03-01", "2025-03-31", None), ("2025-03-01", "2025-03-31", None)),
+    (("2025-03-01T00:00:00Z", "2025-03-31T23:59:59Z", " RO00 "), ("2025-03-01", "2025-03-31", "RO00")),
+    (("2025-03-01", "2025-03-31", ""), ("2025-03-01", "2025-03-31", None)),
+])
+def test_stats_cache_key_is_normalized(app_module, args, key):
+    assert app_module.stats_cache_key(*args) == key
+
+
+def test_invalid_dates_are_rejected(app_module):
+    client = app_module.app.test_client()
+    resp = client.get("/api/stats?start_date=not-a-date&end_date=2025-03-31")
+    assert resp.status_code == 400
+
+
+def test_stats_cache_is_bounded(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "STATS_CACHE_MAX_ENTRIES", 8)
+    monkeypatch.setattr(app_module, "compute_stats", lambda *key: {"key": key})
+    client = app_module.app.test_client()
+    for day in range(1, 29):
+        resp = client.get(f"/api/stats?start_date=2025-02-{day:02d}&end_date=2025-03-31&junk={day}")
+        assert resp.status_code == 200
+    assert len(app_module._stats_cache) == 8
+
+
+def test_expired_entries_are_evicted(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "compute_stats", lambda *key: {"key": key})
+    app_module._cached_stats(("2025-03-01", "2025-03-31", None))
+    monkeypatch.setattr(app_module, "STATS_CACHE_TTL", 0)
+    app_module._cached_stats((None, None, None))
+    assert list(app_module._stats_cache) == [(None, None, None)]
@@ -0,0 +1,62 @@
+import base64
+import importlib
+import json
+import os
+
+import pytest
+
+
+def raw_cursor(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+@pytest.fixture
+def app_module(fake_supabase, monkeypatch):
+    os.environ.setdefault("SUPABASE_URL", "http://localhost")
+    os.environ.setdefault("SUPABASE_KEY", "test")
+    module = importlib.import_module("app")
+    sb = fake_supabase({"Transactions": [
+        {"id": i, "amount": -1.0 * i, "account": "RO00", "created_at": f"2025-03-{i:02d}T10:00:00+00:00"}
+        for i in range(1, 6)
+    ]})
+    monkeypatch.setattr(module, "supabase", sb)
+    return module
+
+
+def get(app_module, **params):
+    return app_module.app.test_client().get("/api/transactions", query_string=params)
+
+
+@pytest.mark.parametrize("cursor", [
+    "!!!",                                                           # nu e base64
+    base64.urlsafe_b64encode(b"nu e json").decode(),
+    raw_cursor(["2025-03-01T10:00:00+00:00", 3]),                   # nu e obiect
+    raw_cursor({"c": "2025-03-01T10:00:00+00:00"}),                 # lipsește id-ul
+    raw_cursor({"c": "2025-03-01T10:00:00+00:00", "i": "3),id.gt.(0"}),
+    raw_cursor({"c": "2025-03-01T10:00:00+00:00", "i": 1.5}),
+    raw_cursor({"c": '2025-03-01",id.gt.0,created_at.gt."', "i": 3}),
+    raw_cursor({"c": None, "i": 3}),
+])
+def test_bad_cursors_are_rejected_with_400(app_module, cursor):
+    resp = get(app_module, cursor=cursor)
+
+    assert resp.status_code == 400
+    assert resp.get_json() == {"success": False, "error": "Invalid cursor"}
+    assert app_module.supabase.or_filters == []
+
+
+def test_cursor_values_are_reserialized_into_the_filter(app_module):
+    resp = get(app_module, cursor=raw_cursor({"c": "2025-03-03T10:00:00Z", "i": "3"}), limit=2)
+
+    assert resp.status_code == 200
+    assert app_module.supabase.or_filters == [
+        'created_at.lt."2025-03-03T10:00:00+00:00",and(created_at.eq."2025-03-03T10:00:00+00:00",id.lt.3)'
+    ]
+
+
+def test_next_cursor_round_trips(app_module):
+    first = get(app_module, cursor="", limit=2).get_json()
+    assert [row["id"] for row in first["data"]] == [5, 4]
+    assert "page" not in first["pagination"] and first["pagination"]["total"] is None
+
+    assert app_module.decode_cursor(first["pagination"]["next_cursor"]) == ("2025-03-04T10:00:00+00:00", 4)
@@ -10,7 +10,10 @@ interface PaginationProps {
 
 const Pagination: React.FC<PaginationProps> = ({ pagination, onPageChange }) => {
   const { t } = useLanguage();
-  const { page, pages, has_next, has_prev, total } = pagination;
+  const { has_next, has_prev } = pagination;
+  const page = pagination.page ?? 1;
+  const pages = pagination.pages ?? 0;
+  const total = pagination.total ?? 0;
 
   const handlePrevious = () => {
     if (has_prev) {
@@ -25,6 +25,8 @@ export const transactionsService = {
     start_date?: string;
     end_date?: string;
     account?: string;
+    cursor?: string;
+    count?: 'exact' | 'estimated' | 'none';
   }): Promise<ApiResponse<Transaction[]>> => {
     const response = await api.get('/transactions', { params });
     return response.data;
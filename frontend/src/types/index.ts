@@ -18,19 +18,30 @@ export interface Transaction {
   created_at: string;
 }
 
+export interface PeriodTotals {
+  debit_total: number;
+  credit_total: number;
+  debit_count: number;
+  transaction_count: number;
+}
+
 export interface Stats {
   total_balance: number;
   transaction_count: number;
   recent_transactions: Transaction[];
+  period?: PeriodTotals;
+  cache_age_seconds?: number;
 }
 
 export interface Pagination {
-  page: number;
+  // page/total/pages are missing (or null) for keyset pages and when count=none
+  page?: number;
   limit: number;
-  total: number;
-  pages: number;
+  total?: number | null;
+  pages?: number | null;
   has_next: boolean;
   has_prev: boolean;
+  next_cursor?: string | null;
 }
 
 export interface ApiResponse<T> {
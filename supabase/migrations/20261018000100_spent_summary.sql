@@ -0,0 +1,34 @@
+-- Totalul cheltuit (sume negative) într-un interval, calculat în baza de date.
+-- Apelat din backend/services/db_utils.py prin supabase.rpc("spent_summary", ...).
+
+create index if not exists transactions_created_at_idx
+    on public."Transactions" (created_at);
+
+create index if not exists transactions_account_created_at_idx
+    on public."Transactions" (account, created_at);
+
+create or replace function public.spent_summary(
+    start_ts timestamptz,
+    end_ts timestamptz,
+    p_iban text default null
+)
+returns json
+language sql
+stable
+as $$
+    with spent as (
+        select account, -sum(amount) as total, count(*) as trx_count
+        from public."Transactions"
+        where created_at >= start_ts
+          and created_at <= end_ts
+          and amount < 0
+          and (p_iban is null or account = p_iban)
+        group by account
+    )
+    select json_build_object(
+        'total', coalesce(round(sum(total)::numeric, 2), 0),
+        'count', coalesce(sum(trx_count), 0),
+        'by_account', coalesce(json_object_agg(account, round(total::numeric, 2)) filter (where account is not null), '{}'::json)
+    )
+    from spent;
+$$;
@@ -0,0 +1,143 @@
+-- Agregate zilnice per cont (debit, credit, număr tranzacții), întreținute incremental
+-- de trigger la fiecare INSERT/UPDATE/DELETE pe "Transactions" (inclusiv undo_last_transaction).
+
+create table if not exists public."Daily_Rollups" (
+    account text not null,
+    day date not null,
+    debit_total numeric not null default 0,
+    credit_total numeric not null default 0,
+    debit_count integer not null default 0,
+    trx_count integer not null default 0,
+    primary key (account, day)
+);
+
+create index if not exists daily_rollups_day_idx on public."Daily_Rollups" (day);
+
+create or replace function public.apply_daily_rollup(p_account text, p_created_at timestamptz, p_amount numeric, p_sign integer)
+returns void
+language sql
+as $$
+    insert into public."Daily_Rollups" as r (account, day, debit_total, credit_total, debit_count, trx_count)
+    values (
+        p_account,
+        (p_created_at at time zone 'UTC')::date,
+        p_sign * case when p_amount < 0 then -p_amount else 0 end,
+        p_sign * case when p_amount > 0 then p_amount else 0 end,
+        p_sign * case when p_amount < 0 then 1 else 0 end,
+        p_sign
+    )
+    on conflict (account, day) do update set
+        debit_total = r.debit_total + excluded.debit_total,
+        credit_total = r.credit_total + excluded.credit_total,
+        debit_count = r.debit_count + excluded.debit_count,
+        trx_count = r.trx_count + excluded.trx_count;
+$$;
+
+create or replace function public.transactions_daily_rollup()
+returns trigger
+language plpgsql
+as $$
+begin
+    if tg_op in ('DELETE', 'UPDATE') and old.account is not null then
+        perform public.apply_daily_rollup(old.account, old.created_at, coalesce(old.amount, 0), -1);
+    end if;
+    if tg_op in ('INSERT', 'UPDATE') and new.account is not null then
+        perform public.apply_daily_rollup(new.account, new.created_at, coalesce(new.amount, 0), 1);
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists transactions_daily_rollup on public."Transactions";
+create trigger transactions_daily_rollup
+    after insert or update of amount, account, created_at or delete on public."Transactions"
+    for each row execute function public.transactions_daily_rollup();
+
+-- Reconstruiește agregatele pentru zilele [from_day, to_day] din istoric (apelat pe loturi de backfill).
+create or replace function public.backfill_daily_rollups(from_day date, to_day date)
+returns integer
+language plpgsql
+as $$
+declare
+    rebuilt integer;
+begin
+    lock table public."Daily_Rollups" in share row exclusive mode;
+
+    delete from public."Daily_Rollups" where day between from_day and to_day;
+
+    insert into public."Daily_Rollups" (account, day, debit_total, credit_total, debit_count, trx_count)
+    select
+        account,
+        (created_at at time zone 'UTC')::date,
+        coalesce(sum(-amount) filter (where amount < 0), 0),
+        coalesce(sum(amount) filter (where amount > 0), 0),
+        count(*) filter (where amount < 0),
+        count(*)
+    from public."Transactions"
+    where account is not null
+      and created_at >= from_day::timestamp at time zone 'UTC'
+      and created_at < (to_day + 1)::timestamp at time zone 'UTC'
+    group by 1, 2;
+
+    get diagnostics rebuilt = row_count;
+    return rebuilt;
+end;
+$$;
+
+-- spent_summary: zilele complete din interval vin din "Daily_Rollups" (O(zile)),
+-- doar capetele parțiale (ex. de la 14:30) se citesc din "Transactions".
+create or replace function public.spent_summary(
+    start_ts timestamptz,
+    end_ts timestamptz,
+    p_iban text default null
+)
+returns json
+language plpgsql
+stable
+as $$
+declare
+    start_day date := (start_ts at time zone 'UTC')::date;
+    end_day date := (end_ts at time zone 'UTC')::date;
+    first_full date;
+    last_full date;
+    result json;
+begin
+    first_full := case when start_ts = start_day::timestamp at time zone 'UTC' then start_day else start_day + 1 end;
+    last_full := case when end_ts >= (end_day + 1)::timestamp at time zone 'UTC' - interval '1 second' then end_day else end_day - 1 end;
+
+    with parts as (
+        select account, debit_total as total, debit_count as trx_count
+        from public."Daily_Rollups"
+        where first_full <= last_full
+          and day between first_full and last_full
+          and debit_count > 0
+          and (p_iban is null or account = p_iban)
+        union all
+        select account, -amount, 1
+        from public."Transactions"
+        where amount < 0
+          and (p_iban is null or account = p_iban)
+          and created_at >= start_ts
+          and created_at <= end_ts
+          and (
+              first_full > last_full
+              or created_at < first_full::timestamp at time zone 'UTC'
+              or created_at >= (last_full + 1)::timestamp at time zone 'UTC'
+          )
+    ),
+    spent as (
+        select account, sum(total) as total, sum(trx_count) as trx_count
+        from parts
+        group by account
+    )
+    select json_build_object(
+        'total', coalesce(round(sum(total)::numeric, 2), 0),
+        'count', coalesce(sum(trx_count), 0),
+        'by_account', coalesce(json_object_agg(account, round(total::numeric, 2)) filter (where account is not null), '{}'::json)
+    )
+    into result
+    from spent;
+
+    return result;
+end;
+$$;
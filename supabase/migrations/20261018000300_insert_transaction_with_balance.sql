@@ -0,0 +1,24 @@
+-- Inserează o tranzacție și întoarce rândul inserat plus soldul nou al contului, într-un singur apel.
+-- Soldul ("Accounts".sum) e actualizat de triggerul existent pe INSERT în "Transactions",
+-- în aceeași tranzacție; citirea de după insert vede deci deja valoarea nouă.
+
+create or replace function public.insert_transaction_with_balance(p_trx jsonb)
+returns json
+language plpgsql
+as $$
+declare
+    v_row public."Transactions";
+    v_balance numeric;
+begin
+    insert into public."Transactions" (amount, currency, invoice_number, profile_name, account, description)
+    select r.amount, r.currency, r.invoice_number, r.profile_name, r.account, r.description
+    from jsonb_populate_record(null::public."Transactions", p_trx) as r
+    returning * into v_row;
+
+    select a.sum into v_balance
+    from public."Accounts" as a
+    where a.iban = v_row.account;
+
+    return json_build_object('transaction', row_to_json(v_row), 'balance', v_balance);
+end;
+$$;
@@ -0,0 +1,12 @@
+-- Incrementează atomic soldul unui cont și întoarce valoarea nouă.
+-- Un singur UPDATE (cu lock pe rând), deci incrementele simultane din workeri diferiți nu se pierd.
+
+create or replace function public.increment_account_sum(p_iban text, p_delta numeric)
+returns numeric
+language sql
+as $$
+    update public."Accounts"
+    set sum = coalesce(sum, 0) + p_delta
+    where iban = p_iban
+    returning sum;
+$$;
@@ -0,0 +1,119 @@
+-- Corecții pentru "Daily_Rollups":
+-- 1. tranzacțiile fără cont (account null, ex. bonuri fără IBAN) sunt agregate sub contul '' ,
+--    ca totalul pe toate conturile să fie același pentru zilele complete și pentru capetele parțiale;
+-- 2. agregatele sunt reconstruite aici din tot istoricul, nu doar prin backfill-ul manual,
+--    altfel spent_summary ar număra 0 pentru zilele dinainte de trigger.
+
+create or replace function public.transactions_daily_rollup()
+returns trigger
+language plpgsql
+as $$
+begin
+    if tg_op in ('DELETE', 'UPDATE') then
+        perform public.apply_daily_rollup(coalesce(old.account, ''), old.created_at, coalesce(old.amount, 0), -1);
+    end if;
+    if tg_op in ('INSERT', 'UPDATE') then
+        perform public.apply_daily_rollup(coalesce(new.account, ''), new.created_at, coalesce(new.amount, 0), 1);
+    end if;
+    return null;
+end;
+$$;
+
+create or replace function public.backfill_daily_rollups(from_day date, to_day date)
+returns integer
+language plpgsql
+as $$
+declare
+    rebuilt integer;
+begin
+    lock table public."Daily_Rollups" in share row exclusive mode;
+
+    delete from public."Daily_Rollups" where day between from_day and to_day;
+
+    insert into public."Daily_Rollups" (account, day, debit_total, credit_total, debit_count, trx_count)
+    select
+        coalesce(account, ''),
+        (created_at at time zone 'UTC')::date,
+        coalesce(sum(-amount) filter (where amount < 0), 0),
+        coalesce(sum(amount) filter (where amount > 0), 0),
+        count(*) filter (where amount < 0),
+        count(*)
+    from public."Transactions"
+    where created_at >= from_day::timestamp at time zone 'UTC'
+      and created_at < (to_day + 1)::timestamp at time zone 'UTC'
+    group by 1, 2;
+
+    get diagnostics rebuilt = row_count;
+    return rebuilt;
+end;
+$$;
+
+-- Contul '' (fără cont) intră în total și în număr, dar nu apare în defalcarea pe conturi,
+-- la fel ca rândurile cu account null citite direct din "Transactions".
+create or replace function public.spent_summary(
+    start_ts timestamptz,
+    end_ts timestamptz,
+    p_iban text default null
+)
+returns json
+language plpgsql
+stable
+as $$
+declare
+    start_day date := (start_ts at time zone 'UTC')::date;
+    end_day date := (end_ts at time zone 'UTC')::date;
+    first_full date;
+    last_full date;
+    result json;
+begin
+    first_full := case when start_ts = start_day::timestamp at time zone 'UTC' then start_day else start_day + 1 end;
+    last_full := case when end_ts >= (end_day + 1)::timestamp at time zone 'UTC' - interval '1 second' then end_day else end_day - 1 end;
+
+    with parts as (
+        select nullif(account, '') as account, debit_total as total, debit_count as trx_count
+        from public."Daily_Rollups"
+        where first_full <= last_full
+          and day between first_full and last_full
+          and debit_count > 0
+          and (p_iban is null or account = p_iban)
+        union all
+        select account, -amount, 1
+        from public."Transactions"
+        where amount < 0
+          and (p_iban is null or account = p_iban)
+          and created_at >= start_ts
+          and created_at <= end_ts
+          and (
+              first_full > last_full
+              or created_at < first_full::timestamp at time zone 'UTC'
+              or created_at >= (last_full + 1)::timestamp at time zone 'UTC'
+          )
+    ),
+    spent as (
+        select account, sum(total) as total, sum(trx_count) as trx_count
+        from parts
+        group by account
+    )
+    select json_build_object(
+        'total', coalesce(round(sum(total)::numeric, 2), 0),
+        'count', coalesce(sum(trx_count), 0),
+        'by_account', coalesce(json_object_agg(account, round(total::numeric, 2)) filter (where account is not null), '{}'::json)
+    )
+    into result
+    from spent;
+
+    return result;
+end;
+$$;
+
+-- Reconstruiește agregatele din tot istoricul (inclusiv rândurile fără cont), în tranzacția migrării.
+do $$
+declare
+    first_day date;
+begin
+    select min((created_at at time zone 'UTC')::date) into first_day from public."Transactions";
+    if first_day is not null then
+        perform public.backfill_daily_rollups(first_day, (now() at time zone 'UTC')::date);
+    end if;
+end;
+$$;
@@ -0,0 +1,23 @@
+-- Totalurile din "Daily_Rollups" pentru un interval de zile, adunate în baza de date.
+-- Apelat din backend/services/rollups.py prin supabase.rpc("rollup_totals", ...): întoarce un singur rând,
+-- deci rezultatul nu e tăiat de limita de rânduri a PostgREST (implicit 1000) ca la citirea agregatelor brute.
+
+create or replace function public.rollup_totals(
+    from_day date,
+    to_day date,
+    p_iban text default null
+)
+returns json
+language sql
+stable
+as $$
+    select json_build_object(
+        'debit_total', coalesce(round(sum(debit_total)::numeric, 2), 0),
+        'credit_total', coalesce(round(sum(credit_total)::numeric, 2), 0),
+        'debit_count', coalesce(sum(debit_count), 0),
+        'transaction_count', coalesce(sum(trx_count), 0)
+    )
+    from public."Daily_Rollups"
+    where day between from_day and to_day
+      and (p_iban is null or account = p_iban);
+$$;
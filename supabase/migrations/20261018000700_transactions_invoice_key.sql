@@ -0,0 +1,41 @@
+-- Aceeași factură nu poate fi înregistrată de două ori pe același cont: index unic pe cheia
+-- (cont, număr factură, sumă, monedă), normalizată ca invoice_key din backend/services/invoice_index.py.
+-- Indexul din memoria fiecărui worker gunicorn nu vede inserările celorlalți workeri (și nici cache-ul
+-- media comun), deci regula e impusă aici; insertul unei facturi deja înregistrate eșuează cu 23505.
+
+-- Dublurile existente (facturi retrimise și înregistrate de două ori) trebuie rezolvate înainte:
+-- ștergerea rândului în plus corectează soldul și agregatele prin triggerele existente.
+do $$
+declare
+    duplicates integer;
+begin
+    select count(*) into duplicates
+    from (
+        select 1
+        from public."Transactions"
+        where account is not null
+          and invoice_number is not null
+          and upper(regexp_replace(invoice_number, '[[:space:]/.-]', '', 'g')) not in ('', 'NULL', 'NONE')
+        group by
+            upper(replace(account, ' ', '')),
+            upper(regexp_replace(invoice_number, '[[:space:]/.-]', '', 'g')),
+            round(amount::numeric, 2),
+            upper(btrim(coalesce(nullif(currency, ''), 'RON')))
+        having count(*) > 1
+    ) as d;
+    if duplicates > 0 then
+        raise exception 'Transactions are % facturi înregistrate de mai multe ori; rezolvă dublurile înainte de a crea transactions_invoice_key_uidx', duplicates;
+    end if;
+end;
+$$;
+
+create unique index if not exists transactions_invoice_key_uidx
+    on public."Transactions" (
+        upper(replace(account, ' ', '')),
+        upper(regexp_replace(invoice_number, '[[:space:]/.-]', '', 'g')),
+        round(amount::numeric, 2),
+        upper(btrim(coalesce(nullif(currency, ''), 'RON')))
+    )
+    where account is not null
+      and invoice_number is not null
+      and upper(regexp_replace(invoice_number, '[[:space:]/.-]', '', 'g')) not in ('', 'NULL', 'NONE');
@@ -0,0 +1,15 @@
+-- Soldul total al tuturor conturilor și numărul lor, adunate în baza de date.
+-- Apelat din backend/services/db_utils.py (get_total_balance) pentru statisticile din dashboard,
+-- în locul citirii întregii tabele "Accounts" și adunării în Python.
+
+create or replace function public.accounts_total_balance()
+returns json
+language sql
+stable
+as $$
+    select json_build_object(
+        'total', coalesce(round(sum(sum)::numeric, 2), 0),
+        'accounts', count(*)
+    )
+    from public."Accounts";
+$$;